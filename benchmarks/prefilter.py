@@ -0,0 +1,102 @@
+"""
+Pre-filter quality on synthetic universes: how many candidates it prunes, how
+much screening time it saves, and its recall against the full screen.
+
+  python -m benchmarks.prefilter
+  python -m benchmarks.prefilter --tickers 50,200 --bars 2500 --clusters 8
+
+recall_screen: share of the pairs the full Engle-Granger screen selects
+(p <= --pvalue) that survive the pre-filter. Random-walk pairs that pass the
+test by chance count against it, so it is a floor on what matters.
+recall_true:   share of the generator's truly cointegrated pairs selected by
+the full screen that are also selected after the pre-filter.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from itertools import combinations
+
+from pairs_trading.config import StrategyConfig
+from pairs_trading.prefilter import prefilter_pairs
+from pairs_trading.screening import batch_coint_pvalues
+
+from .synthetic import synthetic_universe
+
+
+def evaluate(n_tickers: int, n_bars: int, cfg: StrategyConfig, pvalue: float = 0.05, seed: int = 0) -> dict:
+    prices, true_pairs = synthetic_universe(n_tickers, n_bars, seed=seed)
+    pairs = list(combinations(prices.columns, 2))
+
+    t0 = time.perf_counter()
+    full = batch_coint_pvalues(prices, pairs, progress=False)
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    kept, _ = prefilter_pairs(
+        prices, pairs,
+        min_level_corr=cfg.prefilter_min_level_corr,
+        min_return_corr=cfg.prefilter_min_return_corr,
+        max_half_life=cfg.prefilter_max_half_life,
+        n_clusters=cfg.prefilter_clusters,
+    )
+    t_pre = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fast = batch_coint_pvalues(prices, kept, progress=False)
+    t_fast = time.perf_counter() - t0
+
+    sel_full = {(a, b) for a, b, p in full.itertuples(index=False) if p <= pvalue}
+    sel_fast = {(a, b) for a, b, p in fast.itertuples(index=False) if p <= pvalue}
+    true_full = sel_full & set(true_pairs)
+    return {
+        "tickers": n_tickers,
+        "bars": n_bars,
+        "candidates": len(pairs),
+        "pruned": len(pairs) - len(kept),
+        "selected_full": len(sel_full),
+        "selected_fast": len(sel_fast),
+        "recall_screen": len(sel_full & sel_fast) / len(sel_full) if sel_full else float("nan"),
+        "recall_true": len(true_full & sel_fast) / len(true_full) if true_full else float("nan"),
+        "full_s": t_full,
+        "prefilter_s": t_pre,
+        "screen_s": t_fast,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Pre-filter pruning / recall on synthetic universes")
+    p.add_argument("--tickers", type=str, default="50,100")
+    p.add_argument("--bars", type=str, default="1000,2500")
+    p.add_argument("--pvalue", type=float, default=0.05)
+    p.add_argument("--min_level_corr", type=float, default=StrategyConfig.prefilter_min_level_corr)
+    p.add_argument("--min_return_corr", type=float, default=StrategyConfig.prefilter_min_return_corr)
+    p.add_argument("--max_half_life", type=float, default=StrategyConfig.prefilter_max_half_life)
+    p.add_argument("--clusters", type=int, default=StrategyConfig.prefilter_clusters)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+
+    cfg = StrategyConfig(
+        prefilter=True,
+        prefilter_min_level_corr=args.min_level_corr,
+        prefilter_min_return_corr=args.min_return_corr,
+        prefilter_max_half_life=args.max_half_life,
+        prefilter_clusters=args.clusters,
+    )
+    print(
+        f"{'tickers':>7} {'bars':>7} {'candidates':>10} {'pruned':>8} {'sel full':>8} {'sel fast':>8} "
+        f"{'recall scr':>10} {'recall true':>11} {'full s':>8} {'pre+scr s':>9}"
+    )
+    for n_tickers in [int(t) for t in args.tickers.split(",")]:
+        for n_bars in [int(b) for b in args.bars.split(",")]:
+            r = evaluate(n_tickers, n_bars, cfg, pvalue=args.pvalue, seed=args.seed)
+            print(
+                f"{r['tickers']:>7} {r['bars']:>7} {r['candidates']:>10} {r['pruned']:>8} "
+                f"{r['selected_full']:>8} {r['selected_fast']:>8} {r['recall_screen']:>10.3f} "
+                f"{r['recall_true']:>11.3f} {r['full_s']:>8.3f} {r['prefilter_s'] + r['screen_s']:>9.3f}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
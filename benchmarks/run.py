@@ -0,0 +1,391 @@
+"""
+Benchmarks for the pipeline hot paths on synthetic universes (no network).
+
+  python -m benchmarks.run                                  # quick preset
+  python -m benchmarks.run --preset full --save benchmarks/baseline.json
+  python -m benchmarks.run --preset long                    # 1M-bar universes
+  python -m benchmarks.run --baseline benchmarks/baseline.json   # exit 1 on regression
+
+Each (stage, tickers, bars) case reports best-of-`repeat` wall time, peak
+traced memory (one extra run under tracemalloc) and throughput in work units
+per second. A checksum of the stage output is stored alongside, so baseline
+mode also catches changed results, not just slowdowns.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from pairs_trading.backtest import backtest_matrix, pair_returns_from_spread_position
+from pairs_trading.bootstrap import bootstrap_metrics
+from pairs_trading.cli import select_pairs
+from pairs_trading.config import StrategyConfig
+from pairs_trading.execution import BorrowCost, LinearCost, simulate_execution
+from pairs_trading.kalman import kalman_hedge_matrix
+from pairs_trading.metrics import summarize, summarize_matrix
+from pairs_trading.online import OnlinePairEngine
+from pairs_trading.portfolio import weighted_portfolio
+from pairs_trading.signals import positions_from_z, positions_matrix_from_z
+from pairs_trading.stability import rolling_coint
+from pairs_trading.stats import rolling_ols, rolling_ols_beta
+from pairs_trading.stream import stream_portfolio
+
+from .synthetic import synthetic_universe
+
+PRESETS = {
+    "quick": ([10, 50], [1_000, 5_000]),
+    "full": ([10, 100, 1_000], [1_000, 10_000, 100_000]),
+    "long": ([10, 100], [1_000_000]),
+}
+
+# Cases whose work (units) exceeds this are skipped unless --max_units says otherwise.
+DEFAULT_MAX_UNITS = 2e9
+
+# Universes with more price cells (tickers x bars) are not generated: the panel
+# plus the dense beta / z / position inputs take ~3x its size again.
+DEFAULT_MAX_CELLS = 1e8
+
+BOOTSTRAP_REPS = 1000
+
+# Slowdowns smaller than this (seconds) are timer noise, never a regression.
+MIN_SLACK_SECONDS = 0.005
+
+
+@dataclass
+class Case:
+    stage: str
+    tickers: int
+    bars: int
+    units: int
+    seconds: float
+    peak_mb: float
+    throughput: float
+    checksum: float
+
+
+@dataclass
+class _Inputs:
+    """
+    Shared, untimed inputs for one universe: adjacent columns form the pairs.
+    """
+    prices: pd.DataFrame
+    pair_index: np.ndarray
+    beta: np.ndarray
+    z: np.ndarray
+    pos: np.ndarray
+    cfg: StrategyConfig
+
+
+def _inputs(prices: pd.DataFrame) -> _Inputs:
+    n_bars, n_tickers = prices.shape
+    lookback = min(252, n_bars // 4)
+    cfg = StrategyConfig(
+        beta_lookback=lookback,
+        z_lookback=min(60, lookback),
+        min_overlap_days=min(252, n_bars // 2),
+        max_pairs=n_tickers * n_tickers,
+    )
+    pair_index = np.arange(n_tickers // 2 * 2).reshape(-1, 2)
+    values = prices.values
+    beta = rolling_ols(values[:, pair_index[:, 0]], values[:, pair_index[:, 1]], cfg.beta_lookback).beta
+    spread = values[:, pair_index[:, 0]] - beta * values[:, pair_index[:, 1]]
+    z = pd.DataFrame(spread).rolling(cfg.z_lookback).mean().values
+    z = (spread - z) / pd.DataFrame(spread).rolling(cfg.z_lookback).std(ddof=0).values
+    pos = positions_matrix_from_z(z, cfg.entry_z, cfg.exit_z)
+    return _Inputs(prices, pair_index, beta, z, pos, cfg)
+
+
+# Each stage returns (thunk to time, work units). Units are pair-bars unless noted.
+def _rolling_ols_beta(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    p = d.prices
+    cols = [(p.iloc[:, a], p.iloc[:, b]) for a, b in d.pair_index]
+    return (lambda: [rolling_ols_beta(y, x, d.cfg.beta_lookback) for y, x in cols]), len(cols) * len(p)
+
+
+def _rolling_ols_matrix(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    v = d.prices.values
+    Y, X = v[:, d.pair_index[:, 0]], v[:, d.pair_index[:, 1]]
+    return (lambda: rolling_ols(Y, X, d.cfg.beta_lookback).beta), Y.size
+
+
+def _select_pairs(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    # Units: candidate pairs * bars (every pair is screened).
+    n_bars, n = d.prices.shape
+    return (lambda: select_pairs(d.prices, d.cfg)["coint_pvalue"].values), n * (n - 1) // 2 * n_bars
+
+
+def _select_pairs_prefilter(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    # Same units as select_pairs, so throughputs compare directly.
+    n_bars, n = d.prices.shape
+    cfg = replace(d.cfg, prefilter=True)
+    return (lambda: select_pairs(d.prices, cfg)["coint_pvalue"].values), n * (n - 1) // 2 * n_bars
+
+
+def _positions_from_z(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    zs = [pd.Series(d.z[:, j], index=d.prices.index) for j in range(d.z.shape[1])]
+    return (lambda: [positions_from_z(z, d.cfg.entry_z, d.cfg.exit_z) for z in zs]), d.z.size
+
+
+def _positions_matrix(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    return (lambda: positions_matrix_from_z(d.z, d.cfg.entry_z, d.cfg.exit_z)), d.z.size
+
+
+def _pair_returns(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    p, idx = d.prices, d.prices.index
+    legs = [
+        (p.iloc[:, a], p.iloc[:, b], pd.Series(d.beta[:, j], index=idx), pd.Series(d.pos[:, j], index=idx))
+        for j, (a, b) in enumerate(d.pair_index)
+    ]
+    return (lambda: [pair_returns_from_spread_position(*leg)["ret_net"] for leg in legs]), d.pos.size
+
+
+def _backtest_matrix(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    return (lambda: backtest_matrix(d.prices.values, d.pair_index, d.beta, d.pos).ret_net), d.pos.size
+
+
+def _summarize(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    bt = backtest_matrix(d.prices.values, d.pair_index, d.beta, d.pos, index=d.prices.index)
+    rets = [bt.pair_frame(j)["ret_net"] for j in range(len(d.pair_index))]
+    return (lambda: [list(summarize(r).values()) for r in rets]), d.pos.size
+
+
+def _summarize_matrix(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    ret = backtest_matrix(d.prices.values, d.pair_index, d.beta, d.pos).ret_net
+    return (lambda: summarize_matrix(ret)), ret.size
+
+
+def _portfolio(weighting: str) -> Callable[[_Inputs], tuple[Callable[[], Any], int]]:
+    def stage(d: _Inputs) -> tuple[Callable[[], Any], int]:
+        ret = backtest_matrix(d.prices.values, d.pair_index, d.beta, d.pos).ret_net
+        return (lambda: weighted_portfolio(ret, weighting).returns), ret.size
+
+    return stage
+
+
+def _bootstrap(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    port = weighted_portfolio(backtest_matrix(d.prices.values, d.pair_index, d.beta, d.pos).ret_net)
+    return (lambda: bootstrap_metrics(port, BOOTSTRAP_REPS).samples), BOOTSTRAP_REPS * len(port.returns)
+
+
+def _stream(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    cfg = replace(d.cfg, chunk_bars=max(len(d.prices) // 4, 1))
+    return (lambda: stream_portfolio(d.prices, d.pair_index, cfg)), d.pos.size
+
+
+def _execution(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    costs = [LinearCost(d.cfg.fee_bps_per_leg), BorrowCost(0.02)]
+    return (lambda: simulate_execution(d.prices, d.pair_index, d.beta, d.pos, costs).backtest.ret_net), d.pos.size
+
+
+def _rolling_coint(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    v = d.prices.values
+    y, x = v[:, d.pair_index[:, 0]], v[:, d.pair_index[:, 1]]
+    return (lambda: rolling_coint(y, x, d.cfg.monitor_window, d.cfg.monitor_lags).pvalue), d.pos.size
+
+
+def _kalman(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    return (lambda: kalman_hedge_matrix(d.prices.values, d.pair_index)[0]), d.pos.size
+
+
+def _online(d: _Inputs) -> tuple[Callable[[], Any], int]:
+    values = d.prices.values
+
+    def go():
+        eng = OnlinePairEngine.from_config(d.cfg, d.pair_index)
+        return [eng.update(row).position for row in values]
+
+    return go, d.pos.size
+
+
+def stage_units(stage: str, n_tickers: int, n_bars: int) -> int:
+    """
+    Work units of a case, known before its universe is generated (the same
+    numbers the stage functions return).
+    """
+    if stage in ("select_pairs", "select_pairs_prefilter"):
+        return n_tickers * (n_tickers - 1) // 2 * n_bars
+    if stage == "bootstrap":
+        return BOOTSTRAP_REPS * n_bars
+    return n_tickers // 2 * n_bars
+
+
+STAGES: dict[str, Callable[[_Inputs], tuple[Callable[[], Any], int]]] = {
+    "rolling_ols_beta": _rolling_ols_beta,
+    "rolling_ols_matrix": _rolling_ols_matrix,
+    "select_pairs": _select_pairs,
+    "select_pairs_prefilter": _select_pairs_prefilter,
+    "positions_from_z": _positions_from_z,
+    "positions_matrix": _positions_matrix,
+    "pair_returns": _pair_returns,
+    "backtest_matrix": _backtest_matrix,
+    "summarize": _summarize,
+    "summarize_matrix": _summarize_matrix,
+    "portfolio_inverse_vol": _portfolio("inverse_vol"),
+    "portfolio_risk_parity": _portfolio("risk_parity"),
+    "bootstrap": _bootstrap,
+    "stream_backtest": _stream,
+    "rolling_coint": _rolling_coint,
+    "execution_sim": _execution,
+    "kalman_matrix": _kalman,
+    "online_engine": _online,
+}
+
+
+def checksum(obj: Any) -> float:
+    """
+    Fingerprint of a stage result: sum of its finite values.
+    """
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        obj = obj.values
+    if isinstance(obj, (list, tuple)):
+        return float(sum(checksum(o) for o in obj))
+    a = np.asarray(obj, dtype=float)
+    return float(a[np.isfinite(a)].sum())
+
+
+def measure(thunk: Callable[[], Any], repeat: int) -> tuple[float, float, Any]:
+    """
+    (best wall seconds, peak traced MB, result). Timing runs are untraced.
+    """
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = thunk()
+        best = min(best, time.perf_counter() - t0)
+    del out
+    tracemalloc.start()
+    try:
+        out = thunk()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2**20, out
+
+
+def run_cases(
+    tickers: list[int],
+    bars: list[int],
+    stages: list[str],
+    repeat: int = 3,
+    seed: int = 0,
+    max_units: float = DEFAULT_MAX_UNITS,
+    max_cells: float = DEFAULT_MAX_CELLS,
+) -> list[Case]:
+    cases = []
+    for n_tickers in tickers:
+        for n_bars in bars:
+            # Decide what runs before building anything: the universe and its
+            # inputs are the expensive part of a big case.
+            if n_tickers * n_bars > max_cells:
+                print(f"{'*':<24} {n_tickers:>6} {n_bars:>9}  skipped ({n_tickers * n_bars:.2e} cells > --max_cells)")
+                continue
+            todo = []
+            for stage in stages:
+                units = stage_units(stage, n_tickers, n_bars)
+                if units > max_units:
+                    print(f"{stage:<24} {n_tickers:>6} {n_bars:>9}  skipped ({units:.2e} units > --max_units)")
+                else:
+                    todo.append(stage)
+            if not todo:
+                continue
+            prices, _ = synthetic_universe(n_tickers, n_bars, seed=seed)
+            inputs = _inputs(prices)
+            for stage in todo:
+                thunk, units = STAGES[stage](inputs)
+                seconds, peak_mb, out = measure(thunk, repeat)
+                case = Case(stage, n_tickers, n_bars, units, seconds, peak_mb, units / seconds, checksum(out))
+                print(
+                    f"{stage:<24} {n_tickers:>6} {n_bars:>9}  {seconds:>9.4f}s  "
+                    f"{peak_mb:>9.1f}MB  {case.throughput:>12.3e}/s"
+                )
+                cases.append(case)
+    return cases
+
+
+def compare(cases: list[Case], baseline: dict, tolerance: float) -> list[str]:
+    """
+    Regressions vs a saved baseline: slower or bigger by more than `tolerance`
+    (relative; time also needs MIN_SLACK_SECONDS absolute), or a different
+    checksum. Cases missing from the baseline are ignored.
+    """
+    old = {(c["stage"], c["tickers"], c["bars"]): c for c in baseline["cases"]}
+    problems = []
+    for c in cases:
+        ref = old.get((c.stage, c.tickers, c.bars))
+        if ref is None:
+            continue
+        name = f"{c.stage} [{c.tickers}x{c.bars}]"
+        if c.seconds > ref["seconds"] * (1 + tolerance) and c.seconds - ref["seconds"] > MIN_SLACK_SECONDS:
+            problems.append(f"{name}: time {ref['seconds']:.4f}s -> {c.seconds:.4f}s")
+        if c.peak_mb > ref["peak_mb"] * (1 + tolerance) and c.peak_mb - ref["peak_mb"] > 1.0:
+            problems.append(f"{name}: peak memory {ref['peak_mb']:.1f}MB -> {c.peak_mb:.1f}MB")
+        if not np.isclose(c.checksum, ref["checksum"], rtol=1e-9, atol=1e-9):
+            problems.append(f"{name}: checksum {ref['checksum']!r} -> {c.checksum!r}")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    p.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    p.add_argument("--tickers", type=str, default=None, help="comma-separated ticker counts (overrides preset)")
+    p.add_argument("--bars", type=str, default=None, help="comma-separated bar counts (overrides preset)")
+    p.add_argument("--stages", type=str, default=",".join(STAGES), help="comma-separated stage names")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--max_units", type=float, default=DEFAULT_MAX_UNITS, help="skip cases with more work units")
+    p.add_argument("--max_cells", type=float, default=DEFAULT_MAX_CELLS, help="skip universes with more tickers x bars")
+    p.add_argument("--save", type=str, default=None, help="write results JSON here")
+    p.add_argument("--baseline", type=str, default=None, help="compare against this results JSON")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    args = p.parse_args(argv)
+
+    tickers, bars = PRESETS[args.preset]
+    if args.tickers:
+        tickers = [int(t) for t in args.tickers.split(",")]
+    if args.bars:
+        bars = [int(b) for b in args.bars.split(",")]
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        p.error(f"unknown stages: {sorted(unknown)}")
+
+    print(f"{'stage':<24} {'tickers':>6} {'bars':>9}  {'time':>10}  {'peak':>11}  {'throughput':>14}")
+    cases = run_cases(
+        tickers, bars, stages, repeat=args.repeat, seed=args.seed, max_units=args.max_units, max_cells=args.max_cells,
+    )
+
+    if args.save:
+        meta = {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "seed": args.seed,
+        }
+        with open(args.save, "w") as fh:
+            json.dump({"meta": meta, "cases": [asdict(c) for c in cases]}, fh, indent=1)
+        print(f"Saved: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            problems = compare(cases, json.load(fh), args.tolerance)
+        for msg in problems:
+            print(f"REGRESSION {msg}")
+        if problems:
+            return 1
+        print(f"No regressions vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
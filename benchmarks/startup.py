@@ -0,0 +1,94 @@
+"""
+Import-time budget for the CLI: how long `import pairs_trading.cli` takes in
+a fresh interpreter, which modules dominate it, and whether any of the
+dependencies that should only load in the stage that needs them got pulled
+in at import.
+
+  python -m benchmarks.startup
+  python -m benchmarks.startup --budget 0.5 --top 20    # exit 1 when over budget
+
+Times are best-of-`repeat` wall seconds of `python -c "import <module>"`
+minus a bare `python -c pass`, so interpreter startup is not counted.
+"""
+from __future__ import annotations
+
+import argparse
+import subprocess
+import sys
+import time
+
+# Loaded lazily by the stages that use them; importing the CLI must not pull them in.
+DEFERRED = ("statsmodels", "scipy", "yfinance", "tqdm", "matplotlib", "numba")
+
+DEFAULT_BUDGET = 1.0  # seconds, import only
+
+
+def _wall(code: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def import_seconds(module: str, repeat: int = 5) -> float:
+    """
+    Best-of-`repeat` seconds to import `module` in a fresh interpreter, net of startup.
+    """
+    return max(_wall(f"import {module}", repeat) - _wall("pass", repeat), 0.0)
+
+
+def loaded_deferred(module: str) -> list[str]:
+    """
+    Top-level packages from DEFERRED that are in sys.modules after importing `module`.
+    """
+    code = f"import sys, {module}; print(','.join(sorted({{m.split('.')[0] for m in sys.modules}} & {set(DEFERRED)!r})))"
+    out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+    return out.split(",") if out else []
+
+
+def slowest_imports(module: str, top: int = 15) -> list[tuple[str, float, float]]:
+    """
+    (module, self seconds, cumulative seconds) of the `top` slowest imports
+    under `python -X importtime`, by cumulative time.
+    """
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:") :].split("|")
+        rows.append((name.strip(), int(self_us) / 1e6, int(cum_us) / 1e6))
+    return sorted(rows, key=lambda r: -r[2])[:top]
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Import-time budget of the CLI.")
+    p.add_argument("--module", type=str, default="pairs_trading.cli")
+    p.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="max import seconds (net of interpreter startup)")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    args = p.parse_args(argv)
+
+    seconds = import_seconds(args.module, args.repeat)
+    leaked = loaded_deferred(args.module)
+    print(f"import {args.module}: {seconds:.3f}s (budget {args.budget:.3f}s)")
+    print(f"{'module':<50} {'self_s':>8} {'cum_s':>8}")
+    for name, self_s, cum_s in slowest_imports(args.module, args.top):
+        print(f"{name:<50} {self_s:>8.3f} {cum_s:>8.3f}")
+
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import took {seconds:.3f}s > budget {args.budget:.3f}s")
+    if leaked:
+        failures.append(f"deferred dependencies imported eagerly: {', '.join(leaked)}")
+    for f in failures:
+        print("FAIL:", f)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+from scipy.signal import lfilter
+
+# Daily business-day index runs out of pandas' Timestamp range a bit past 60k bars.
+MAX_DAILY_BARS = 50_000
+
+
+def synthetic_universe(
+    n_tickers: int,
+    n_bars: int,
+    coint_frac: float = 0.5,
+    seed: int = 0,
+    vol: float = 0.01,
+    spread_phi: float = 0.95,
+    spread_vol: float = 0.005,
+) -> tuple[pd.DataFrame, list[tuple[str, str]]]:
+    """
+    Seeded price panel of cointegrated pairs plus independent random walks.
+
+    The first round(n_tickers * coint_frac / 2) * 2 tickers come in pairs
+    (y, x) with
+      log x_t = f_t                                (f: random walk, step sd = vol)
+      log y_t = a + b * f_t + u_t                  (u: AR(1), phi = spread_phi)
+    the rest are independent log random walks. Prices start around 100.
+
+    Index is business days from 2000-01-03, or 1-minute bars when n_bars is
+    above MAX_DAILY_BARS. Returns (prices, true cointegrated pairs as (y, x)).
+    """
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:04d}" for i in range(n_tickers)]
+    n_coint = int(round(n_tickers * coint_frac / 2)) * 2
+    freq = "B" if n_bars <= MAX_DAILY_BARS else "min"
+    index = pd.date_range("2000-01-03", periods=n_bars, freq=freq)
+
+    logp = np.empty((n_bars, n_tickers))
+    logp[:] = rng.normal(0.0, vol, size=(n_bars, n_tickers))
+    np.cumsum(logp, axis=0, out=logp)
+    logp += np.log(100.0) + rng.normal(0.0, 0.5, size=n_tickers)
+
+    # Overwrite each y leg with a loading on its x leg plus a stationary spread.
+    n_pairs = n_coint // 2
+    if n_pairs:
+        eps = rng.normal(0.0, spread_vol, size=(n_bars, n_pairs))
+        eps[0] /= np.sqrt(1.0 - spread_phi**2)  # start from the stationary distribution
+        u = lfilter([1.0], [1.0, -spread_phi], eps, axis=0)
+        b = rng.uniform(0.5, 1.5, size=n_pairs)
+        a = np.log(100.0) * (1.0 - b) + rng.normal(0.0, 0.2, size=n_pairs)
+        iy = np.arange(0, n_coint, 2)
+        ix = iy + 1
+        logp[:, iy] = a + b * logp[:, ix] + u
+
+    prices = pd.DataFrame(np.exp(logp, out=logp), index=index, columns=tickers)
+    pairs = [(tickers[i], tickers[i + 1]) for i in range(0, n_coint, 2)]
+    return prices, pairs
@@ -1,7 +1,19 @@
+import argparse
+
 from pairs_trading.config import StrategyConfig
 from pairs_trading.cli import run
 
 if __name__ == "__main__":
-    cfg = StrategyConfig(start="2018-01-01", end=None, max_pairs=10)
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--profile", type=str, nargs="?", const="outputs/profile", default=None, metavar="DIR")
+    ap.add_argument("--cache_dir", type=str, default="data/cache/memo", help="On-disk memo of stats results reused across runs")
+    ap.add_argument("--cache_max_mb", type=int, default=StrategyConfig.cache_max_mb, help="LRU eviction budget for --cache_dir")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the on-disk memo (always recompute)")
+    args = ap.parse_args()
+
+    cfg = StrategyConfig(
+        start="2018-01-01", end=None, max_pairs=10, profile_dir=args.profile,
+        cache_dir=None if args.no_cache else args.cache_dir, cache_max_mb=args.cache_max_mb,
+    )
     tickers = ["MSFT", "AAPL", "GOOG", "AMZN", "META", "NVDA", "JPM", "BAC"]
     run(cfg, tickers)
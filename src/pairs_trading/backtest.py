@@ -1,157 +1,185 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
 import numpy as np
 import pandas as pd
 
-def pair_returns_from_spread_position(
-    price_y: pd.Series,
-    price_x: pd.Series,
-    beta: pd.Series,
-    spread_pos: pd.Series,
+from .panel import PricePanel
+from .profiling import timed
+from .stats import align_pair
+
+if TYPE_CHECKING:
+    from .ledger import TradeLedger
+
+BACKTEST_FIELDS = ("ret_gross", "ret_net", "wy", "wx", "turnover", "cost")
+
+@dataclass
+class MatrixBacktest:
+    """
+    Backtest output for many pairs; every field is a (n_obs, n_pairs) array.
+    """
+    ret_gross: np.ndarray
+    ret_net: np.ndarray
+    wy: np.ndarray
+    wx: np.ndarray
+    turnover: np.ndarray
+    cost: np.ndarray
+    index: pd.Index | None = None
+    pairs: list[str] | None = None
+
+    def pair_frame(self, j: int) -> pd.DataFrame:
+        """
+        Column j as the DataFrame pair_returns_from_spread_position returns.
+        """
+        return pd.DataFrame({f: getattr(self, f)[:, j] for f in BACKTEST_FIELDS}, index=self.index)
+
+    def frame(self, field: str = "ret_net") -> pd.DataFrame:
+        """
+        One field for all pairs (index x pairs).
+        """
+        return pd.DataFrame(getattr(self, field), index=self.index, columns=self.pairs)
+
+def ticker_returns(prices: np.ndarray) -> np.ndarray:
+    """
+    Simple returns per column (pct_change without filling), first row NaN.
+    """
+    rets = np.full(prices.shape, np.nan)
+    rets[1:] = prices[1:] / prices[:-1] - 1
+    return rets
+
+def _lag(a: np.ndarray) -> np.ndarray:
+    out = np.full(a.shape, np.nan)
+    out[1:] = a[:-1]
+    return out
+
+def backtest_matrix(
+    prices: np.ndarray | pd.DataFrame | PricePanel,
+    pair_index: np.ndarray,
+    beta: np.ndarray,
+    spread_pos: np.ndarray,
     fee_bps_per_leg: float = 1.0,
     slippage_bps_per_leg: float = 0.0,
     gross_leverage: float = 1.0,
-) -> pd.DataFrame:
+    index: pd.Index | None = None,
+    pairs: list[str] | None = None,
+) -> MatrixBacktest:
     """
-    Constructs a dollar-neutral pair:
-      - If spread_pos = +1 (long spread): long Y, short beta*X
-      - If spread_pos = -1 (short spread): short Y, long beta*X
+    pair_returns_from_spread_position for a whole universe at once.
 
-    We trade returns on next day (position shifted by 1).
-    Costs applied on changes in leg positions (turnover proxy).
+    prices: (n_obs, n_tickers) price panel on a shared index (array, frame or
+            PricePanel, e.g. float32)
+    pair_index: (n_pairs, 2) column numbers of (y, x) for each pair
+    beta, spread_pos: (n_obs, n_pairs)
 
-    Notes:
-      - This uses *simple returns* and a normalized notional exposure:
-        y_weight = spread_pos
-        x_weight = -spread_pos * beta
-      - Then weights are scaled to meet gross leverage target using
-        |y| + |x| per day.
+    Ticker returns are computed once, in float64, for the tickers the pairs
+    use and gathered per leg, so a ticker shared by many pairs is not
+    re-differenced. Same arithmetic (and operation order) as the per-pair
+    function, so results are identical.
     """
-    y, x = price_y.align(price_x, join="inner")
-    b = beta.reindex(y.index)
-    p = spread_pos.reindex(y.index)
-
-    rety = y.pct_change()
-    retx = x.pct_change()
+    if isinstance(prices, (pd.DataFrame, PricePanel)):
+        index = prices.index if index is None else index
+        prices = prices.values
+    pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+    b = np.asarray(beta, dtype=float)
+    p = np.asarray(spread_pos, dtype=float)
+
+    used, legs = np.unique(pair_index, return_inverse=True)
+    legs = legs.reshape(-1, 2)
+    rets = ticker_returns(np.asarray(prices[:, used], dtype=float))
+    rety = rets[:, legs[:, 0]]
+    retx = rets[:, legs[:, 1]]
 
     # Raw (unscaled) weights
     wy = p
     wx = -p * b
 
-    gross = (wy.abs() + wx.abs()).replace(0.0, np.nan)
+    gross = np.abs(wy) + np.abs(wx)
+    gross[gross == 0.0] = np.nan
     scale = gross_leverage / gross
     wy_s = wy * scale
     wx_s = wx * scale
 
     # Use yesterday's weights for today's returns
-    wy_lag = wy_s.shift(1)
-    wx_lag = wx_s.shift(1)
+    wy_lag = _lag(wy_s)
+    wx_lag = _lag(wx_s)
 
     gross_ret = (wy_lag * rety) + (wx_lag * retx)
 
     # Transaction costs based on weight changes (turnover)
-    dwy = (wy_s - wy_s.shift(1)).abs()
-    dwx = (wx_s - wx_s.shift(1)).abs()
+    dwy = np.abs(wy_s - wy_lag)
+    dwx = np.abs(wx_s - wx_lag)
 
     bps_total = fee_bps_per_leg + slippage_bps_per_leg
-    cost = (dwy + dwx) * (bps_total / 10_000.0)
+    turnover = dwy + dwx
+    cost = turnover * (bps_total / 10_000.0)
 
     net_ret = gross_ret - cost
 
-    out = pd.DataFrame(
-        {
-            "ret_gross": gross_ret,
-            "ret_net": net_ret,
-            "wy": wy_s,
-            "wx": wx_s,
-            "turnover": dwy + dwx,
-            "cost": cost,
-        }
+    return MatrixBacktest(
+        ret_gross=gross_ret,
+        ret_net=net_ret,
+        wy=wy_s,
+        wx=wx_s,
+        turnover=turnover,
+        cost=cost,
+        index=index,
+        pairs=pairs,
     )
-    return out
 
-def equal_weight_portfolio(returns_by_pair: dict[str, pd.Series]) -> pd.Series:
+@timed
+def pair_returns_from_spread_position(
+    price_y: pd.Series,
+    price_x: pd.Series,
+    beta: pd.Series,
+    spread_pos: pd.Series,
+    fee_bps_per_leg: float = 1.0,
+    slippage_bps_per_leg: float = 0.0,
+    gross_leverage: float = 1.0,
+) -> pd.DataFrame:
+    """
+    Constructs a dollar-neutral pair:
+      - If spread_pos = +1 (long spread): long Y, short beta*X
+      - If spread_pos = -1 (short spread): short Y, long beta*X
+
+    We trade returns on next day (position shifted by 1).
+    Costs applied on changes in leg positions (turnover proxy).
+
+    Notes:
+      - This uses *simple returns* and a normalized notional exposure:
+        y_weight = spread_pos
+        x_weight = -spread_pos * beta
+      - Then weights are scaled to meet gross leverage target using
+        |y| + |x| per day.
+    """
+    y, x = align_pair(price_y, price_x)
+    b = beta if beta.index is y.index else beta.reindex(y.index)
+    p = spread_pos if spread_pos.index is y.index else spread_pos.reindex(y.index)
+
+    bt = backtest_matrix(
+        np.column_stack([y.values, x.values]),
+        np.array([[0, 1]]),
+        b.values[:, None],
+        p.values[:, None],
+        fee_bps_per_leg=fee_bps_per_leg,
+        slippage_bps_per_leg=slippage_bps_per_leg,
+        gross_leverage=gross_leverage,
+        index=y.index,
+    )
+    return bt.pair_frame(0)
+
+@timed(rows=lambda returns_by_pair: len(returns_by_pair))
+def equal_weight_portfolio(returns_by_pair: dict[str, pd.Series] | TradeLedger) -> pd.Series:
     """
     Equal-weight across pairs each day, ignoring NaNs.
+    Also accepts a TradeLedger (daily net returns are rebuilt from its trades).
     """
+    from .ledger import TradeLedger  # ledger builds on this module
+
+    if isinstance(returns_by_pair, TradeLedger):
+        return returns_by_pair.portfolio_returns()
     df = pd.DataFrame(returns_by_pair)
     port = df.mean(axis=1, skipna=True)
     port.name = "portfolio_ret"
     return port
-
-from __future__ import annotations
-
-from pathlib import Path
-import pandas as pd
-
-from pairs_trading.backtest import pair_returns_from_spread_position, equal_weight_portfolio
-from pairs_trading.plotting import plot_equity_and_drawdown
-
-
-def main() -> None:
-    # ---- Paths (adjust to your repo conventions) ----
-    reports_dir = Path("reports")
-    figures_dir = reports_dir / "figures"
-    figures_dir.mkdir(parents=True, exist_ok=True)
-
-    # ---- Load inputs (YOU wire these to your actual artifacts) ----
-    # Expected: prices.csv with columns: date, ticker, close  OR wide format with tickers as columns
-    # Expected: signals for each pair: beta + spread_pos indexed by date
-    #
-    # For now, this is a template showing the exact flow.
-
-    # Example placeholders (replace with your real loading code):
-    prices = pd.read_csv("data/prices_wide.csv", index_col=0, parse_dates=True)
-
-    beta_nvda_jpm = pd.read_csv("data/beta_NVDA_JPM.csv", index_col=0, parse_dates=True).iloc[:, 0]
-    pos_nvda_jpm  = pd.read_csv("data/pos_NVDA_JPM.csv",  index_col=0, parse_dates=True).iloc[:, 0]
-
-    beta_amzn_meta = pd.read_csv("data/beta_AMZN_META.csv", index_col=0, parse_dates=True).iloc[:, 0]
-    pos_amzn_meta  = pd.read_csv("data/pos_AMZN_META.csv",  index_col=0, parse_dates=True).iloc[:, 0]
-
-    # ---- Per-pair returns ----
-    nvda_jpm = pair_returns_from_spread_position(
-        price_y=prices["NVDA"],
-        price_x=prices["JPM"],
-        beta=beta_nvda_jpm,
-        spread_pos=pos_nvda_jpm,
-        fee_bps_per_leg=1.0,
-        slippage_bps_per_leg=0.0,
-        gross_leverage=1.0,
-    )
-
-    amzn_meta = pair_returns_from_spread_position(
-        price_y=prices["AMZN"],
-        price_x=prices["META"],
-        beta=beta_amzn_meta,
-        spread_pos=pos_amzn_meta,
-        fee_bps_per_leg=1.0,
-        slippage_bps_per_leg=0.0,
-        gross_leverage=1.0,
-    )
-
-    # ---- Portfolio ----
-    returns_by_pair = {
-        "NVDA__JPM": nvda_jpm["ret_net"],
-        "AMZN__META": amzn_meta["ret_net"],
-    }
-    portfolio_ret = equal_weight_portfolio(returns_by_pair)
-
-    # ---- Export portfolio returns ----
-    out_csv = reports_dir / "portfolio_ret.csv"
-    portfolio_ret.to_frame(name="portfolio_ret").to_csv(out_csv, index_label="date")
-
-    # ---- Plot ----
-    equity, dd = plot_equity_and_drawdown(portfolio_ret, title="Pairs Trading (Net Returns)", show=False)
-
-    # If your plotting util already saves, great; if not, save here.
-    # Example (only if plot_equity_and_drawdown returns fig objects in your implementation):
-    # fig1.savefig(figures_dir / "equity_curve.png", dpi=200, bbox_inches="tight")
-    # fig2.savefig(figures_dir / "drawdown.png", dpi=200, bbox_inches="tight")
-
-    print(f"Saved: {out_csv}")
-    print("Done.")
-
-
-if __name__ == "__main__":
-    main()
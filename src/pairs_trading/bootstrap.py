@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import StrategyConfig
+from .ledger import TradeLedger, as_returns
+from .metrics import TRADING_DAYS, periods_per_year, summarize_matrix
+from .parallel import map_shared, shared_array
+from .portfolio import Portfolio, portfolio_from_config
+from .profiling import timed
+
+METHODS = ("stationary", "block")
+
+# Metrics of metrics.summarize (turnover cannot be resampled from returns alone).
+BOOTSTRAP_METRICS = ("annualized_return", "sharpe", "max_drawdown", "win_rate", "sortino", "calmar")
+
+
+def stationary_indices(rng: np.random.Generator, n_obs: int, n_reps: int, mean_block: float) -> np.ndarray:
+    """
+    (n_obs, n_reps) row indices of Politis-Romano stationary bootstrap samples:
+    blocks start at a uniform random row and continue (wrapping around) with
+    probability 1 - 1/mean_block per bar, so block lengths are geometric.
+    """
+    t = np.arange(n_obs)[:, None]
+    new = rng.random((n_obs, n_reps)) < 1.0 / mean_block
+    new[0] = True
+    starts = rng.integers(0, n_obs, (n_obs, n_reps))
+    # Row of the current block's start, per bar.
+    first = np.maximum.accumulate(np.where(new, t, 0), axis=0)
+    return (np.take_along_axis(starts, first, axis=0) + t - first) % n_obs
+
+
+def block_indices(rng: np.random.Generator, n_obs: int, n_reps: int, block: int) -> np.ndarray:
+    """
+    (n_obs, n_reps) row indices of circular moving-block bootstrap samples
+    (fixed blocks of `block` consecutive rows).
+    """
+    block = max(int(block), 1)
+    t = np.arange(n_obs)[:, None]
+    starts = rng.integers(0, n_obs, (-(-n_obs // block), n_reps))
+    return (np.repeat(starts, block, axis=0)[:n_obs] + t % block) % n_obs
+
+
+def _bootstrap_task(task: tuple[np.random.SeedSequence, int, str, float, float]) -> np.ndarray:
+    seed, n_reps, method, block, per_year = task
+    r = shared_array()
+    rng = np.random.default_rng(seed)
+    draw = stationary_indices if method == "stationary" else block_indices
+    idx = draw(rng, len(r), n_reps, block)
+    return summarize_matrix(r[idx], periods_per_year=per_year)[list(BOOTSTRAP_METRICS)].values
+
+
+@dataclass
+class BootstrapResult:
+    """
+    Bootstrap distribution of each BOOTSTRAP_METRICS column (one row per
+    replication) and its value on the original sample (as metrics.summarize).
+    """
+    samples: pd.DataFrame
+    point: pd.Series
+    method: str
+    block: float
+
+    def intervals(self, level: float = 0.95) -> pd.DataFrame:
+        """
+        Per metric: point estimate, bootstrap mean / std and the percentile
+        interval at `level` (NaN replications ignored).
+        """
+        lo, hi = (1.0 - level) / 2, (1.0 + level) / 2
+        s = self.samples
+        return pd.DataFrame({
+            "point": self.point,
+            "mean": s.mean(),
+            "std": s.std(ddof=1),
+            "lower": s.quantile(lo),
+            "upper": s.quantile(hi),
+        }).rename_axis("metric")
+
+    def save(self, out_dir: str | Path, level: float = 0.95) -> dict[str, Path]:
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        paths = {
+            "samples": out / "bootstrap_samples.csv",
+            "intervals": out / "bootstrap_intervals.csv",
+        }
+        self.samples.to_csv(paths["samples"], index_label="replication")
+        self.intervals(level).to_csv(paths["intervals"])
+        return paths
+
+
+@timed(rows=lambda returns, n_reps=10_000, *args, **kwargs: n_reps)
+def bootstrap_metrics(
+    returns: pd.Series | np.ndarray | Portfolio | TradeLedger,
+    n_reps: int = 10_000,
+    method: str = "stationary",
+    block: float | None = None,
+    batch_size: int = 500,
+    seed: int = 0,
+    workers: int = 1,
+    periods_per_year: float = TRADING_DAYS,
+) -> BootstrapResult:
+    """
+    Resample a portfolio return series `n_reps` times and score every
+    replication with metrics.summarize_matrix.
+
+    method:
+      - "stationary": stationary bootstrap, mean block length `block`
+      - "block":      circular moving-block bootstrap, block length `block`
+    `block` defaults to n_obs ** (1/3). Bars without a return (warmup) are
+    dropped first. Blocks keep the short-range autocorrelation of the returns;
+    with portfolio returns, each bar keeps all of its pairs together.
+
+    Replications are drawn in batches of `batch_size` index arrays, each from
+    its own child of SeedSequence(seed), and batches run through map_shared,
+    so the samples depend on `seed` and `batch_size` but not on `workers`.
+    `periods_per_year` is the annualization factor (see metrics.periods_per_year).
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown bootstrap method: {method!r} (choose from {', '.join(METHODS)})")
+    if isinstance(returns, Portfolio):
+        returns = returns.returns
+    elif isinstance(returns, TradeLedger):
+        returns = as_returns(returns)
+    raw = np.asarray(returns, dtype=float).ravel()
+    r = np.ascontiguousarray(raw[np.isfinite(raw)])
+    if len(r) < 2:
+        raise ValueError("bootstrap_metrics needs at least two returns")
+    if block is None:
+        block = max(1.0, round(len(r) ** (1 / 3)))
+
+    sizes = [min(batch_size, n_reps - i) for i in range(0, n_reps, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(s, k, method, block, periods_per_year) for s, k in zip(seeds, sizes)]
+    batches = list(map_shared(_bootstrap_task, tasks, r, workers=workers))
+
+    samples = pd.DataFrame(
+        np.vstack(batches) if batches else np.empty((0, len(BOOTSTRAP_METRICS))),
+        columns=list(BOOTSTRAP_METRICS),
+    )
+    point = summarize_matrix(raw, periods_per_year=periods_per_year)[list(BOOTSTRAP_METRICS)].iloc[0]
+    point.name = "point"
+    return BootstrapResult(samples, point, method, float(block))
+
+
+def bootstrap_portfolio(
+    pair_returns: dict[str, pd.Series] | pd.DataFrame | np.ndarray,
+    cfg: StrategyConfig,
+    **kwargs,
+) -> BootstrapResult:
+    """
+    bootstrap_metrics of the per-pair return matrix combined as in `cfg`
+    (portfolio_from_config). Weights are set once on the original sample and
+    stay attached to their bar, so resampling bars of the portfolio resamples
+    whole rows of the pair matrix.
+    """
+    kwargs.setdefault("n_reps", cfg.bootstrap_reps or 10_000)
+    kwargs.setdefault("method", cfg.bootstrap_method)
+    kwargs.setdefault("block", cfg.bootstrap_block)
+    kwargs.setdefault("workers", cfg.workers)
+    kwargs.setdefault("periods_per_year", periods_per_year(cfg.bar_freq))
+    return bootstrap_metrics(portfolio_from_config(pair_returns, cfg), **kwargs)
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import dataclasses
+import functools
+import hashlib
+import inspect
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+# The active cache is described by environment variables so that process-pool
+# workers (fork or spawn) pick up the same store as the parent.
+ENV_DIR = "PAIRS_TRADING_CACHE_DIR"
+ENV_MAX_BYTES = "PAIRS_TRADING_CACHE_MAX_BYTES"
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+# File suffix per stored result kind.
+_SUFFIX = {
+    "series": ".series.parquet",
+    "frame": ".frame.parquet",
+    "array": ".array.npy",
+    "scalar": ".scalar.npy",
+}
+_SERIES_COL = "__series__"  # column name used for unnamed Series
+
+# Memoized functions by qualified name.
+REGISTRY: dict[str, Callable[..., Any]] = {}
+
+DIST_NAME = "pairs-trading-stat-arb"
+
+
+@functools.lru_cache(maxsize=None)
+def package_fingerprint() -> str:
+    """
+    Hash of the installed version and of every module of this package. Part
+    of every memo key: a result also depends on the code its function calls
+    (rolling_ols under rolling_ols_beta, ...), so any source change starts
+    from a fresh key space.
+    """
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        v = version(DIST_NAME)
+    except PackageNotFoundError:
+        v = "unknown"
+    h = hashlib.blake2b(v.encode(), digest_size=20)
+    for p in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(p.name.encode())
+        h.update(p.read_bytes())
+    return h.hexdigest()
+
+
+def _feed(h: "hashlib._Hash", obj: Any) -> None:
+    """
+    Stream a canonical byte encoding of `obj` into hash `h`.
+    """
+    if isinstance(obj, pd.DataFrame):
+        h.update(b"DataFrame")
+        _feed(h, obj.index)
+        _feed(h, list(obj.columns))
+        _feed(h, [str(t) for t in obj.dtypes])
+        for c in range(obj.shape[1]):
+            _feed(h, obj.iloc[:, c].to_numpy())
+    elif isinstance(obj, pd.Series):
+        h.update(b"Series")
+        _feed(h, obj.name)
+        _feed(h, obj.index)
+        _feed(h, obj.to_numpy())
+    elif isinstance(obj, pd.Index):
+        h.update(b"Index")
+        _feed(h, obj.name)
+        _feed(h, obj.asi8 if isinstance(obj, pd.DatetimeIndex) else obj.to_numpy())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"ndarray{obj.dtype.str}{obj.shape}".encode())
+        if obj.dtype.hasobject:
+            h.update(repr(obj.tolist()).encode())
+        else:
+            h.update(np.ascontiguousarray(obj).data)
+    elif dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        h.update(type(obj).__qualname__.encode())
+        _feed(h, dataclasses.asdict(obj))
+    elif isinstance(obj, dict):
+        h.update(b"dict")
+        for k in sorted(obj, key=repr):
+            _feed(h, k)
+            _feed(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for o in obj:
+            _feed(h, o)
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+
+
+def _kind(value: Any) -> str | None:
+    if isinstance(value, pd.Series):
+        return "series"
+    if isinstance(value, pd.DataFrame):
+        # Parquet needs string column labels.
+        return "frame" if all(isinstance(c, str) for c in value.columns) else None
+    if isinstance(value, np.ndarray):
+        return None if value.dtype.hasobject else "array"
+    if isinstance(value, (float, int, np.floating, np.integer)) and not isinstance(value, bool):
+        return "scalar"
+    return None
+
+
+class MemoCache:
+    """
+    Content-addressed store of function results under `root`.
+
+    Each entry is one file <root>/<key[:2]>/<key><suffix>: Series/DataFrames as
+    Parquet, arrays and scalars as .npy. Files are written atomically and
+    never modified, so several processes can share a root. A file's mtime is
+    its last use; once the store grows past `max_bytes` the least recently
+    used files are deleted.
+    """
+
+    def __init__(self, root: str | Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._bytes = sum(size for _, size, _ in self._entries())
+
+    def _entries(self) -> list[tuple[Path, int, float]]:
+        out = []
+        for p in self.root.glob("*/*"):
+            if p.name.endswith(".tmp"):
+                continue
+            try:
+                st = p.stat()
+            except FileNotFoundError:  # evicted by another process
+                continue
+            out.append((p, st.st_size, st.st_mtime))
+        return out
+
+    def _path(self, key: str, kind: str) -> Path:
+        return self.root / key[:2] / f"{key}{_SUFFIX[kind]}"
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        for kind in _SUFFIX:
+            p = self._path(key, kind)
+            try:
+                value = self._load(p, kind)
+            except FileNotFoundError:
+                continue
+            try:
+                os.utime(p)
+            except FileNotFoundError:
+                pass
+            return True, value
+        return False, None
+
+    @staticmethod
+    def _load(p: Path, kind: str) -> Any:
+        if kind == "series":
+            df = pd.read_parquet(p)
+            s = df.iloc[:, 0]
+            s.name = None if df.columns[0] == _SERIES_COL else df.columns[0]
+            return s
+        if kind == "frame":
+            return pd.read_parquet(p)
+        a = np.load(p, allow_pickle=False)
+        return a.item() if kind == "scalar" else a
+
+    def put(self, key: str, value: Any) -> bool:
+        """
+        Store `value`; returns False for result types the cache does not handle.
+        """
+        kind = _kind(value)
+        if kind is None:
+            return False
+        p = self._path(key, kind)
+        p.parent.mkdir(exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.tmp")
+        if kind == "series":
+            name = _SERIES_COL if value.name is None else str(value.name)
+            value.to_frame(name=name).to_parquet(tmp)
+        elif kind == "frame":
+            value.to_parquet(tmp)
+        else:
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.asarray(value), allow_pickle=False)
+        os.replace(tmp, p)
+        self._bytes += p.stat().st_size
+        if self._bytes > self.max_bytes:
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until under max_bytes. Returns bytes freed.
+        """
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for p, size, _ in entries:
+            if total - freed <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            freed += size
+        self._bytes = total - freed
+        return freed
+
+    def clear(self) -> None:
+        for p, _, _ in self._entries():
+            p.unlink(missing_ok=True)
+        self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Hits/misses per memoized function in this process.
+        """
+        names = sorted(set(self.hits) | set(self.misses))
+        df = pd.DataFrame(
+            {"function": names, "hits": [self.hits[n] for n in names], "misses": [self.misses[n] for n in names]}
+        )
+        df["hit_rate"] = df["hits"] / (df["hits"] + df["misses"]).where(lambda n: n > 0)
+        return df
+
+
+_active: MemoCache | None = None
+
+
+def configure(root: str | Path | None, max_bytes: int = DEFAULT_MAX_BYTES) -> MemoCache | None:
+    """
+    Turn memoization on under `root` (None turns it off) for this process and
+    for worker processes started afterwards.
+    """
+    global _active
+    if root is None:
+        os.environ.pop(ENV_DIR, None)
+        os.environ.pop(ENV_MAX_BYTES, None)
+        _active = None
+        return None
+    os.environ[ENV_DIR] = str(root)
+    os.environ[ENV_MAX_BYTES] = str(int(max_bytes))
+    _active = MemoCache(root, max_bytes)
+    return _active
+
+
+def active() -> MemoCache | None:
+    """
+    The cache for this process, created on first use from the environment.
+    """
+    global _active
+    root = os.environ.get(ENV_DIR)
+    if root is None:
+        return None
+    if _active is None or str(_active.root) != root:
+        _active = MemoCache(root, int(os.environ.get(ENV_MAX_BYTES, DEFAULT_MAX_BYTES)))
+    return _active
+
+
+def memoize(func: Callable[..., Any] | None = None, *, ignore: tuple[str, ...] = (), version: int = 0):
+    """
+    Decorator: cache results on disk keyed by a hash of the function's source,
+    the package fingerprint (version + all module sources), an explicit
+    `version` salt (bump it when the result changes for reasons outside this
+    package, e.g. a dependency upgrade) and the bound arguments (defaults
+    applied; names in `ignore` excluded, e.g. progress or worker counts that
+    do not change the result).
+    A no-op pass-through while no cache is configured.
+    """
+    if func is None:
+        return functools.partial(memoize, ignore=ignore, version=version)
+
+    sig = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+    try:
+        salt = inspect.getsource(func)
+    except (OSError, TypeError):
+        salt = name
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        cache = active()
+        if cache is None:
+            return func(*args, **kwargs)
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        h = hashlib.blake2b(digest_size=20)
+        h.update(name.encode())
+        h.update(salt.encode())
+        h.update(f"{package_fingerprint()}:{version}".encode())
+        _feed(h, {k: v for k, v in bound.arguments.items() if k not in ignore})
+        key = h.hexdigest()
+
+        hit, value = cache.get(key)
+        if hit:
+            cache.hits[name] += 1
+            return value
+        cache.misses[name] += 1
+        value = func(*args, **kwargs)
+        cache.put(key, value)
+        return value
+
+    REGISTRY[name] = wrapper
+    return wrapper
@@ -1,88 +1,192 @@
 from __future__ import annotations
 
 import argparse
+import os
+import sys
 from dataclasses import asdict
 from itertools import combinations
 
 import pandas as pd
-from tqdm import tqdm
 
-from .config import StrategyConfig
-from .data import fetch_adj_close, align_prices
-from .stats import engle_granger_coint_pvalue, rolling_ols_beta, adf_pvalue
-from .signals import compute_spread, rolling_zscore, positions_from_z
-from .backtest import pair_returns_from_spread_position, equal_weight_portfolio
-from .metrics import summarize, equity_curve
+from . import cache, profiling
+from .config import StrategyConfig, WalkForwardConfig
+from .data import fetch_adj_close, align_panel
+from .ingest import AsyncIngestor
+from .store import PriceStore, YFinanceSource
+from .stats import adf_pvalue
+from .screening import batch_coint_pvalues
+from .signals import hedge_ratio, compute_spread, rolling_zscore, positions_from_z
+from .backtest import pair_returns_from_spread_position
+from .bootstrap import METHODS as BOOTSTRAP_METHODS, bootstrap_portfolio
+from .metrics import equity_curve, periods_per_year, summarize
+from .filters import monitor_pvalues, trade_allowed
+from .parallel import chunked, map_shared, shared_frame
+from .portfolio import WEIGHTINGS, portfolio_from_config
+from .prefilter import prefilter_pairs
+from .profiling import span, timed
+from .walkforward import run_walkforward
+from .stability import MONITOR_TESTS
+from .sweep import parse_grid, run_sweep, screening_config
+
+# Pairs per process-pool task in run(); fixed so results never depend on --workers.
+PAIRS_PER_TASK = 4
 
 def select_pairs(prices: pd.DataFrame, cfg: StrategyConfig) -> pd.DataFrame:
     tickers = list(prices.columns)
-    rows = []
-    for a, b in tqdm(list(combinations(tickers, 2)), desc="Cointegration tests"):
-        y = prices[a]
-        x = prices[b]
-        both = y.notna() & x.notna()
-        if both.sum() < cfg.min_overlap_days:
-            continue
-        p = engle_granger_coint_pvalue(y, x)
-        rows.append((a, b, p))
-    out = pd.DataFrame(rows, columns=["A", "B", "coint_pvalue"]).dropna()
+    valid = prices.notna().values.astype(float)
+    overlap = valid.T @ valid
+    col = {t: i for i, t in enumerate(tickers)}
+    candidates = [
+        (a, b)
+        for a, b in combinations(tickers, 2)
+        if overlap[col[a], col[b]] >= cfg.min_overlap_days
+    ]
+    if cfg.prefilter:
+        n_candidates = len(candidates)
+        candidates, _ = prefilter_pairs(
+            prices, candidates,
+            min_level_corr=cfg.prefilter_min_level_corr,
+            min_return_corr=cfg.prefilter_min_return_corr,
+            max_half_life=cfg.prefilter_max_half_life,
+            n_clusters=cfg.prefilter_clusters,
+        )
+    out = batch_coint_pvalues(prices, candidates, workers=cfg.workers).dropna()
     out = out.sort_values("coint_pvalue")
-    out = out[out["coint_pvalue"] <= cfg.coint_pvalue_max]
-    return out.head(cfg.max_pairs)
+    out = out[out["coint_pvalue"] <= cfg.coint_pvalue_max].head(cfg.max_pairs)
+    if cfg.prefilter:
+        out.attrs["prefilter"] = {"candidates": n_candidates, "kept": len(candidates)}
+    return out
+
+@timed(rows=lambda prices, *args, **kwargs: len(prices))
+def backtest_pair(
+    prices: pd.DataFrame, a: str, b: str, cfg: StrategyConfig
+) -> tuple[pd.Series, float, pd.Series | None]:
+    """
+    Beta -> spread -> z -> positions -> backtest for one pair (y=a, x=b).
+    Returns net daily returns, the whole-sample ADF p-value of the spread and,
+    with cfg.coint_monitor, the trailing-window monitor p-values behind its
+    trade-allowed mask (else None).
+    """
+    y = prices[a]
+    x = prices[b]
+
+    beta = hedge_ratio(y, x, cfg)
+    spread = compute_spread(y, x, beta)
+    z = rolling_zscore(spread, lookback=cfg.z_lookback)
+    y, x = y.reindex(spread.index), x.reindex(spread.index)
+    monitor = None
+    if cfg.coint_monitor:
+        monitor = monitor_pvalues(spread, y, x, cfg.monitor_test, cfg.monitor_window, cfg.monitor_lags)
+    allowed = trade_allowed(spread, cfg, y, x, monitor=monitor)
+    pos = positions_from_z(z, entry_z=cfg.entry_z, exit_z=cfg.exit_z, allowed=allowed)
+
+    bt = pair_returns_from_spread_position(
+        price_y=y,
+        price_x=x,
+        beta=beta,
+        spread_pos=pos,
+        fee_bps_per_leg=cfg.fee_bps_per_leg,
+        slippage_bps_per_leg=cfg.slippage_bps_per_leg,
+        gross_leverage=cfg.gross_leverage,
+    )
+
+    # Stationarity check on spread (whole-sample)
+    adf_p = adf_pvalue(spread)
+    return bt["ret_net"], adf_p, monitor
+
+def _backtest_pairs_task(
+    task: tuple[list[tuple[str, str]], StrategyConfig],
+) -> list[tuple[pd.Series, float, pd.Series | None]]:
+    chunk, cfg = task
+    prices = shared_frame()
+    return [backtest_pair(prices, a, b, cfg) for a, b in chunk]
+
+def _configure_cache(cfg: StrategyConfig) -> None:
+    cache.configure(cfg.cache_dir, cfg.cache_max_mb * 2**20)
+
+def _print_cache_stats() -> None:
+    memo = cache.active()
+    if memo is None:
+        return
+    print(f"\nCache ({memo.root}, {memo.nbytes / 2**20:.1f} MB; main process only):")
+    print(memo.stats().to_string(index=False))
 
 def run(cfg: StrategyConfig, tickers: list[str]) -> None:
     print("Config:", asdict(cfg))
-    prices = fetch_adj_close(tickers, start=cfg.start, end=cfg.end)
-    prices = align_prices(prices, min_overlap_days=cfg.min_overlap_days)
+    _configure_cache(cfg)
+    prof = profiling.enable() if cfg.profile_dir else None
+    try:
+        with span("run"):
+            _run(cfg, tickers)
+    finally:
+        if prof is not None:
+            profiling.disable()
+            print("\nProfile (main process):")
+            print(prof.report())
+            for path in prof.write(cfg.profile_dir).values():
+                print("Saved:", path)
+
+def _price_source(cfg: StrategyConfig) -> YFinanceSource | AsyncIngestor:
+    source = YFinanceSource(cfg.bar_freq)
+    return AsyncIngestor.from_config(cfg, source) if cfg.ingest_batch_size > 0 else source
+
+def _run(cfg: StrategyConfig, tickers: list[str]) -> None:
+    with span("run.fetch_prices") as info:
+        source = _price_source(cfg)
+        store = PriceStore(cfg.price_store, source) if cfg.price_store else None
+        prices = fetch_adj_close(tickers, start=cfg.start, end=cfg.end, store=store, interval=cfg.bar_freq, source=source)
+        info["rows"] = len(prices)
+    with span("run.align_prices", len(prices)):
+        panel = align_panel(prices, min_overlap_days=cfg.min_overlap_days, dtype=cfg.price_dtype)
+        # Zero-copy frame over the panel for the frame-based stages.
+        prices = panel.frame()
 
     if prices.shape[1] < 2:
         raise SystemExit("Not enough tickers with sufficient data after cleaning.")
 
-    pairs = select_pairs(prices, cfg)
+    with span("run.select_pairs") as info:
+        pairs = select_pairs(prices, cfg)
+        info["rows"] = len(pairs)
+    if "prefilter" in pairs.attrs:
+        pf = pairs.attrs["prefilter"]
+        print(f"Pre-filter: kept {pf['kept']} of {pf['candidates']} candidate pairs ({pf['candidates'] - pf['kept']} pruned)")
     if pairs.empty:
         raise SystemExit("No cointegrated pairs found under the p-value threshold.")
 
     pair_rets_net: dict[str, pd.Series] = {}
     diagnostics = []
 
-    for _, row in pairs.iterrows():
-        A, B = row["A"], row["B"]
-        y = prices[A]
-        x = prices[B]
-
-        beta = rolling_ols_beta(y, x, lookback=cfg.beta_lookback)
-        spread = compute_spread(y, x, beta)
-        z = rolling_zscore(spread, lookback=cfg.z_lookback)
-        pos = positions_from_z(z, entry_z=cfg.entry_z, exit_z=cfg.exit_z)
-
-        bt = pair_returns_from_spread_position(
-            price_y=y,
-            price_x=x,
-            beta=beta,
-            spread_pos=pos,
-            fee_bps_per_leg=cfg.fee_bps_per_leg,
-            slippage_bps_per_leg=cfg.slippage_bps_per_leg,
-            gross_leverage=cfg.gross_leverage,
-        )
+    chunks = chunked(list(zip(pairs["A"], pairs["B"])), PAIRS_PER_TASK)
+    tasks = [(chunk, cfg) for chunk in chunks]
+    with span("run.backtest_pairs", len(pairs)):
+        results = [r for rs in map_shared(_backtest_pairs_task, tasks, prices, workers=cfg.workers) for r in rs]
 
-        # Stationarity check on spread (whole-sample)
-        adf_p = adf_pvalue(spread)
+    for (_, row), (ret_net, adf_p, monitor) in zip(pairs.iterrows(), results):
+        key = f"{row['A']}__{row['B']}"
+        pair_rets_net[key] = ret_net
 
-        key = f"{A}__{B}"
-        pair_rets_net[key] = bt["ret_net"]
+        diag = {
+            "pair": key,
+            "coint_pvalue": float(row["coint_pvalue"]),
+            "adf_pvalue_spread": float(adf_p) if pd.notna(adf_p) else None,
+            "n_days": int(ret_net.dropna().shape[0]),
+        }
+        if monitor is not None:
+            # Latest trailing-window p-value and the share of bars it blocked.
+            last = monitor.iloc[-1]
+            diag["monitor_pvalue_last"] = float(last) if pd.notna(last) else None
+            diag["monitor_blocked"] = float((monitor.dropna() > cfg.monitor_max_pvalue).mean()) if monitor.notna().any() else None
+        diagnostics.append(diag)
 
-        diagnostics.append(
-            {
-                "pair": key,
-                "coint_pvalue": float(row["coint_pvalue"]),
-                "adf_pvalue_spread": float(adf_p) if pd.notna(adf_p) else None,
-                "n_days": int(bt["ret_net"].dropna().shape[0]),
-            }
-        )
+    with span("run.portfolio", len(pair_rets_net)):
+        portfolio = portfolio_from_config(pair_rets_net, cfg).series()
+        stats = summarize(portfolio, periods_per_year=periods_per_year(cfg.bar_freq))
+        eq = equity_curve(portfolio)
 
-    portfolio = equal_weight_portfolio(pair_rets_net)
-    stats = summarize(portfolio)
-    eq = equity_curve(portfolio)
+    boot = None
+    if cfg.bootstrap_reps > 0:
+        with span("run.bootstrap", cfg.bootstrap_reps):
+            boot = bootstrap_portfolio(pair_rets_net, cfg)
 
     print("\nSelected pairs:")
     print(pairs.to_string(index=False))
@@ -94,16 +198,168 @@ def run(cfg: StrategyConfig, tickers: list[str]) -> None:
     for k, v in stats.items():
         print(f"- {k}: {v:.4f}")
 
+    if boot is not None:
+        print(f"\nBootstrap ({len(boot.samples)} {boot.method} replications, block {boot.block:g} bars), 95% intervals:")
+        print(boot.intervals().to_string(float_format=lambda v: f"{v:.4f}"))
+
     print(f"\nEquity curve: start={eq.iloc[0]:.4f} end={eq.iloc[-1]:.4f}")
+    _print_cache_stats()
+
+def walkforward_main(argv: list[str]) -> None:
+    ap = argparse.ArgumentParser(prog="pairs-trading walkforward", description="Walk-forward (rolling train -> trade) validation")
+    ap.add_argument("--tickers", type=str, required=True, help="Comma-separated tickers, e.g. NVDA,JPM,AMZN,META")
+    ap.add_argument("--start", type=str, default="2016-01-01")
+    ap.add_argument("--end", type=str, default=None)
+    ap.add_argument("--price_store", type=str, default=None, help="Local Parquet price store directory (incremental refresh)")
+    ap.add_argument("--train_days", type=int, default=504)
+    ap.add_argument("--trade_days", type=int, default=126)
+    ap.add_argument("--step_days", type=int, default=126)
+    ap.add_argument("--entry_z", type=float, default=2.0)
+    ap.add_argument("--exit_z", type=float, default=0.5)
+    ap.add_argument("--cost_bps", type=float, default=0.0)
+    ap.add_argument("--max_coint_p", type=float, default=0.05)
+    ap.add_argument("--top_k", type=int, default=1)
+    ap.add_argument("--workers", type=int, default=1, help="Processes for window screening and backtests")
+    ap.add_argument("--cache_dir", type=str, default=None, help="Reuse per-window cointegration results across runs")
+    ap.add_argument("--out_dir", type=str, default="outputs")
+    ap.add_argument(
+        "--notebook_equity_chain", action="store_true",
+        help="Chain the OOS equity exactly like notebook 03: restarts after weekends/holidays, 1.0 after the last window (parity runs only)",
+    )
+    args = ap.parse_args(argv)
+
+    cfg = WalkForwardConfig(
+        train_days=args.train_days, trade_days=args.trade_days, step_days=args.step_days,
+        entry_z=args.entry_z, exit_z=args.exit_z, cost_bps=args.cost_bps,
+        max_coint_p=args.max_coint_p, top_k=args.top_k, notebook_equity_chain=args.notebook_equity_chain,
+    )
+    print("Config:", asdict(cfg))
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    store = PriceStore(args.price_store) if args.price_store else None
+    prices = fetch_adj_close(tickers, start=args.start, end=args.end, store=store)
+
+    result = run_walkforward(prices, cfg, workers=args.workers, cache_dir=args.cache_dir)
+    print(f"Num windows: {len(result.summary)}")
+    print(result.summary["selected_pairs"].value_counts(dropna=False).to_string())
+
+    print("Saved:")
+    for path in result.save(args.out_dir).values():
+        print("-", path)
+
+def sweep_main(argv: list[str]) -> None:
+    ap = argparse.ArgumentParser(
+        prog="pairs-trading sweep",
+        description="Parameter sweep over StrategyConfig fields, sharing intermediate stages",
+        epilog="Example: --grid entry_z=1.5,2,2.5 --grid exit_z=0,0.5 --grid z_lookback=20,60",
+    )
+    ap.add_argument("--tickers", type=str, required=True, help="Comma-separated tickers, e.g. MSFT,AAPL,GOOG,AMZN")
+    ap.add_argument("--start", type=str, default="2018-01-01")
+    ap.add_argument("--end", type=str, default=None)
+    ap.add_argument("--interval", type=str, default="1d", help="Bar size: 1m, 5m, 1h, 1d, ... (lookbacks count bars)")
+    ap.add_argument("--price_store", type=str, default=None, help="Local Parquet price store directory (incremental refresh)")
+    ap.add_argument("--grid", action="append", default=[], help="field=v1,v2,... (repeatable)")
+    ap.add_argument("--prefilter", action="store_true", help="Prune candidate pairs on correlation / half-life before the cointegration screen")
+    ap.add_argument("--vol_filter", action="store_true", help="No trades while spread vol is above its 80th percentile so far")
+    ap.add_argument("--trend_filter", action="store_true", help="No trades while the spread trends strongly")
+    ap.add_argument("--coint_monitor", action="store_true", help="No trades while the trailing-window cointegration p-value is too high")
+    ap.add_argument("--workers", type=int, default=1, help="Processes for screening and sweep tasks")
+    ap.add_argument("--out", type=str, default="outputs/sweep_results.csv")
+    ap.add_argument("--cache_dir", type=str, default=StrategyConfig.cache_dir, help="On-disk memo of stats/signals results (off unless given), e.g. data/cache/memo")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the on-disk memo")
+    args = ap.parse_args(argv)
+
+    base = StrategyConfig(
+        start=args.start, end=args.end, bar_freq=args.interval, price_store=args.price_store, workers=args.workers,
+        cache_dir=None if args.no_cache else args.cache_dir, prefilter=args.prefilter,
+        vol_filter=args.vol_filter, trend_filter=args.trend_filter, coint_monitor=args.coint_monitor,
+    )
+    _configure_cache(base)
+    try:
+        grid = parse_grid(args.grid, base)
+    except ValueError as e:
+        ap.error(str(e))
+
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    source = _price_source(base)
+    store = PriceStore(base.price_store, source) if base.price_store else None
+    prices = fetch_adj_close(tickers, start=base.start, end=base.end, store=store, interval=base.bar_freq, source=source)
+    prices = align_panel(prices, min_overlap_days=base.min_overlap_days, dtype=base.price_dtype).frame()
+    pairs = select_pairs(prices, screening_config(base, grid))
+    if pairs.empty:
+        raise SystemExit("No cointegrated pairs found under the p-value threshold.")
+
+    results = run_sweep(prices, pairs, base, grid, workers=args.workers)
+    print(f"Combinations: {len(results)}  nodes computed: {results.attrs['nodes']}")
+    print(results.sort_values("sharpe", ascending=False).head(10).to_string(index=False))
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    results.to_csv(args.out, index=False)
+    print(f"Saved: {args.out}")
+    _print_cache_stats()
+
+def main(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "walkforward":
+        walkforward_main(argv[1:])
+        return
+    if argv and argv[0] == "sweep":
+        sweep_main(argv[1:])
+        return
 
-def main():
-    ap = argparse.ArgumentParser(description="Pairs Trading Statistical Arbitrage")
+    ap = argparse.ArgumentParser(
+        description="Pairs Trading Statistical Arbitrage",
+        epilog="Subcommands: `walkforward`, `sweep` (see `pairs-trading <subcommand> --help`).",
+    )
     ap.add_argument("--tickers", type=str, required=True, help="Comma-separated tickers, e.g. MSFT,AAPL,GOOG,AMZN")
     ap.add_argument("--start", type=str, default="2018-01-01")
     ap.add_argument("--end", type=str, default=None)
+    ap.add_argument("--interval", type=str, default="1d", help="Bar size: 1m, 5m, 1h, 1d, ... (lookbacks count bars)")
     ap.add_argument("--max_pairs", type=int, default=10)
-    args = ap.parse_args()
+    ap.add_argument("--price_dtype", choices=["float64", "float32"], default="float64", help="Storage of the aligned price panel")
+    ap.add_argument("--hedge_ratio", choices=["rolling_ols", "kalman"], default="rolling_ols")
+    ap.add_argument("--kalman_q", type=float, default=StrategyConfig.kalman_q, help="Kalman state (beta drift) noise variance")
+    ap.add_argument("--kalman_r", type=float, default=StrategyConfig.kalman_r, help="Kalman observation noise variance")
+    ap.add_argument("--price_store", type=str, default=None, help="Local Parquet price store directory (incremental refresh)")
+    ap.add_argument("--ingest_batch_size", type=int, default=0, help="Download in concurrent batches of N tickers (0 = one request)")
+    ap.add_argument("--ingest_concurrency", type=int, default=StrategyConfig.ingest_concurrency, help="Batches in flight")
+    ap.add_argument("--ingest_rate", type=float, default=StrategyConfig.ingest_rate, help="Batch requests per second")
+    ap.add_argument("--prefilter", action="store_true", help="Prune candidate pairs on correlation / half-life before the cointegration screen")
+    ap.add_argument("--prefilter_clusters", type=int, default=0, help="With --prefilter: only pair tickers within the same of N return clusters")
+    ap.add_argument("--weighting", choices=WEIGHTINGS, default="equal", help="How pair returns are combined")
+    ap.add_argument("--max_weight", type=float, default=None, help="Cap on any one pair's portfolio weight")
+    ap.add_argument("--vol_filter", action="store_true", help="No trades while spread vol is above its 80th percentile so far")
+    ap.add_argument("--trend_filter", action="store_true", help="No trades while the spread trends strongly")
+    ap.add_argument("--filter_quantile_window", type=int, default=None, help="Rolling window for the vol threshold (default expanding)")
+    ap.add_argument("--coint_monitor", action="store_true", help="No trades while the trailing-window cointegration p-value is too high")
+    ap.add_argument("--monitor_test", choices=MONITOR_TESTS, default="eg", help="eg: Engle-Granger on the legs; adf: ADF of the spread")
+    ap.add_argument("--monitor_window", type=int, default=StrategyConfig.monitor_window, help="Bars per monitor test window")
+    ap.add_argument("--monitor_max_pvalue", type=float, default=StrategyConfig.monitor_max_pvalue)
+    ap.add_argument("--bootstrap", type=int, default=0, metavar="N", help="Confidence intervals from N resampled portfolio return paths")
+    ap.add_argument("--bootstrap_method", choices=BOOTSTRAP_METHODS, default="stationary")
+    ap.add_argument("--bootstrap_block", type=float, default=None, help="(Mean) block length in bars (default n_obs ** 1/3)")
+    ap.add_argument("--workers", type=int, default=1, help="Processes for pair screening and per-pair backtests")
+    ap.add_argument("--cache_dir", type=str, default=StrategyConfig.cache_dir, help="On-disk memo of stats/signals results (off unless given), e.g. data/cache/memo")
+    ap.add_argument("--cache_max_mb", type=int, default=StrategyConfig.cache_max_mb, help="LRU eviction budget for --cache_dir")
+    ap.add_argument("--no-cache", action="store_true", help="Disable the on-disk memo (always recompute)")
+    ap.add_argument(
+        "--profile", type=str, nargs="?", const="outputs/profile", default=None, metavar="DIR",
+        help="Time every stage; write profile.json and a Chrome trace.json to DIR (default outputs/profile)",
+    )
+    args = ap.parse_args(argv)
 
-    cfg = StrategyConfig(start=args.start, end=args.end, max_pairs=args.max_pairs)
+    cfg = StrategyConfig(
+        start=args.start, end=args.end, bar_freq=args.interval, max_pairs=args.max_pairs, workers=args.workers,
+        price_dtype=args.price_dtype,
+        price_store=args.price_store, hedge_ratio=args.hedge_ratio,
+        ingest_batch_size=args.ingest_batch_size, ingest_concurrency=args.ingest_concurrency, ingest_rate=args.ingest_rate,
+        kalman_q=args.kalman_q, kalman_r=args.kalman_r,
+        cache_dir=None if args.no_cache else args.cache_dir, cache_max_mb=args.cache_max_mb,
+        profile_dir=args.profile, prefilter=args.prefilter, prefilter_clusters=args.prefilter_clusters,
+        vol_filter=args.vol_filter, trend_filter=args.trend_filter, filter_quantile_window=args.filter_quantile_window,
+        coint_monitor=args.coint_monitor, monitor_test=args.monitor_test,
+        monitor_window=args.monitor_window, monitor_max_pvalue=args.monitor_max_pvalue,
+        weighting=args.weighting, max_weight=args.max_weight,
+        bootstrap_reps=args.bootstrap, bootstrap_method=args.bootstrap_method, bootstrap_block=args.bootstrap_block,
+    )
     tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
     run(cfg, tickers)
@@ -5,19 +5,52 @@ class StrategyConfig:
     # Data
     start: str = "2018-01-01"
     end: str | None = None
+    price_store: str | None = None  # directory of the local Parquet price store (None = always download)
+    bar_freq: str = "1d"          # bar size ("1m", "5m", "1h", "1d"); lookbacks below count bars
+    chunk_bars: int = 100_000     # time block size of the streaming pipeline (stream.py)
+    price_dtype: str = "float64"  # storage of the aligned PricePanel ("float32" halves it; math stays float64)
+    ingest_batch_size: int = 0    # >0: download in concurrent batches of this many tickers (ingest.py)
+    ingest_concurrency: int = 4   # batches in flight
+    ingest_rate: float = 2.0      # batch requests per second (token bucket)
+    ingest_retries: int = 3       # retries per batch (exponential backoff), then the batch is split
 
     # Pair selection
     coint_pvalue_max: float = 0.05
     min_overlap_days: int = 252  # ~1 trading year
+    prefilter: bool = False                 # prune candidates on cheap stats before Engle-Granger
+    prefilter_min_level_corr: float = 0.5   # |corr| of log prices
+    prefilter_min_return_corr: float = 0.0  # corr of log returns
+    prefilter_max_half_life: float = 126.0  # AR(1) half-life of the OLS spread, bars
+    prefilter_clusters: int = 0             # >0: only pair tickers in the same return-correlation cluster
 
     # Hedge ratio / spread
-    beta_lookback: int = 252
+    hedge_ratio: str = "rolling_ols"  # "rolling_ols" or "kalman"
+    beta_lookback: int = 252          # rolling_ols window
+    kalman_q: float = 1e-5            # kalman: state (beta drift) noise variance
+    kalman_r: float = 1e-2            # kalman: observation noise variance
+    kalman_intercept: bool = False    # kalman: filter [alpha, beta] instead of beta only (not calibrated; not on the CLI)
     z_lookback: int = 60
 
     # Signals
     entry_z: float = 2.0
     exit_z: float = 0.5
 
+    # Regime filters (trade-allowed mask on the spread, see filters.py)
+    vol_filter: bool = False            # skip bars whose spread vol is above its vol_max_pctile so far
+    vol_lookback: int = 20
+    vol_max_pctile: float = 0.8
+    trend_filter: bool = False          # skip bars where the spread trends strongly
+    trend_lookback: int = 60
+    trend_max_slope_z: float = 1.5
+    filter_quantile_window: int | None = None  # vol threshold window (None = expanding)
+
+    # Stability monitor (trailing-window cointegration tests, see stability.py)
+    coint_monitor: bool = False         # skip bars whose trailing-window p-value is above monitor_max_pvalue
+    monitor_test: str = "eg"            # "eg" (Engle-Granger on the prices) or "adf" (ADF of the spread)
+    monitor_window: int = 252           # bars per test window
+    monitor_lags: int = 1               # fixed ADF lag order (no per-window AIC search)
+    monitor_max_pvalue: float = 0.10
+
     # Backtest
     fee_bps_per_leg: float = 1.0  # 1bp per leg per trade (entry/exit)
     slippage_bps_per_leg: float = 0.0
@@ -25,4 +58,38 @@ class StrategyConfig:
 
     # Portfolio
     max_pairs: int = 10           # trade top-N pairs by cointegration p-value
+    weighting: str = "equal"      # "equal", "inverse_vol" or "risk_parity" (see portfolio.py)
+    weight_lookback: int = 60     # bars of pair returns behind vol / covariance estimates
+    max_weight: float | None = None  # per-pair cap on |weight| (before gross_cap)
+    gross_cap: float = 1.0        # total gross weight across pairs
+    rebalance_every: int = 1      # bars between weight updates
+
+    # Robustness (bootstrap.py)
+    bootstrap_reps: int = 0       # resampled replications of the portfolio returns (0 = off)
+    bootstrap_method: str = "stationary"  # "stationary" or "block"
+    bootstrap_block: float | None = None  # (mean) block length in bars (None = n_obs ** 1/3)
+
+    # Execution
+    workers: int = 1              # processes for screening / per-pair backtests (1 = serial)
+    cache_dir: str | None = None  # on-disk memo of stats/signals results, e.g. "data/cache/memo" (None = off)
+    cache_max_mb: int = 2048      # LRU eviction budget for cache_dir
+    profile_dir: str | None = None  # write stage timings (profile.json + Chrome trace.json) here
+
+@dataclass(frozen=True)
+class WalkForwardConfig:
+    # Windows (trading days)
+    train_days: int = 504         # ~2 years
+    trade_days: int = 126         # ~6 months
+    step_days: int = 126          # slide by 6 months
+
+    # Signals (z calibrated on the train window)
+    entry_z: float = 2.0
+    exit_z: float = 0.5
+    cost_bps: float = 0.0         # per gross notional turn
+
+    # Pair selection on the train window
+    max_coint_p: float = 0.05
+    top_k: int = 1                # trade best pair(s) per window by p-value
 
+    # Output
+    notebook_equity_chain: bool = False  # reproduce notebook 03's OOS equity (restarts after weekends/holidays, 1.0 after the last window)
@@ -1,16 +1,55 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
 
-def fetch_adj_close(tickers: list[str], start: str, end: str | None = None) -> pd.DataFrame:
+from .panel import PricePanel
+from .profiling import timed
+
+if TYPE_CHECKING:
+    from .store import PriceSource, PriceStore
+
+def fetch_adj_close(
+    tickers: list[str],
+    start: str,
+    end: str | None = None,
+    store: PriceStore | None = None,
+    interval: str = "1d",
+    source: PriceSource | None = None,
+) -> pd.DataFrame:
     """
     Returns a DataFrame indexed by date with columns=tickers containing Adjusted Close.
+
+    With a PriceStore, only date ranges / tickers not yet stored locally are
+    downloaded; the result is read back from the store. `interval` is the
+    yfinance bar size ("1m", "5m", "1h", "1d", ...); the store only holds
+    daily bars. Without a store, `source` (e.g. an ingest.AsyncIngestor)
+    replaces the single yfinance call.
+    """
+    if store is not None:
+        if interval != "1d":
+            raise ValueError(f"PriceStore holds daily bars only, got interval={interval!r}")
+        store.refresh(tickers, start=start, end=end)
+        return store.load(tickers, start=start, end=end)
+    if source is not None:
+        return source.fetch(tickers, start=start, end=end)
+    return download_adj_close(tickers, start=start, end=end, interval=interval)
+
+@timed(rows=lambda tickers, *args, **kwargs: len(tickers))
+def download_adj_close(tickers: list[str], start: str, end: str | None = None, interval: str = "1d") -> pd.DataFrame:
+    """
+    Adjusted Close straight from yfinance (no local store). Intraday bars
+    without an "Adj Close" field use "Close".
     """
+    import yfinance as yf  # deferred: only needed when downloading
+
     df = yf.download(
         tickers=tickers,
         start=start,
         end=end,
+        interval=interval,
         auto_adjust=False,
         progress=False,
         group_by="ticker",
@@ -18,17 +57,36 @@ def fetch_adj_close(tickers: list[str], start: str, end: str | None = None) -> p
     )
 
     # yfinance returns different shapes for 1 vs many tickers; normalize.
+    if df.empty:
+        return pd.DataFrame(columns=pd.Index([], dtype=object), index=pd.DatetimeIndex([]))
     if isinstance(df.columns, pd.MultiIndex):
-        # MultiIndex: (Ticker, OHLCV)
-        adj = pd.DataFrame({t: df[(t, "Adj Close")] for t in tickers})
+        # MultiIndex: (Ticker, OHLCV); tickers that failed to download may be missing.
+        field = "Adj Close" if "Adj Close" in df.columns.get_level_values(1) else "Close"
+        adj = pd.DataFrame({t: df[(t, field)] for t in tickers if (t, field) in df.columns})
     else:
         # Single ticker
-        adj = df[["Adj Close"]].rename(columns={"Adj Close": tickers[0]})
+        field = "Adj Close" if "Adj Close" in df.columns else "Close"
+        adj = df[[field]].rename(columns={field: tickers[0]})
 
     adj = adj.sort_index()
     adj = adj.dropna(how="all")
     return adj
 
+def _aligned_columns(prices: pd.DataFrame, min_overlap_days: int) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Datetime-indexed, sorted `prices` and the mask of tickers with at least
+    `min_overlap_days` bars from their first price on (what remains after
+    the forward fill).
+    """
+    p = prices
+    if not isinstance(p.index, pd.DatetimeIndex):
+        p = p.set_axis(pd.to_datetime(p.index), axis=0)
+    if not p.index.is_monotonic_increasing:
+        p = p.sort_index()
+    has = p.notna().values
+    first = np.where(has.any(axis=0), has.argmax(axis=0), len(p))
+    return p, (len(p) - first) >= min_overlap_days
+
 def align_prices(prices: pd.DataFrame, min_overlap_days: int = 252) -> pd.DataFrame:
     """
     Ensures:
@@ -36,12 +94,26 @@ def align_prices(prices: pd.DataFrame, min_overlap_days: int = 252) -> pd.DataFr
       - Forward-fill small gaps (optional policy)
       - Drops tickers with insufficient data
     """
-    p = prices.copy()
-    p.index = pd.to_datetime(p.index)
-    p = p.sort_index()
-    p = p.ffill()
-
-    valid = p.notna().sum(axis=0) >= min_overlap_days
-    p = p.loc[:, valid]
-    return p
+    # After the forward fill a ticker has a value on every bar from its first
+    # one, so short tickers are dropped before filling: one copy of the kept
+    # columns instead of copying and filling the whole frame.
+    p, keep = _aligned_columns(prices, min_overlap_days)
+    return p.loc[:, keep].ffill()
 
+@timed(rows=lambda prices, *args, **kwargs: len(prices))
+def align_panel(prices: pd.DataFrame, min_overlap_days: int = 252, dtype: str | np.dtype = np.float64) -> PricePanel:
+    """
+    align_prices into a PricePanel: the kept tickers are forward filled
+    straight into one column-major array of `dtype` (float32 halves it),
+    column by column, so no intermediate float64 frame is built.
+    panel.frame() equals align_prices(prices, min_overlap_days) for float64.
+    """
+    p, keep = _aligned_columns(prices, min_overlap_days)
+    cols = np.flatnonzero(keep)
+    out = np.empty((len(p), len(cols)), dtype=dtype, order="F")
+    rows = np.arange(len(p))
+    for j, c in enumerate(cols):
+        v = p.iloc[:, c].to_numpy(dtype=float, na_value=np.nan)
+        last = np.maximum.accumulate(np.where(np.isnan(v), 0, rows))
+        out[:, j] = v[last]
+    return PricePanel(out, p.index, p.columns[cols])
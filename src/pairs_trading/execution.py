@@ -0,0 +1,394 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .backtest import MatrixBacktest, ticker_returns
+from .filters import _rolling_std
+from .metrics import TRADING_DAYS
+from .panel import PricePanel
+from .profiling import timed
+from .stats import _window_sum
+
+# One row per fill. Quantities and costs are fractions of the pair's capital
+# (the weights of backtest_matrix), so they compare one to one with it.
+FILL_DTYPE = np.dtype(
+    [
+        ("bar", np.int64),        # row of the fill
+        ("submitted", np.int64),  # row the (still working) order was first sent
+        ("pair", np.int32),
+        ("leg", np.int32),        # 0 = y, 1 = x
+        ("ticker", np.int32),     # column in the price panel
+        ("qty", np.float64),      # signed weight traded
+        ("price", np.float64),
+        ("cost", np.float64),     # fill costs of all cost models
+    ]
+)
+
+
+@dataclass
+class Market:
+    """
+    Per-bar inputs the cost models see, for the tickers the pairs trade
+    (columns in `tickers` order). volume is in shares, None if unknown.
+    """
+    prices: np.ndarray
+    returns: np.ndarray
+    volume: np.ndarray | None
+    tickers: np.ndarray
+    capital: float
+    periods_per_year: float
+
+    @property
+    def dollar_volume(self) -> np.ndarray:
+        if self.volume is None:
+            raise ValueError("this cost / fill model needs bar volumes (volume=)")
+        return self.volume * self.prices
+
+
+class CostModel:
+    """
+    Pluggable execution cost, as a fraction of the pair's capital:
+      - prepare(market): once per run (precompute per-bar inputs)
+      - fill_cost(t, cols, qty): cost of this bar's fills of `qty` weight in
+        market columns `cols`
+      - holding_cost(t, cols, held): cost of carrying `held` weights over bar t
+    The defaults charge nothing.
+    """
+
+    def prepare(self, market: Market) -> None:
+        self.market = market
+
+    def fill_cost(self, t: int, cols: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        return np.zeros(len(qty))
+
+    def holding_cost(self, t: int, cols: np.ndarray, held: np.ndarray) -> np.ndarray:
+        return np.zeros(len(held))
+
+
+class LinearCost(CostModel):
+    """
+    `bps` of the traded notional: fee_bps_per_leg + slippage_bps_per_leg of
+    backtest_matrix, or notebook 04's half_spread_bps.
+    """
+
+    def __init__(self, bps: float):
+        self.bps = float(bps)
+
+    def fill_cost(self, t: int, cols: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        return np.abs(qty) * (self.bps / 10_000.0)
+
+
+class SquareRootImpact(CostModel):
+    """
+    Square-root market impact: a fill of notional Q costs
+    coef * sigma * sqrt(Q / ADV) of Q, with sigma the trailing std of the
+    ticker's bar returns and ADV its trailing mean dollar volume over
+    `lookback` bars (up to and including the fill's bar). Needs volume.
+    """
+
+    def __init__(self, coef: float = 1.0, lookback: int = 20):
+        self.coef = float(coef)
+        self.lookback = int(lookback)
+
+    def prepare(self, market: Market) -> None:
+        super().prepare(market)
+        self.sigma = np.nan_to_num(_rolling_std(market.returns, self.lookback, max(2, self.lookback // 2)))
+        dv = market.dollar_volume
+        ok = np.isfinite(dv)
+        count = _window_sum(ok.astype(float), self.lookback)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.adv = _window_sum(np.where(ok, dv, 0.0), self.lookback) / count
+
+    def fill_cost(self, t: int, cols: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        notional = np.abs(qty) * self.market.capital
+        adv = self.adv[t, cols]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.where(adv > 0, self.coef * self.sigma[t, cols] * np.sqrt(notional / adv), 0.0)
+        return np.abs(qty) * frac
+
+
+class BorrowCost(CostModel):
+    """
+    Borrow fee on short legs: annual `rate` (a scalar, or one per market
+    ticker: array in Market.tickers order or {column number: rate}) on the
+    short weight held over each bar, accrued per bar
+    (rate / periods_per_year).
+    """
+
+    def __init__(self, rate: float | np.ndarray | dict[int, float]):
+        self.rate = rate
+
+    def prepare(self, market: Market) -> None:
+        super().prepare(market)
+        if isinstance(self.rate, dict):
+            rate = np.array([self.rate.get(int(k), 0.0) for k in market.tickers])
+        else:
+            rate = np.broadcast_to(np.asarray(self.rate, dtype=float), market.tickers.shape)
+        self.per_bar = rate / market.periods_per_year
+
+    def holding_cost(self, t: int, cols: np.ndarray, held: np.ndarray) -> np.ndarray:
+        return np.clip(-held, 0.0, None) * self.per_bar[cols]
+
+
+class TicketFee(CostModel):
+    """
+    Commission of `bps` of the notional with a minimum of `minimum` (in the
+    same currency as the capital) per fill.
+    """
+
+    def __init__(self, minimum: float, bps: float = 0.0):
+        self.minimum = float(minimum)
+        self.bps = float(bps)
+
+    def fill_cost(self, t: int, cols: np.ndarray, qty: np.ndarray) -> np.ndarray:
+        fee = np.maximum(np.abs(qty) * self.market.capital * self.bps / 10_000.0, self.minimum)
+        return fee / self.market.capital
+
+
+class FillQueue:
+    """
+    Append-only FILL_DTYPE buffer, doubled when full, so a run records its
+    fills without per-fill Python objects.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.buf = np.empty(max(int(capacity), 1), dtype=FILL_DTYPE)
+        self.n = 0
+
+    def push(self, **fields: np.ndarray) -> np.ndarray:
+        """
+        Append one row per element of the (equal length) field arrays and
+        return the new rows (a view, for filling in e.g. the costs).
+        """
+        k = len(next(iter(fields.values())))
+        if self.n + k > len(self.buf):
+            grown = np.empty(max(2 * len(self.buf), self.n + k), dtype=FILL_DTYPE)
+            grown[: self.n] = self.buf[: self.n]
+            self.buf = grown
+        rows = self.buf[self.n : self.n + k]
+        for name, value in fields.items():
+            rows[name] = value
+        self.n += k
+        return rows
+
+    def array(self) -> np.ndarray:
+        return self.buf[: self.n].copy()
+
+
+@dataclass
+class ExecutionResult:
+    """
+    Output of simulate_execution: per-bar results in the MatrixBacktest
+    layout (wy / wx are the filled weights, turnover the filled |qty|), every
+    fill, and how many order events (new or amended working orders) there were.
+    """
+    backtest: MatrixBacktest
+    fills: np.ndarray
+    n_orders: int
+
+    @property
+    def n_events(self) -> int:
+        return self.n_orders + len(self.fills)
+
+    def fills_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.fills)
+        index = self.backtest.index
+        if index is not None and len(df):
+            df.insert(1, "time", index[df["bar"].values])
+        return df
+
+    def compare(self, reference: MatrixBacktest) -> pd.DataFrame:
+        """
+        Per pair: total gross return, cost and net return here and in
+        `reference` (e.g. backtest_matrix on the same positions), summed over
+        the bars where the reference has a net return. The reference leaves
+        flat bars, entries and exits NaN, so this compares the bars in a trade.
+        """
+        ref_ok = np.isfinite(reference.ret_net)
+        out = {}
+        for name, a, b in (
+            ("gross", self.backtest.ret_gross, reference.ret_gross),
+            ("cost", self.backtest.cost, reference.cost),
+            ("net", self.backtest.ret_net, reference.ret_net),
+        ):
+            out[f"{name}_sim"] = np.where(ref_ok, a, 0.0).sum(axis=0)
+            out[f"{name}_ref"] = np.where(ref_ok, b, 0.0).sum(axis=0)
+        out["net_diff"] = out["net_sim"] - out["net_ref"]
+        return pd.DataFrame(out, index=self.backtest.pairs).rename_axis("pair")
+
+
+def target_weights(
+    pair_index: np.ndarray, beta: np.ndarray, spread_pos: np.ndarray, gross_leverage: float = 1.0
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Leg target weights (wy, wx) of backtest_matrix, with flat bars at 0
+    instead of NaN. A NaN position (e.g. NaN z mid-trade) keeps the previous
+    target; NaN before any position is flat.
+    """
+    p = np.asarray(spread_pos, dtype=float)
+    b = np.asarray(beta, dtype=float)
+    rows = np.where(np.isfinite(p), np.arange(len(p))[:, None], -1)
+    rows = np.maximum.accumulate(rows, axis=0)
+    held = np.take_along_axis(p, np.maximum(rows, 0), axis=0)
+    p = np.where(rows >= 0, held, 0.0)
+    b = np.take_along_axis(b, np.maximum(rows, 0), axis=0)
+
+    wy = p
+    wx = -p * b
+    gross = np.abs(wy) + np.abs(wx)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(gross > 0, gross_leverage / gross, 0.0)
+    return np.nan_to_num(wy * scale), np.nan_to_num(wx * scale)
+
+
+@timed(rows=lambda prices, pair_index, beta, spread_pos, *args, **kwargs: np.asarray(spread_pos).size)
+def simulate_execution(
+    prices: np.ndarray | pd.DataFrame | PricePanel,
+    pair_index: np.ndarray,
+    beta: np.ndarray,
+    spread_pos: np.ndarray,
+    costs: list[CostModel] | None = None,
+    volume: np.ndarray | pd.DataFrame | None = None,
+    capital: float = 1_000_000.0,
+    participation: float | None = None,
+    min_ticket: float = 0.0,
+    gross_leverage: float = 1.0,
+    periods_per_year: float = TRADING_DAYS,
+    index: pd.Index | None = None,
+    pairs: list[str] | None = None,
+) -> ExecutionResult:
+    """
+    Event-driven execution of a spread position matrix, with the inputs of
+    backtest_matrix (prices (n_obs, n_tickers), pair_index (n_pairs, 2),
+    beta / spread_pos (n_obs, n_pairs)). Each pair trades `capital`.
+
+    Every bar, for all legs at once:
+      1. held weights earn the bar's return; cost models charge holding costs
+      2. each leg's working order is set to target - held (target_weights), a
+         new or amended order event when it changes
+      3. orders fill at the bar's close, up to `participation` x the bar's
+         dollar volume (needs volume; None = fill in full). The rest stays
+         in the order queue for the next bars. Orders below `min_ticket`
+         notional wait until they grow, except those that close a leg
+      4. cost models price the fills (FILL_DTYPE rows in a FillQueue)
+    The loop runs over bars only, with legs as arrays, so throughput is in
+    the millions of order / fill events per second for a large book.
+
+    With costs=[LinearCost(fee + slippage)], full fills and no other model,
+    bars inside a trade match backtest_matrix (see ExecutionResult.compare):
+    weights, turnover and gross returns exactly, costs to rounding (charged
+    per leg here, on the pair's summed turnover there). Unlike it, flat bars
+    are 0 rather than NaN, and entries / exits are charged.
+    """
+    if isinstance(prices, (pd.DataFrame, PricePanel)):
+        index = prices.index if index is None else index
+        prices = prices.values
+    if isinstance(volume, pd.DataFrame):
+        volume = volume.values
+    pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+    n, m = len(prices), len(pair_index)
+    costs = list(costs or [])
+
+    used, legs = np.unique(pair_index, return_inverse=True)
+    legs = legs.reshape(-1, 2)
+    px = np.asarray(prices[:, used], dtype=float)
+    market = Market(
+        prices=px,
+        returns=ticker_returns(px),
+        volume=None if volume is None else np.asarray(volume[:, used], dtype=float),
+        tickers=used,
+        capital=float(capital),
+        periods_per_year=float(periods_per_year),
+    )
+    for model in costs:
+        model.prepare(market)
+    cap = None
+    if participation is not None:
+        cap = np.nan_to_num(participation * market.dollar_volume / capital)
+
+    # Legs are laid out [y of every pair, x of every pair].
+    col = np.concatenate([legs[:, 0], legs[:, 1]])
+    leg_pair = np.tile(np.arange(m, dtype=np.int32), 2)
+    leg_side = np.repeat(np.array([0, 1], dtype=np.int8), m)
+    wy, wx = target_weights(pair_index, beta, spread_pos, gross_leverage)
+    target = np.concatenate([wy, wx], axis=1)
+
+    # Per-leg views of the market, gathered once.
+    leg_ret = np.nan_to_num(market.returns[:, col])
+    tradable = np.isfinite(market.prices[:, col])
+    leg_cap = None if cap is None else cap[:, col]
+    holders = [c for c in costs if type(c).holding_cost is not CostModel.holding_cost]
+    fillers = [c for c in costs if type(c).fill_cost is not CostModel.fill_cost]
+
+    held = np.zeros(2 * m)
+    working = np.zeros(2 * m)
+    submitted = np.full(2 * m, -1, dtype=np.int64)
+    filled = np.zeros((n, 2 * m))
+    leg_cost = np.zeros((n, 2 * m))
+    leg_traded = np.zeros((n, 2 * m))
+    queue = FillQueue(4 * m)
+    n_orders = 0
+
+    for t in range(n):
+        if holders and held.any():
+            for c in holders:
+                leg_cost[t] += c.holding_cost(t, col, held)
+
+        order = target[t] - held
+        changed = order != working
+        if changed.any():
+            n_orders += int(np.count_nonzero(changed & (order != 0.0)))
+            submitted[changed & (working == 0.0)] = t
+            working = order
+
+        qty = np.where(tradable[t], working, 0.0)
+        if leg_cap is not None:
+            qty = np.sign(qty) * np.minimum(np.abs(qty), leg_cap[t])
+        if min_ticket > 0.0:
+            qty = np.where((np.abs(qty) * capital >= min_ticket) | (target[t] == 0.0), qty, 0.0)
+
+        k = np.flatnonzero(qty)
+        if len(k):
+            q = qty[k]
+            fill_cost = np.zeros(len(k))
+            for c in fillers:
+                fill_cost += c.fill_cost(t, col[k], q)
+            queue.push(bar=np.full(len(k), t), submitted=submitted[k], leg=k, qty=q, cost=fill_cost)
+            leg_cost[t, k] += fill_cost
+            leg_traded[t, k] = np.abs(q)
+            # A complete fill lands exactly on the target (no rounding drift).
+            done = q == working[k]
+            held[k] = np.where(done, target[t, k], held[k] + q)
+            working[k] = np.where(done, 0.0, working[k] - q)
+            # Done orders leave the queue; partially filled ones keep their submit bar.
+            submitted[k[done]] = -1
+        filled[t] = held
+
+    # Bar t earns the weights held after bar t - 1's fills.
+    earned = np.zeros((n, 2 * m))
+    earned[1:] = filled[:-1] * leg_ret[1:]
+    gross = earned[:, :m] + earned[:, m:]
+    cost = leg_cost[:, :m] + leg_cost[:, m:]
+    traded = leg_traded[:, :m] + leg_traded[:, m:]
+
+    fills = queue.array()
+    leg = fills["leg"].astype(np.int64)
+    fills["pair"] = leg_pair[leg]
+    fills["ticker"] = used[col[leg]]
+    fills["price"] = market.prices[fills["bar"], col[leg]]
+    fills["leg"] = leg_side[leg]
+
+    bt = MatrixBacktest(
+        ret_gross=gross,
+        ret_net=gross - cost,
+        wy=filled[:, :m],
+        wx=filled[:, m:],
+        turnover=traded,
+        cost=cost,
+        index=index,
+        pairs=pairs,
+    )
+    return ExecutionResult(bt, fills, n_orders)
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .config import StrategyConfig
+from .profiling import timed
+from .stability import MONITOR_TESTS, rolling_adf, rolling_coint
+from .stats import _block_cumsum, _column_means, _window_sum
+
+Panel = np.ndarray | pd.Series | pd.DataFrame
+
+
+def _as_matrix(s: Panel) -> tuple[np.ndarray, bool]:
+    a = np.asarray(s, dtype=float)
+    return (a[:, None], True) if a.ndim == 1 else (a, False)
+
+
+def _like(a: np.ndarray, s: Panel, squeeze: bool, name: str | None = None) -> Panel:
+    """
+    Wrap a (n_obs, n_pairs) result back into the type/shape of the input.
+    """
+    if squeeze:
+        a = a[:, 0]
+    if isinstance(s, pd.DataFrame):
+        return pd.DataFrame(a, index=s.index, columns=s.columns)
+    if isinstance(s, pd.Series):
+        return pd.Series(a, index=s.index, name=name)
+    return a
+
+
+def _centered(a: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (a minus its column means, NaN -> 0; validity mask as float).
+    """
+    valid = np.isfinite(a)
+    mean = _column_means(a, valid)
+    return np.where(valid, a - mean, 0.0), valid.astype(float)
+
+
+def _rolling_std(a: np.ndarray, lookback: int, min_periods: int) -> np.ndarray:
+    """
+    Trailing population std over the valid values of each window
+    (pandas .rolling(lookback, min_periods).std(ddof=0)), in O(n).
+    """
+    ac, valid = _centered(a)
+    n = _window_sum(valid, lookback)
+    s1 = _window_sum(ac, lookback)
+    s2 = _window_sum(ac * ac, lookback)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var = np.clip((s2 - s1 * s1 / n) / n, 0.0, None)
+    return np.where(n >= min_periods, np.sqrt(var), np.nan)
+
+
+def rolling_slope(s: Panel, lookback: int = 60, min_periods: int | None = None) -> Panel:
+    """
+    OLS slope of each column on bar number over the trailing `lookback` bars,
+    in O(n) from windowed sums (no per-bar regression).
+
+    Rows before the first full window use the bars so far once there are at
+    least `min_periods` (default max(30, lookback // 2)); windows containing
+    a NaN are NaN.
+    """
+    if min_periods is None:
+        min_periods = max(30, lookback // 2)
+    a, squeeze = _as_matrix(s)
+    n_obs = a.shape[0]
+    yc, valid = _centered(a)
+
+    t = np.arange(n_obs, dtype=float)[:, None]
+    count = _window_sum(valid, lookback)
+    sy = _window_sum(yc, lookback)
+    # Bar numbers counted from the start of each bar's lookback block keep the
+    # t * y products (and the t_mean * sy cancellation) window-sized rather than
+    # sample-sized; the window's rows in the previous block sit `lookback` lower.
+    tl = t % lookback
+    sty = _window_sum(tl * yc, lookback) - lookback * (sy - _block_cumsum(yc, lookback))
+
+    # Windows are contiguous bars i-m+1..i, so sum(t - t_mean)^2 = m(m^2 - 1)/12.
+    m = np.minimum(t + 1, lookback)
+    t_mean = tl - (m - 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (sty - t_mean * sy) / (m * (m * m - 1) / 12)
+    slope = np.where((count == m) & (m >= min_periods), slope, np.nan)
+    return _like(slope, s, squeeze, "slope")
+
+
+def rolling_vol(s: Panel, lookback: int = 20, min_periods: int | None = None) -> Panel:
+    """
+    Trailing population std of bar-to-bar changes (min_periods default max(10, lookback // 2)).
+    """
+    if min_periods is None:
+        min_periods = max(10, lookback // 2)
+    a, squeeze = _as_matrix(s)
+    diff = np.vstack([np.full((1, a.shape[1]), np.nan), np.diff(a, axis=0)])
+    return _like(_rolling_std(diff, lookback, min_periods), s, squeeze, "vol")
+
+
+def causal_quantile(s: Panel, q: float, window: int | None = None, min_periods: int = 20) -> Panel:
+    """
+    Quantile `q` of each column using only data up to each bar: expanding
+    (window=None) or over the trailing `window` bars. NaN until `min_periods`
+    valid values are seen. Linear interpolation, like Series.quantile.
+    """
+    a, squeeze = _as_matrix(s)
+    df = pd.DataFrame(a)
+    roll = df.expanding(min_periods) if window is None else df.rolling(window, min_periods=min_periods)
+    return _like(roll.quantile(q).values, s, squeeze, "threshold")
+
+
+@timed
+def vol_filter(
+    spread: Panel,
+    lookback: int = 20,
+    max_pctile: float = 0.8,
+    window: int | None = None,
+    min_periods: int | None = None,
+) -> Panel:
+    """
+    True where the spread's rolling vol (rolling_vol) is at or below its own
+    `max_pctile` quantile so far (causal_quantile over `window` bars, expanding
+    by default; first `min_periods` bars, default lookback, are not allowed).
+
+    Notebook 04's version took the quantile over the whole sample, which
+    uses future data.
+    """
+    a, squeeze = _as_matrix(spread)
+    vol = rolling_vol(a, lookback)
+    thr = causal_quantile(vol, max_pctile, window, lookback if min_periods is None else min_periods)
+    with np.errstate(invalid="ignore"):
+        ok = vol <= thr
+    return _like(ok, spread, squeeze, "vol_ok")
+
+
+@timed
+def trend_filter(spread: Panel, lookback: int = 60, max_abs_slope_z: float = 1.5) -> Panel:
+    """
+    True where |slope * lookback / rolling std| <= max_abs_slope_z, i.e. the
+    drift over one window is small next to the spread's own variability.
+    """
+    a, squeeze = _as_matrix(spread)
+    min_periods = max(30, lookback // 2)
+    slope = rolling_slope(a, lookback, min_periods)
+    std = _rolling_std(a, lookback, min_periods)
+    with np.errstate(invalid="ignore"):
+        ok = np.abs(slope * lookback / (std + 1e-12)) <= max_abs_slope_z
+    return _like(ok, spread, squeeze, "trend_ok")
+
+
+@timed
+def monitor_pvalues(
+    spread: Panel,
+    y: Panel | None = None,
+    x: Panel | None = None,
+    test: str = "eg",
+    window: int = 252,
+    lags: int = 1,
+) -> Panel:
+    """
+    P-values of the trailing-window stability test (stability.py) behind
+    coint_filter, NaN before the first full window:
+      - "eg":  Engle-Granger of the legs y on x (rolling_coint)
+      - "adf": ADF of the spread itself (rolling_adf)
+    """
+    if test not in MONITOR_TESTS:
+        raise ValueError(f"Unknown monitor_test: {test!r} (choose from {', '.join(MONITOR_TESTS)})")
+    a, squeeze = _as_matrix(spread)
+    if test == "eg":
+        if y is None or x is None:
+            raise ValueError("coint_filter(test='eg') needs the price legs y and x")
+        res = rolling_coint(_as_matrix(y)[0], _as_matrix(x)[0], window, lags)
+    else:
+        res = rolling_adf(a, window, lags)
+    return _like(res.pvalue, spread, squeeze, "monitor_pvalue")
+
+
+def coint_filter(
+    spread: Panel,
+    y: Panel | None = None,
+    x: Panel | None = None,
+    test: str = "eg",
+    window: int = 252,
+    lags: int = 1,
+    max_pvalue: float = 0.10,
+    pvalues: Panel | None = None,
+) -> Panel:
+    """
+    True where the trailing-window stability test still holds, i.e. its
+    p-value (monitor_pvalues, or `pvalues` when already computed) is at most
+    `max_pvalue`. The window ends at the bar itself, like the other filters.
+    Bars before the first full window are not allowed.
+    """
+    if pvalues is None:
+        pvalues = monitor_pvalues(spread, y, x, test, window, lags)
+    a, squeeze = _as_matrix(pvalues)
+    with np.errstate(invalid="ignore"):
+        ok = a <= max_pvalue
+    return _like(ok, spread, squeeze, "coint_ok")
+
+
+def trade_allowed(
+    spread: Panel,
+    cfg: StrategyConfig,
+    y: Panel | None = None,
+    x: Panel | None = None,
+    monitor: Panel | None = None,
+) -> Panel | None:
+    """
+    Combined trade-allowed mask of the regime filters and the stability
+    monitor enabled in `cfg` (None when none are), for
+    positions_from_z(..., allowed=). y / x are the price legs behind the
+    spread, needed by the Engle-Granger monitor; `monitor` passes its
+    p-values (monitor_pvalues) when the caller already has them.
+    """
+    masks = []
+    if cfg.coint_monitor:
+        masks.append(coint_filter(
+            spread, y, x, cfg.monitor_test, cfg.monitor_window, cfg.monitor_lags, cfg.monitor_max_pvalue,
+            pvalues=monitor,
+        ))
+    if cfg.vol_filter:
+        masks.append(vol_filter(spread, cfg.vol_lookback, cfg.vol_max_pctile, cfg.filter_quantile_window))
+    if cfg.trend_filter:
+        masks.append(trend_filter(spread, cfg.trend_lookback, cfg.trend_max_slope_z))
+    if not masks:
+        return None
+    out = masks[0]
+    for m in masks[1:]:
+        out = out & m
+    if isinstance(out, pd.Series):
+        out.name = "trade_ok"
+    return out
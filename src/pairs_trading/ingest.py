@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import io
+import time
+import urllib.parse
+import urllib.request
+import warnings
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+import pandas as pd
+
+from .config import StrategyConfig
+from .profiling import timed
+
+if TYPE_CHECKING:
+    from .store import PriceSource
+
+# Called with (tickers, prices) as each batch arrives.
+BatchCallback = Callable[[list[str], pd.DataFrame], None]
+
+
+def _run_sync(coro: Awaitable[IngestResult]) -> IngestResult:
+    """
+    asyncio.run(coro), on a worker thread when this thread already runs an
+    event loop (Jupyter, async callers), where asyncio.run would raise.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter for coroutines: `rate` tokens per second, up to
+    `burst` banked. acquire() waits until a token is available.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.burst = max(float(burst), 1.0)
+        self.tokens = self.burst
+        self.clock = clock
+        self.sleep = sleep
+        self.stamp = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # One waiter at a time, so tokens go out in arrival order.
+        async with self._lock:
+            while True:
+                now = self.clock()
+                self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await self.sleep((1.0 - self.tokens) / self.rate)
+
+
+class HTTPSource:
+    """
+    PriceSource over a plain HTTP endpoint (e.g. an internal price service or
+    a local stub server in tests):
+      GET <url>?tickers=A,B&start=YYYY-MM-DD[&end=YYYY-MM-DD][&interval=1d]
+    answering CSV with a date column first and one column per ticker.
+    Non-2xx answers raise (urllib.error.HTTPError), so the ingestor retries them.
+    """
+
+    def __init__(self, url: str, interval: str = "1d", timeout: float = 30.0):
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+
+    def fetch(self, tickers: list[str], start: str, end: str | None) -> pd.DataFrame:
+        query = {"tickers": ",".join(tickers), "start": start, "interval": self.interval}
+        if end is not None:
+            query["end"] = end
+        with urllib.request.urlopen(f"{self.url}?{urllib.parse.urlencode(query)}", timeout=self.timeout) as resp:
+            body = resp.read().decode()
+        df = pd.read_csv(io.StringIO(body), index_col=0, parse_dates=[0])
+        return df.sort_index().dropna(how="all")
+
+
+@dataclass
+class IngestResult:
+    """
+    Outcome of one AsyncIngestor run: the merged prices, the tickers that
+    still failed after retries (isolated one by one) and the request count.
+    """
+    prices: pd.DataFrame
+    failed: list[str] = field(default_factory=list)
+    requests: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+class AsyncIngestor:
+    """
+    Concurrent batched downloads behind the PriceSource interface.
+
+    The universe is split into batches of `batch_size` tickers, fetched by
+    the wrapped `source` (a blocking PriceSource, run in worker threads) with:
+      - at most `max_concurrency` batches in flight (asyncio.Semaphore)
+      - at most `rate` requests per second, `burst` at once (TokenBucket)
+      - `retries` retries per batch, sleeping backoff * 2**attempt (capped at
+        max_backoff) in between
+      - a batch that still fails is split in half and each half retried, so
+        one bad ticker only loses itself
+    Tickers missing or all-NaN in an answer count as failed too (yfinance
+    reports a bad ticker that way instead of raising): the rest of the batch
+    is kept and only they are retried. ingest() warns about the tickers that
+    failed for good.
+    `on_batch(tickers, prices)` runs as soon as each batch arrives (e.g. to
+    write it to disk: PriceStore.refresh uses it), in the event loop thread,
+    so callbacks never run concurrently. Async code can `await run(...)`;
+    ingest() and fetch() also work inside a running loop (notebooks), where
+    they block on a private loop in a worker thread.
+    """
+
+    def __init__(
+        self,
+        source: PriceSource,
+        batch_size: int = 50,
+        max_concurrency: int = 4,
+        rate: float = 2.0,
+        burst: float = 1.0,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        self.source = source
+        self.batch_size = max(int(batch_size), 1)
+        self.max_concurrency = max(int(max_concurrency), 1)
+        self.rate = rate
+        self.burst = burst
+        self.retries = int(retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+
+    @classmethod
+    def from_config(cls, cfg: StrategyConfig, source: PriceSource) -> AsyncIngestor:
+        return cls(
+            source, cfg.ingest_batch_size, cfg.ingest_concurrency, cfg.ingest_rate,
+            retries=cfg.ingest_retries,
+        )
+
+    def batches(self, tickers: list[str]) -> list[list[str]]:
+        return [tickers[i : i + self.batch_size] for i in range(0, len(tickers), self.batch_size)]
+
+    async def run(
+        self,
+        tickers: list[str],
+        start: str,
+        end: str | None = None,
+        on_batch: BatchCallback | None = None,
+    ) -> IngestResult:
+        bucket = TokenBucket(self.rate, self.burst, sleep=self.sleep)
+        gate = asyncio.Semaphore(self.max_concurrency)
+        result = IngestResult(pd.DataFrame())
+        frames: list[pd.DataFrame] = []
+
+        async def attempt(batch: list[str]) -> pd.DataFrame:
+            async with gate:
+                await bucket.acquire()
+                result.requests += 1
+                return await asyncio.to_thread(self.source.fetch, batch, start, end)
+
+        def deliver(batch: list[str], prices: pd.DataFrame) -> list[str]:
+            # Keep the tickers with data; return the ones still missing.
+            got = [t for t in batch if t in prices.columns and prices[t].notna().any()]
+            if got:
+                frames.append(prices[got])
+                if on_batch is not None:
+                    on_batch(got, prices[got])
+            return [t for t in batch if t not in got]
+
+        async def fetch(batch: list[str]) -> None:
+            for k in range(self.retries + 1):
+                try:
+                    prices = await attempt(batch)
+                except Exception as e:  # provider errors are opaque (HTTP, parsing, yfinance)
+                    result.errors.append(f"{','.join(batch)}: {type(e).__name__}: {e}")
+                else:
+                    batch = deliver(batch, prices)
+                    if not batch:
+                        return
+                    result.errors.append(f"{','.join(batch)}: no data returned")
+                if k < self.retries:
+                    await self.sleep(min(self.backoff * 2**k, self.max_backoff))
+            if len(batch) == 1:
+                result.failed.append(batch[0])
+                return
+            half = len(batch) // 2
+            await asyncio.gather(fetch(batch[:half]), fetch(batch[half:]))
+
+        await asyncio.gather(*(fetch(b) for b in self.batches(list(tickers))))
+        if frames:
+            prices = pd.concat(frames, axis=1).sort_index()
+            result.prices = prices[[t for t in tickers if t in prices.columns]].dropna(how="all")
+        result.failed.sort(key=list(tickers).index)
+        return result
+
+    @timed(rows=lambda self, tickers, *args, **kwargs: len(tickers))
+    def ingest(
+        self,
+        tickers: list[str],
+        start: str,
+        end: str | None = None,
+        on_batch: BatchCallback | None = None,
+    ) -> IngestResult:
+        """
+        run() from synchronous code; warns (RuntimeWarning) with the tickers
+        that failed every retry. Inside a running event loop it runs on a
+        worker thread (blocking the caller); prefer `await run(...)` there.
+        """
+        result = _run_sync(self.run(tickers, start, end, on_batch))
+        if result.failed:
+            warnings.warn(
+                f"{len(result.failed)} ticker(s) got no data after {self.retries} retries: "
+                f"{', '.join(result.failed)} (last error: {result.errors[-1]})",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        return result
+
+    def fetch(self, tickers: list[str], start: str, end: str | None) -> pd.DataFrame:
+        """
+        PriceSource.fetch: tickers that failed are simply missing.
+        """
+        return self.ingest(tickers, start, end).prices
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .cache import memoize
+from .profiling import timed
+
+# Observations used to seed beta (and alpha) by OLS, as in notebook 04 (see _initial_ols).
+INIT_OBS = 100
+
+
+def _initial_ols(Y: np.ndarray, X: np.ndarray, n_init: int = INIT_OBS) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Per-column OLS y ~ alpha + beta*x on the first n_init jointly valid rows.
+
+    Notebook 04 fits its seed on the first n_init rows of the pair's index
+    minus rows with a missing leg. Its price panel is dropna()'d, so on the
+    notebook's data both are the same rows. On a ragged panel the first
+    n_init rows of a late-listed ticker would hold no data at all, so here
+    the seed always uses n_init observations.
+    """
+    valid = np.isfinite(Y) & np.isfinite(X)
+    use = valid & (np.cumsum(valid, axis=0) <= n_init)
+    n = use.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mx = np.where(use, X, 0.0).sum(axis=0) / n
+        my = np.where(use, Y, 0.0).sum(axis=0) / n
+        xc = np.where(use, X - mx, 0.0)
+        yc = np.where(use, Y - my, 0.0)
+        beta = (xc * yc).sum(axis=0) / (xc * xc).sum(axis=0)
+    return my - beta * mx, beta
+
+
+class KalmanHedge:
+    """
+    Random-walk Kalman filter for hedge ratios, run for many pairs at once.
+
+    Model (per pair):
+      state_t = state_{t-1} + w_t,          w_t ~ N(0, q*I)
+      y_t     = [alpha_t +] beta_t * x_t + v_t,  v_t ~ N(0, r)
+
+    intercept=False is the 1D beta-only filter of notebook 04; intercept=True
+    filters the 2-state [alpha_t, beta_t], whose q / r defaults are not
+    calibrated yet (library use only, not exposed on the CLI). Every operation is an array op over
+    the pair dimension, so update() advances all pairs by one bar in O(pairs)
+    without touching history. Bars where a leg is NaN only run the predict step.
+    """
+
+    def __init__(
+        self,
+        pair_index: np.ndarray,
+        q: float = 1e-5,
+        r: float = 1e-2,
+        intercept: bool = False,
+        init_beta: np.ndarray | None = None,
+        init_alpha: np.ndarray | None = None,
+        init_P: float = 1.0,
+    ):
+        self.pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+        n = len(self.pair_index)
+        self.q = float(q)
+        self.r = float(r)
+        self.intercept = intercept
+        self.beta = np.zeros(n) if init_beta is None else np.asarray(init_beta, dtype=float).copy()
+        self.alpha = np.zeros(n) if init_alpha is None else np.asarray(init_alpha, dtype=float).copy()
+        k = 2 if intercept else 1
+        self.P = np.zeros((n, k, k))
+        self.P[:, range(k), range(k)] = init_P
+
+    def update(self, prices_t: np.ndarray) -> np.ndarray:
+        """
+        Advance one bar given a row of ticker prices; returns beta per pair.
+        """
+        prices_t = np.asarray(prices_t, dtype=float)
+        return self.update_legs(prices_t[self.pair_index[:, 0]], prices_t[self.pair_index[:, 1]])
+
+    def update_legs(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """
+        Advance one bar given the y and x leg prices of every pair.
+        """
+        ok = np.isfinite(y) & np.isfinite(x)
+        y = np.where(ok, y, 0.0)
+        x = np.where(ok, x, 0.0)
+
+        if not self.intercept:
+            P_pred = self.P[:, 0, 0] + self.q
+            S = (x * x) * P_pred + self.r
+            K = (P_pred * x) / (S + 1e-12)
+            beta_upd = self.beta + K * (y - x * self.beta)
+            P_upd = (1.0 - K * x) * P_pred
+            self.beta = np.where(ok, beta_upd, self.beta)
+            self.P[:, 0, 0] = np.where(ok, P_upd, P_pred)
+            return self.beta
+
+        P_pred = self.P + self.q * np.eye(2)
+        p00, p01, p11 = P_pred[:, 0, 0], P_pred[:, 0, 1], P_pred[:, 1, 1]
+        S = p00 + 2.0 * x * p01 + x * x * p11 + self.r
+        k0 = (p00 + x * p01) / S
+        k1 = (p01 + x * p11) / S
+        e = y - self.alpha - x * self.beta
+
+        self.alpha = np.where(ok, self.alpha + k0 * e, self.alpha)
+        self.beta = np.where(ok, self.beta + k1 * e, self.beta)
+        # P = P_pred - K S K'
+        upd = P_pred.copy()
+        upd[:, 0, 0] -= S * k0 * k0
+        upd[:, 0, 1] -= S * k0 * k1
+        upd[:, 1, 0] -= S * k0 * k1
+        upd[:, 1, 1] -= S * k1 * k1
+        self.P = np.where(ok[:, None, None], upd, P_pred)
+        return self.beta
+
+    def filter(self, prices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Run update() over every row of a (n_obs, n_tickers) panel.
+        Returns (beta, alpha) as (n_obs, n_pairs), NaN where a leg is missing.
+        """
+        prices = np.asarray(prices, dtype=float)
+        Y = prices[:, self.pair_index[:, 0]]
+        X = prices[:, self.pair_index[:, 1]]
+        betas = np.empty(Y.shape)
+        alphas = np.empty(Y.shape)
+        for t in range(len(Y)):
+            betas[t] = self.update_legs(Y[t], X[t])
+            alphas[t] = self.alpha
+        missing = ~(np.isfinite(Y) & np.isfinite(X))
+        betas[missing] = np.nan
+        alphas[missing] = np.nan
+        return betas, alphas
+
+
+def kalman_hedge_matrix(
+    prices: np.ndarray | pd.DataFrame,
+    pair_index: np.ndarray,
+    q: float = 1e-5,
+    r: float = 1e-2,
+    intercept: bool = False,
+    init_P: float = 1.0,
+) -> tuple[np.ndarray, np.ndarray, KalmanHedge]:
+    """
+    Kalman beta/alpha for all pairs of a price panel, seeded by OLS on each
+    pair's first INIT_OBS valid rows. Also returns the filter, positioned after
+    the last bar, ready for live update() calls.
+    """
+    values = np.asarray(prices.values if isinstance(prices, pd.DataFrame) else prices, dtype=float)
+    pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+    alpha0, beta0 = _initial_ols(values[:, pair_index[:, 0]], values[:, pair_index[:, 1]])
+    kf = KalmanHedge(
+        pair_index, q=q, r=r, intercept=intercept,
+        init_beta=beta0, init_alpha=alpha0 if intercept else None, init_P=init_P,
+    )
+    beta, alpha = kf.filter(values)
+    return beta, alpha, kf
+
+
+@timed
+@memoize
+def kalman_beta(
+    y: pd.Series,
+    x: pd.Series,
+    q: float = 1e-5,
+    r: float = 1e-2,
+    intercept: bool = False,
+    init_P: float = 1.0,
+) -> pd.Series:
+    """
+    Kalman hedge ratio for one pair, aligned to the y/x index (NaN where a leg is missing).
+    """
+    y2, x2 = y.align(x, join="inner")
+    beta, _, _ = kalman_hedge_matrix(
+        np.column_stack([y2.values, x2.values]), np.array([[0, 1]]),
+        q=q, r=r, intercept=intercept, init_P=init_P,
+    )
+    return pd.Series(beta[:, 0], index=y2.index, name="beta_kalman")
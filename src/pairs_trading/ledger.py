@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .backtest import MatrixBacktest, backtest_matrix
+
+# One row per trade (a run of bars holding the same non-zero spread position).
+# entry: first bar holding the position; exit: first bar no longer holding it
+# (n_obs / NaT while still open). Returns of bar t come from bar t-1's position,
+# so pnl sums bars (entry, exit] and cost sums bars [entry, exit].
+TRADE_DTYPE = np.dtype(
+    [
+        ("pair", np.int32),             # column in TradeLedger.pairs
+        ("entry", np.int64),            # row numbers in TradeLedger.index
+        ("exit", np.int64),
+        ("entry_time", "datetime64[ns]"),
+        ("exit_time", "datetime64[ns]"),
+        ("side", np.int8),              # +1 long spread, -1 short spread
+        ("beta", np.float64),           # hedge ratio at entry
+        ("notional", np.float64),       # gross notional at entry
+        ("pnl", np.float64),            # gross PnL / return over the trade
+        ("cost", np.float64),           # transaction costs over the trade
+    ]
+)
+
+
+def _cumsum0(a: np.ndarray) -> np.ndarray:
+    """
+    Row-wise cumulative nansum with a leading zero row: out[t] = sum(a[:t]).
+    """
+    out = np.zeros((a.shape[0] + 1,) + a.shape[1:])
+    np.cumsum(np.nan_to_num(a), axis=0, out=out[1:])
+    return out
+
+
+def extract_trades(
+    pos: np.ndarray,
+    pnl: np.ndarray,
+    cost: np.ndarray,
+    beta: np.ndarray,
+    notional: np.ndarray,
+    index: pd.Index | None = None,
+    pair_offset: int = 0,
+) -> np.ndarray:
+    """
+    Collapse (n_obs, n_pairs) daily arrays into TRADE_DTYPE rows, ordered by pair then entry.
+    NaN positions count as flat (the backtest gives them no weight either).
+    """
+    p = np.nan_to_num(np.asarray(pos, dtype=float))
+    n, m = p.shape
+    padded = np.vstack([np.zeros((1, m)), p, np.zeros((1, m))])
+    # Bar t starts a new run when its position differs from bar t-1 (t = n closes the last run).
+    col, t = np.nonzero((padded[1:] != padded[:-1]).T)
+    same = col[:-1] == col[1:]
+    start, stop, j = t[:-1][same], t[1:][same], col[:-1][same]
+    held = p[start, j] != 0.0
+    start, stop, j = start[held], stop[held], j[held]
+
+    last = np.minimum(stop, n - 1)
+    cp, cc = _cumsum0(pnl), _cumsum0(cost)
+    out = np.empty(len(start), dtype=TRADE_DTYPE)
+    out["pair"] = j + pair_offset
+    out["entry"] = start
+    out["exit"] = stop
+    out["side"] = p[start, j]
+    out["beta"] = beta[start, j]
+    out["notional"] = notional[start, j]
+    out["pnl"] = cp[last + 1, j] - cp[start + 1, j]
+    out["cost"] = cc[last + 1, j] - cc[start, j]
+    if index is not None and isinstance(index, pd.DatetimeIndex):
+        times = np.append(index.values.astype("datetime64[ns]"), np.datetime64("NaT", "ns"))
+        out["entry_time"] = times[start]
+        out["exit_time"] = times[stop]
+    else:
+        out["entry_time"] = out["exit_time"] = np.datetime64("NaT", "ns")
+    return out
+
+
+def _trade_rows(trades: np.ndarray, n_obs: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Bars [entry, exit] of every trade (exit clipped to the last bar), flattened
+    in trade order, and the trade each of those bars belongs to.
+    """
+    lengths = np.minimum(trades["exit"], n_obs - 1) - trades["entry"] + 1
+    owner = np.repeat(np.arange(len(trades)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    rows = np.arange(lengths.sum()) - np.repeat(starts, lengths) + trades["entry"][owner]
+    return rows, owner
+
+
+@dataclass
+class TradeLedger:
+    """
+    Sparse backtest result: one TRADE_DTYPE row per trade instead of six dense
+    (n_obs, n_pairs) float arrays.
+
+    To rebuild daily series, `legs` keeps the (y price, x price, beta) of the
+    bars [entry, exit] of each trade, concatenated in trade order (see
+    _trade_rows): bar t's return only needs bars t-1 and t, and flat bars are
+    NaN anyway. So daily returns are only computed when asked for (returns(),
+    backtest()), match backtest_matrix exactly, and the ledger holds no
+    dense input. metrics.summarize / equity_curve and equal_weight_portfolio
+    accept a ledger directly and use its equal-weight portfolio returns.
+    """
+    trades: np.ndarray
+    index: pd.Index
+    pairs: list[str]
+    legs: np.ndarray | None = None
+    costs: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def n_obs(self) -> int:
+        return len(self.index)
+
+    def __len__(self) -> int:
+        return len(self.trades)
+
+    def positions(self, pairs: np.ndarray | slice | None = None) -> np.ndarray:
+        """
+        Dense (n_obs, n_pairs) spread positions (0 when flat) rebuilt from the trades.
+        """
+        cols = np.arange(len(self.pairs))[pairs if pairs is not None else slice(None)]
+        where = np.full(len(self.pairs), -1)
+        where[cols] = np.arange(len(cols))
+        tr = self.trades[where[self.trades["pair"]] >= 0]
+
+        # +side at entry, -side at exit, cumulated down each column.
+        delta = np.zeros((self.n_obs + 1, len(cols)))
+        np.add.at(delta, (tr["entry"], where[tr["pair"]]), tr["side"])
+        np.add.at(delta, (tr["exit"], where[tr["pair"]]), -tr["side"].astype(float))
+        return np.cumsum(delta, axis=0)[:-1]
+
+    def backtest(self, pairs: np.ndarray | slice | None = None) -> MatrixBacktest:
+        """
+        Daily backtest arrays for the selected pair columns, recomputed from the trades.
+        """
+        if self.legs is None:
+            raise ValueError("This ledger was built without the inputs needed to rebuild daily series")
+        cols = np.arange(len(self.pairs))[pairs if pairs is not None else slice(None)]
+        where = np.full(len(self.pairs), -1)
+        where[cols] = np.arange(len(cols))
+
+        # Scatter the kept bars back into NaN panels: pair k trades columns (2k, 2k+1).
+        rows, owner = _trade_rows(self.trades, self.n_obs)
+        keep = where[self.trades["pair"][owner]] >= 0
+        rows, c = rows[keep], where[self.trades["pair"][owner[keep]]]
+        prices = np.full((self.n_obs, 2 * len(cols)), np.nan)
+        beta = np.full((self.n_obs, len(cols)), np.nan)
+        prices[rows, 2 * c] = self.legs[keep, 0]
+        prices[rows, 2 * c + 1] = self.legs[keep, 1]
+        beta[rows, c] = self.legs[keep, 2]
+        return backtest_matrix(
+            prices, np.arange(2 * len(cols)).reshape(-1, 2), beta, self.positions(cols),
+            index=self.index, pairs=list(np.asarray(self.pairs, dtype=object)[cols]), **self.costs,
+        )
+
+    def returns(self, field: str = "ret_net") -> pd.DataFrame:
+        """
+        Daily `field` (see backtest.BACKTEST_FIELDS) for every pair, index x pairs.
+        """
+        return self.backtest().frame(field)
+
+    def portfolio_returns(self) -> pd.Series:
+        """
+        equal_weight_portfolio of the daily net returns of every pair.
+        """
+        port = self.returns("ret_net").mean(axis=1, skipna=True)
+        port.name = "portfolio_ret"
+        return port
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Trades as a DataFrame with pair names and net PnL (for export / inspection).
+        """
+        df = pd.DataFrame(self.trades)
+        df.insert(1, "pair_name", np.asarray(self.pairs, dtype=object)[df["pair"].values] if len(df) else [])
+        df["net"] = df["pnl"] - df["cost"]
+        return df
+
+    @property
+    def nbytes(self) -> int:
+        return self.trades.nbytes + (0 if self.legs is None else self.legs.nbytes)
+
+
+def as_returns(returns: pd.Series | TradeLedger) -> pd.Series:
+    """
+    Reporting helper: a ledger stands for its equal-weight portfolio returns.
+    """
+    if isinstance(returns, TradeLedger):
+        return returns.portfolio_returns()
+    return returns
+
+
+def trade_ledger(
+    prices: np.ndarray | pd.DataFrame,
+    pair_index: np.ndarray,
+    beta: np.ndarray,
+    spread_pos: np.ndarray,
+    fee_bps_per_leg: float = 1.0,
+    slippage_bps_per_leg: float = 0.0,
+    gross_leverage: float = 1.0,
+    index: pd.Index | None = None,
+    pairs: list[str] | None = None,
+    chunk_size: int = 256,
+) -> TradeLedger:
+    """
+    backtest_matrix, kept as a trade ledger. Pairs are backtested `chunk_size`
+    columns at a time, so the dense daily arrays never exist for more than
+    one chunk; the ledger copies the leg prices and beta of the traded bars
+    only.
+    """
+    if isinstance(prices, pd.DataFrame):
+        index = prices.index if index is None else index
+        prices = prices.values
+    prices = np.asarray(prices, dtype=float)
+    pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+    beta = np.asarray(beta, dtype=float)
+    spread_pos = np.asarray(spread_pos, dtype=float)
+    if index is None:
+        index = pd.RangeIndex(len(prices))
+    if pairs is None:
+        pairs = [f"{a}__{b}" for a, b in pair_index]
+    costs = {
+        "fee_bps_per_leg": fee_bps_per_leg,
+        "slippage_bps_per_leg": slippage_bps_per_leg,
+        "gross_leverage": gross_leverage,
+    }
+
+    chunks = []
+    for c0 in range(0, len(pair_index), chunk_size):
+        sel = slice(c0, c0 + chunk_size)
+        bt = backtest_matrix(prices, pair_index[sel], beta[:, sel], spread_pos[:, sel], **costs)
+        notional = np.abs(bt.wy) + np.abs(bt.wx)
+        chunks.append(extract_trades(spread_pos[:, sel], bt.ret_gross, bt.cost, beta[:, sel], notional, index, c0))
+    trades = np.concatenate(chunks) if chunks else np.empty(0, dtype=TRADE_DTYPE)
+    rows, owner = _trade_rows(trades, len(prices))
+    j = trades["pair"][owner]
+    legs = np.column_stack([prices[rows, pair_index[j, 0]], prices[rows, pair_index[j, 1]], beta[rows, j]])
+    return TradeLedger(trades, index, list(pairs), legs, costs)
@@ -1,48 +1,161 @@
 from __future__ import annotations
 
+import re
+
 import numpy as np
 import pandas as pd
 
+from .ledger import TradeLedger, as_returns
+from .profiling import timed
+
 TRADING_DAYS = 252
+SESSION_HOURS = 6.5  # regular US equity session, for intraday bars
+
+# Bars per trading day / per year by bar_freq unit ("5m", "1h", "1d", "1wk", "1mo").
+_UNIT_PER_DAY = {"m": SESSION_HOURS * 60, "h": SESSION_HOURS, "d": 1.0}
+_UNIT_PER_YEAR = {"wk": 52.0, "mo": 12.0}
+
+
+def periods_per_year(bar_freq: str = "1d") -> float:
+    """
+    Annualization factor for bars of `bar_freq` (yfinance interval syntax):
+    trading days x session bars for intraday bars, so "1d" gives TRADING_DAYS
+    and "1m" TRADING_DAYS * 390.
+    """
+    m = re.fullmatch(r"(\d+)\s*(m|h|d|wk|mo)", bar_freq.strip().lower())
+    if m is None:
+        raise ValueError(f"Unknown bar_freq: {bar_freq!r} (e.g. 1m, 5m, 1h, 1d, 1wk)")
+    n, unit = int(m.group(1)), m.group(2)
+    if unit in _UNIT_PER_YEAR:
+        return _UNIT_PER_YEAR[unit] / n
+    return TRADING_DAYS * _UNIT_PER_DAY[unit] / n
 
-def equity_curve(returns: pd.Series, start: float = 1.0) -> pd.Series:
-    r = returns.fillna(0.0)
+def equity_curve(returns: pd.Series | TradeLedger, start: float = 1.0) -> pd.Series:
+    r = as_returns(returns).fillna(0.0)
     curve = (1.0 + r).cumprod() * start
     curve.name = "equity"
     return curve
 
-def annualized_return(returns: pd.Series) -> float:
-    r = returns.dropna()
+def annualized_return(returns: pd.Series | TradeLedger, periods_per_year: float = TRADING_DAYS) -> float:
+    r = as_returns(returns).dropna()
     if len(r) == 0:
         return np.nan
     curve = (1.0 + r).prod()
-    years = len(r) / TRADING_DAYS
+    years = len(r) / periods_per_year
     return float(curve ** (1 / years) - 1)
 
-def sharpe_ratio(returns: pd.Series) -> float:
-    r = returns.dropna()
+def sharpe_ratio(returns: pd.Series | TradeLedger, periods_per_year: float = TRADING_DAYS) -> float:
+    r = as_returns(returns).dropna()
     if len(r) < 2:
         return np.nan
-    mu = r.mean() * TRADING_DAYS
-    sd = r.std(ddof=1) * np.sqrt(TRADING_DAYS)
+    mu = r.mean() * periods_per_year
+    sd = r.std(ddof=1) * np.sqrt(periods_per_year)
     return float(mu / sd) if sd != 0 else np.nan
 
-def max_drawdown(returns: pd.Series) -> float:
+def max_drawdown(returns: pd.Series | TradeLedger) -> float:
     eq = equity_curve(returns)
     peak = eq.cummax()
     dd = (eq / peak) - 1.0
     return float(dd.min())
 
-def win_rate(returns: pd.Series) -> float:
-    r = returns.dropna()
+def win_rate(returns: pd.Series | TradeLedger) -> float:
+    r = as_returns(returns).dropna()
     if len(r) == 0:
         return np.nan
     return float((r > 0).mean())
 
-def summarize(returns: pd.Series) -> dict[str, float]:
-    return {
-        "annualized_return": annualized_return(returns),
-        "sharpe": sharpe_ratio(returns),
-        "max_drawdown": max_drawdown(returns),
-        "win_rate": win_rate(returns),
-    }
+# Columns of summarize_matrix(), in order.
+METRICS = ("annualized_return", "sharpe", "max_drawdown", "win_rate", "sortino", "calmar", "turnover")
+
+
+def equity_and_drawdown(returns: pd.Series | TradeLedger, start: float = 1.0) -> tuple[pd.Series, pd.Series]:
+    """
+    (equity_curve, drawdown = equity / running peak - 1) from one cumprod.
+    """
+    eq = equity_curve(returns, start)
+    dd = eq / eq.cummax() - 1.0
+    dd.name = "drawdown"
+    return eq, dd
+
+
+@timed(rows=lambda returns, *args, **kwargs: np.shape(returns)[-1] if np.ndim(returns) > 1 else 1)
+def summarize_matrix(
+    returns: np.ndarray | pd.DataFrame,
+    turnover: np.ndarray | pd.DataFrame | None = None,
+    names: list[str] | None = None,
+    periods_per_year: float = TRADING_DAYS,
+) -> pd.DataFrame:
+    """
+    METRICS for every column of a (n_obs, n_strategies) returns matrix
+    (NaN = no return that bar), one row per strategy.
+
+    Everything comes from one NaN-filled copy of the matrix: a single cumprod
+    gives both the total growth and the drawdowns, and the moment sums give
+    Sharpe and Sortino, instead of one dropna / equity rebuild per metric and
+    per series. Each column matches the per-series functions above:
+      - annualized_return, sharpe, max_drawdown, win_rate as summarize()
+      - sortino: annualized mean / annualized downside deviation
+        (root mean square of min(r, 0) over valid bars)
+      - calmar:  annualized_return / |max_drawdown|
+      - turnover: mean per-bar traded notional (`turnover`, same shape as
+        returns, e.g. Portfolio.turnover()) times periods_per_year; NaN without it
+    Annualization uses `periods_per_year` bars (see periods_per_year()).
+    """
+    if names is None and isinstance(returns, pd.DataFrame):
+        names = [str(c) for c in returns.columns]
+    r = np.asarray(returns, dtype=float)
+    if r.ndim == 1:
+        r = r[:, None]
+    valid = np.isfinite(r)
+    filled = np.where(valid, r, 0.0)
+    n = valid.sum(axis=0)
+
+    equity = np.cumprod(1.0 + filled, axis=0)
+    peak = np.maximum.accumulate(equity, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = equity[-1] if len(r) else np.ones(r.shape[1])
+        ann_ret = np.where(n > 0, growth ** (periods_per_year / n) - 1.0, np.nan)
+        max_dd = (equity / peak).min(axis=0) - 1.0 if len(r) else np.full(r.shape[1], np.nan)
+
+        mean = filled.sum(axis=0) / n
+        dev = np.where(valid, r - mean, 0.0)
+        sd = np.sqrt((dev * dev).sum(axis=0) / (n - 1))
+        sharpe = np.where((n >= 2) & (sd != 0), mean / sd * np.sqrt(periods_per_year), np.nan)
+
+        down = np.minimum(filled, 0.0)
+        dsd = np.sqrt((down * down).sum(axis=0) / n)
+        sortino = np.where((n >= 2) & (dsd != 0), mean / dsd * np.sqrt(periods_per_year), np.nan)
+
+        wins = np.where(n > 0, (filled > 0).sum(axis=0) / n, np.nan)
+        calmar = np.where(max_dd < 0, ann_ret / np.abs(max_dd), np.nan)
+
+    if turnover is None:
+        turn = np.full(r.shape[1], np.nan)
+    else:
+        t = np.asarray(turnover, dtype=float).reshape(r.shape)
+        with np.errstate(invalid="ignore"):
+            turn = np.nanmean(t, axis=0) * periods_per_year
+
+    return pd.DataFrame(
+        dict(zip(METRICS, (ann_ret, sharpe, max_dd, wins, sortino, calmar, turn))),
+        index=pd.Index(names if names is not None else range(r.shape[1]), name="strategy"),
+    )
+
+
+@timed
+def summarize(
+    returns: pd.Series | TradeLedger,
+    turnover: pd.Series | np.ndarray | None = None,
+    periods_per_year: float = TRADING_DAYS,
+) -> dict[str, float]:
+    """
+    summarize_matrix for a single return series, as a dict (turnover only
+    when given).
+    """
+    r = as_returns(returns)
+    t = None if turnover is None else np.asarray(turnover)[:, None]
+    row = summarize_matrix(r.values[:, None], t, periods_per_year=periods_per_year).iloc[0]
+    out = {k: float(v) for k, v in row.items()}
+    if turnover is None:
+        del out["turnover"]
+    return out
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .config import StrategyConfig
+
+# Arrays that make up the engine state (everything else is in the JSON header).
+_STATE_FIELDS = (
+    "pair_index", "entry_z", "exit_z",
+    "ref", "bx", "by", "b_head", "b_count", "b_since", "sx", "sy", "sxx", "sxy",
+    "z_ref", "zs", "s1", "s2", "z_count", "state",
+)
+
+
+@dataclass
+class OnlineBar:
+    """
+    One bar of engine output; every field has shape (n_pairs,).
+    """
+    beta: np.ndarray
+    spread: np.ndarray
+    z: np.ndarray
+    position: np.ndarray
+
+
+class OnlinePairEngine:
+    """
+    Bar-by-bar version of rolling_ols_beta -> compute_spread -> rolling_zscore
+    -> positions_from_z for many pairs.
+
+    Holds per-pair ring buffers of the last beta_lookback valid (x, y) rows and
+    the last z_lookback spreads, plus their running sums, so update() costs
+    O(pairs) per bar however long the history. Same NaN rules as the batch path:
+      - the beta window only advances on rows where both legs are valid
+      - the z window advances every bar and is NaN until it holds z_lookback
+        finite spreads
+      - NaN z leaves the position state untouched and outputs NaN
+
+    Running sums are rebuilt from the buffers once per window length (amortized
+    O(1)) so rounding does not accumulate; outputs match the batch path to
+    ~1e-9 relative. save()/load() snapshot the full state for restarts.
+    """
+
+    def __init__(
+        self,
+        pair_index: np.ndarray,
+        beta_lookback: int = 252,
+        z_lookback: int = 60,
+        entry_z: float | np.ndarray = 2.0,
+        exit_z: float | np.ndarray = 0.5,
+    ):
+        self.pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+        n = len(self.pair_index)
+        self.beta_lookback = int(beta_lookback)
+        self.z_lookback = int(z_lookback)
+        self.entry_z = np.broadcast_to(np.asarray(entry_z, dtype=float), (n,)).copy()
+        self.exit_z = np.broadcast_to(np.asarray(exit_z, dtype=float), (n,)).copy()
+        self.n_bars = 0
+
+        # Beta window: prices shifted by the pair's first valid (y, x) to avoid cancellation.
+        self.ref = np.full((n, 2), np.nan)
+        self.bx = np.zeros((n, self.beta_lookback))
+        self.by = np.zeros((n, self.beta_lookback))
+        self.b_head = np.zeros(n, dtype=int)
+        self.b_count = np.zeros(n, dtype=int)
+        self.b_since = np.zeros(n, dtype=int)
+        self.sx = np.zeros(n)
+        self.sy = np.zeros(n)
+        self.sxx = np.zeros(n)
+        self.sxy = np.zeros(n)
+
+        # z window: spreads shifted by the first finite spread; NaN slots allowed.
+        self.z_ref = np.full(n, np.nan)
+        self.zs = np.full((n, self.z_lookback), np.nan)
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros(n)
+        self.z_count = np.zeros(n, dtype=int)
+
+        self.state = np.zeros(n)
+
+    @classmethod
+    def from_config(cls, cfg: StrategyConfig, pair_index: np.ndarray) -> OnlinePairEngine:
+        return cls(pair_index, cfg.beta_lookback, cfg.z_lookback, cfg.entry_z, cfg.exit_z)
+
+    def _update_beta(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        ok = np.isfinite(y) & np.isfinite(x)
+        first = ok & np.isnan(self.ref[:, 0])
+        self.ref[first] = np.column_stack([y, x])[first]
+
+        rows = np.flatnonzero(ok)
+        h = self.b_head[rows]
+        xn = x[rows] - self.ref[rows, 1]
+        yn = y[rows] - self.ref[rows, 0]
+        xo = self.bx[rows, h]
+        yo = self.by[rows, h]
+        self.sx[rows] += xn - xo
+        self.sy[rows] += yn - yo
+        self.sxx[rows] += xn * xn - xo * xo
+        self.sxy[rows] += xn * yn - xo * yo
+        self.bx[rows, h] = xn
+        self.by[rows, h] = yn
+        self.b_head[rows] = (h + 1) % self.beta_lookback
+        self.b_count[rows] = np.minimum(self.b_count[rows] + 1, self.beta_lookback)
+        self.b_since[rows] += 1
+
+        stale = np.flatnonzero(self.b_since >= self.beta_lookback)
+        if len(stale):
+            bx, by = self.bx[stale], self.by[stale]
+            self.sx[stale] = bx.sum(axis=1)
+            self.sy[stale] = by.sum(axis=1)
+            self.sxx[stale] = (bx * bx).sum(axis=1)
+            self.sxy[stale] = (bx * by).sum(axis=1)
+            self.b_since[stale] = 0
+
+        L = self.beta_lookback
+        with np.errstate(divide="ignore", invalid="ignore"):
+            vxx = self.sxx - self.sx * self.sx / L
+            cxy = self.sxy - self.sx * self.sy / L
+            beta = cxy / vxx
+        return np.where(ok & (self.b_count == L) & (vxx > 0), beta, np.nan)
+
+    def _update_z(self, spread: np.ndarray) -> np.ndarray:
+        ok = np.isfinite(spread)
+        first = ok & np.isnan(self.z_ref)
+        self.z_ref[first] = spread[first]
+
+        h = self.n_bars % self.z_lookback
+        old = self.zs[:, h]
+        new = np.where(ok, spread - self.z_ref, np.nan)
+        old0 = np.nan_to_num(old)
+        new0 = np.nan_to_num(new)
+        self.s1 += new0 - old0
+        self.s2 += new0 * new0 - old0 * old0
+        self.z_count += ok.astype(int) - np.isfinite(old).astype(int)
+        self.zs[:, h] = new
+
+        if h == self.z_lookback - 1:
+            self.s1 = np.nansum(self.zs, axis=1)
+            self.s2 = np.nansum(self.zs * self.zs, axis=1)
+
+        L = self.z_lookback
+        mean = self.s1 / L
+        sd = np.sqrt(np.clip(self.s2 / L - mean * mean, 0.0, None))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (new - mean) / sd
+        return np.where(self.z_count == L, z, np.nan)
+
+    def _update_position(self, z: np.ndarray) -> np.ndarray:
+        ok = ~np.isnan(z)
+        entry = np.where(z <= -self.entry_z, 1.0, np.where(z >= self.entry_z, -1.0, 0.0))
+        flat = self.state == 0.0
+        state = np.where(ok & flat, entry, self.state)
+        self.state = np.where(ok & ~flat & (np.abs(z) <= self.exit_z), 0.0, state)
+        return np.where(ok, self.state, np.nan)
+
+    def update(self, prices_t: np.ndarray) -> OnlineBar:
+        """
+        Consume one row of ticker prices (NaN = missing) and emit this bar's outputs.
+        """
+        prices_t = np.asarray(prices_t, dtype=float)
+        y = prices_t[self.pair_index[:, 0]]
+        x = prices_t[self.pair_index[:, 1]]
+
+        beta = self._update_beta(y, x)
+        spread = y - beta * x
+        z = self._update_z(spread)
+        position = self._update_position(z)
+        self.n_bars += 1
+        return OnlineBar(beta=beta, spread=spread, z=z, position=position)
+
+    def save(self, path: str | Path) -> None:
+        """
+        Snapshot the engine to a single .npz file.
+        """
+        header = {"beta_lookback": self.beta_lookback, "z_lookback": self.z_lookback, "n_bars": self.n_bars}
+        arrays = {f: getattr(self, f) for f in _STATE_FIELDS}
+        with open(path, "wb") as fh:
+            np.savez(fh, header=np.array(json.dumps(header)), **arrays)
+
+    @classmethod
+    def load(cls, path: str | Path) -> OnlinePairEngine:
+        with np.load(path) as data:
+            header = json.loads(str(data["header"]))
+            eng = cls(data["pair_index"], header["beta_lookback"], header["z_lookback"])
+            eng.n_bars = header["n_bars"]
+            for f in _STATE_FIELDS:
+                setattr(eng, f, data[f].copy())
+        return eng
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+
+class PricePanel:
+    """
+    Prices of many tickers on one shared time index, held as a single
+    column-major (n_obs, n_tickers) array so every ticker is one contiguous
+    block of memory:
+      - column(t) / panel[t] / pair(a, b) are views, never copies
+      - frame() is a DataFrame over the same memory
+      - float32 storage (dtype=) halves the footprint; the kernels in
+        stats / signals / backtest compute in float64 on the columns they use
+      - pair views share one index object, so stats.align_pair skips its
+        align and callers mask NaNs instead of dropna per pair
+    Treat the values as read-only: views share them.
+    """
+
+    def __init__(self, values: np.ndarray, index: pd.Index, columns: Iterable[str]):
+        values = np.asfortranarray(values)
+        if values.ndim != 2:
+            raise ValueError(f"PricePanel needs a 2-D array, got shape {values.shape}")
+        self.values = values
+        self.index = index if isinstance(index, pd.DatetimeIndex) else pd.DatetimeIndex(pd.to_datetime(index))
+        self.columns = pd.Index(columns)
+        if values.shape != (len(self.index), len(self.columns)):
+            raise ValueError(
+                f"values shape {values.shape} does not match index/columns ({len(self.index)}, {len(self.columns)})"
+            )
+        self._col = {t: i for i, t in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, prices: pd.DataFrame, dtype: str | np.dtype = np.float64) -> PricePanel:
+        """
+        Copy a (time x tickers) frame into a panel of `dtype`.
+        """
+        return cls(np.asarray(prices.values, dtype=dtype, order="F"), prices.index, prices.columns)
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._col
+
+    def __getitem__(self, ticker: str) -> pd.Series:
+        return self.series(ticker)
+
+    def __repr__(self) -> str:
+        n, m = self.shape
+        return f"PricePanel({n} bars x {m} tickers, {self.dtype}, {self.nbytes / 2**20:.1f} MB)"
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.values.shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self.values.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    @property
+    def tickers(self) -> list[str]:
+        return list(self.columns)
+
+    def loc(self, tickers: str | Iterable[str]) -> int | np.ndarray:
+        """
+        Column number(s) of `tickers` (for backtest_matrix's pair_index etc.).
+        """
+        if isinstance(tickers, str):
+            return self._col[tickers]
+        return np.array([self._col[t] for t in tickers], dtype=int)
+
+    def column(self, ticker: str) -> np.ndarray:
+        """
+        Contiguous view of one ticker's prices.
+        """
+        return self.values[:, self._col[ticker]]
+
+    def series(self, ticker: str) -> pd.Series:
+        """
+        One ticker as a Series over the panel's memory (no copy).
+        """
+        return pd.Series(self.column(ticker), index=self.index, name=ticker, copy=False)
+
+    def pair(self, a: str, b: str) -> tuple[pd.Series, pd.Series]:
+        """
+        (y, x) Series views of a pair; both share the panel's index object,
+        so stats / signals / backtest skip their alignment step.
+        """
+        return self.series(a), self.series(b)
+
+    def frame(self) -> pd.DataFrame:
+        """
+        The panel as a DataFrame sharing its memory (one block, no copy).
+        """
+        return pd.DataFrame(self.values, index=self.index, columns=self.columns, copy=False)
+
+    def select(self, tickers: Iterable[str]) -> PricePanel:
+        """
+        A new panel with only `tickers` (copies those columns).
+        """
+        tickers = list(tickers)
+        return PricePanel(self.values[:, self.loc(tickers)], self.index, tickers)
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+# Per-process view of the shared price matrix (set by _attach in each worker,
+# or directly in the parent when running serially).
+_array: np.ndarray | None = None
+_index: pd.Index | None = None
+_columns: pd.Index | None = None
+_shm: shared_memory.SharedMemory | None = None
+
+
+def _set(array: np.ndarray | None, index: pd.Index | None, columns: pd.Index | None) -> None:
+    global _array, _index, _columns
+    if array is not None:
+        array = array.view()  # flag the view, not the caller's array
+        array.flags.writeable = False
+    _array, _index, _columns = array, index, columns
+
+
+def _attach(name: str, shape: tuple[int, ...], dtype: str, index, columns) -> None:
+    """
+    Pool initializer: map the parent's shared block without copying it.
+    """
+    global _shm
+    try:
+        _shm = shared_memory.SharedMemory(name=name, track=False)  # py>=3.13
+    except TypeError:
+        _shm = shared_memory.SharedMemory(name=name)
+    _set(np.ndarray(shape, dtype=dtype, buffer=_shm.buf), index, columns)
+
+
+def shared_array() -> np.ndarray:
+    """
+    The read-only array passed to map_shared, inside a task.
+    """
+    if _array is None:
+        raise RuntimeError("shared_array() called outside of map_shared")
+    return _array
+
+
+def shared_frame() -> pd.DataFrame:
+    """
+    The DataFrame passed to map_shared, rebuilt as a zero-copy view.
+    """
+    return pd.DataFrame(shared_array(), index=_index, columns=_columns, copy=False)
+
+
+def map_shared(
+    func: Callable[[Any], Any],
+    tasks: Iterable[Any],
+    data: np.ndarray | pd.DataFrame,
+    workers: int = 1,
+) -> Iterator[Any]:
+    """
+    Yields func(task) for each task, in task order.
+
+    `data` is placed in shared memory once and read inside tasks through
+    shared_array()/shared_frame(), so only the (small) task payloads are pickled.
+    Work is split by the caller's tasks, never by worker count, so results
+    are identical for any `workers`. workers <= 1 runs in-process.
+    """
+    if isinstance(data, pd.DataFrame):
+        values = data.values
+        # float32 panels stay float32 (see PricePanel); anything else is shared as float64.
+        array = np.ascontiguousarray(values, dtype=np.float32 if values.dtype == np.float32 else float)
+        index, columns = data.index, data.columns
+    else:
+        array = np.ascontiguousarray(data)
+        index = columns = None
+
+    if workers <= 1:
+        _set(array, index, columns)
+        try:
+            for task in tasks:
+                yield func(task)
+        finally:
+            _set(None, None, None)
+        return
+
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach,
+            initargs=(shm.name, array.shape, array.dtype.str, index, columns),
+        ) as pool:
+            yield from pool.map(func, tasks)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def chunked(items: list, size: int) -> list[list]:
+    return [items[i : i + size] for i in range(0, len(items), size)]
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from .ledger import TradeLedger
+from .metrics import equity_and_drawdown
 
 
 def equity_curve_from_returns(returns: pd.Series, start: float = 1.0) -> pd.Series:
@@ -41,7 +43,7 @@ def drawdown_from_equity(equity: pd.Series) -> pd.Series:
 
 
 def plot_equity_and_drawdown(
-    returns: pd.Series,
+    returns: pd.Series | TradeLedger,
     title: str = "Equity curve & drawdown",
     start: float = 1.0,
     show: bool = True,
@@ -53,9 +55,11 @@ def plot_equity_and_drawdown(
     -----
     - Uses matplotlib only (no seaborn).
     - Does not set any custom colors.
+    - A TradeLedger plots its equal-weight portfolio returns.
     """
-    equity = equity_curve_from_returns(returns, start=start)
-    drawdown = drawdown_from_equity(equity)
+    import matplotlib.pyplot as plt  # deferred: only loaded when plotting
+
+    equity, drawdown = equity_and_drawdown(returns, start=start)
 
     # Equity curve plot
     plt.figure()
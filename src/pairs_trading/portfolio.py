@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .config import StrategyConfig
+from .filters import _rolling_std
+from .profiling import timed
+
+WEIGHTINGS = ("equal", "inverse_vol", "risk_parity")
+
+# Variances below this fraction of the row's mean variance are rounding residue
+# of a flat (all-zero) window, not risk: such pairs get no weight.
+REL_VAR_FLOOR = 1e-12
+
+
+def _positive_var(var: np.ndarray) -> np.ndarray:
+    """
+    var > REL_VAR_FLOOR * mean(var) along the last axis (NaN counts as 0).
+    """
+    v = np.nan_to_num(np.asarray(var, dtype=float))
+    return v > REL_VAR_FLOOR * v.mean(axis=-1, keepdims=True)
+
+
+@dataclass
+class Portfolio:
+    """
+    Weighted combination of pair returns. weights[t] multiplies the pair
+    returns of bar t (missing returns count as 0); returns is NaN on bars
+    with no pair available.
+    """
+    returns: np.ndarray
+    weights: np.ndarray
+    index: pd.Index | None = None
+    pairs: list[str] | None = None
+
+    def series(self) -> pd.Series:
+        return pd.Series(self.returns, index=self.index, name="portfolio_ret")
+
+    def weights_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.weights, index=self.index, columns=self.pairs)
+
+    @property
+    def gross_exposure(self) -> np.ndarray:
+        return np.abs(self.weights).sum(axis=1)
+
+    def turnover(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Per-bar traded notional sum_j |change in weights_j * position_j|, for
+        the (n_obs, n_pairs) spread positions behind the returns (positions[t]
+        earns the return of bar t + 1).
+        """
+        held = np.zeros(self.weights.shape)
+        held[1:] = np.nan_to_num(np.asarray(positions, dtype=float)[:-1])
+        exposure = self.weights * held
+        return np.abs(np.diff(exposure, axis=0, prepend=0.0)).sum(axis=1)
+
+
+def returns_matrix(returns_by_pair: dict[str, pd.Series] | pd.DataFrame) -> tuple[np.ndarray, pd.Index, list[str]]:
+    """
+    Align per-pair return series once into a contiguous (n_obs, n_pairs) array.
+    """
+    df = pd.DataFrame(returns_by_pair)
+    return np.ascontiguousarray(df.values, dtype=float), df.index, [str(c) for c in df.columns]
+
+
+class RollingCovariance:
+    """
+    Covariance of the last `lookback` return vectors, maintained incrementally:
+    each update() overwrites one row of a ring buffer and adjusts the running
+    sums (O(n_assets) per bar, rebuilt from the buffer once per `lookback`
+    updates so rounding cannot drift). Nothing is recomputed per rebalance.
+
+    The (n_assets, n_assets) matrix itself is never needed: the centered
+    window is its rank-`lookback` factor (cov = factor().T @ factor()), which
+    is what risk_parity_weights works with. Missing returns count as 0.
+    """
+
+    def __init__(self, n_assets: int, lookback: int):
+        self.lookback = int(lookback)
+        self.buf = np.zeros((self.lookback, n_assets))
+        self.valid = np.zeros((self.lookback, n_assets), dtype=bool)
+        self.s1 = np.zeros(n_assets)
+        self.s2 = np.zeros(n_assets)
+        self.count = np.zeros(n_assets, dtype=int)
+        self.n_updates = 0
+
+    def update(self, r: np.ndarray) -> None:
+        r = np.asarray(r, dtype=float)
+        ok = np.isfinite(r)
+        new = np.where(ok, r, 0.0)
+        h = self.n_updates % self.lookback
+        old = self.buf[h]
+        self.s1 += new - old
+        self.s2 += new * new - old * old
+        self.count += ok.astype(int) - self.valid[h]
+        self.buf[h] = new
+        self.valid[h] = ok
+        self.n_updates += 1
+        if self.n_updates % self.lookback == 0:
+            self.s1 = self.buf.sum(axis=0)
+            self.s2 = (self.buf * self.buf).sum(axis=0)
+
+    @property
+    def n_obs(self) -> int:
+        return min(self.n_updates, self.lookback)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self.s1 / max(self.n_obs, 1)
+
+    def var(self) -> np.ndarray:
+        return np.clip(self.s2 / max(self.n_obs, 1) - self.mean**2, 0.0, None)
+
+    def factor(self) -> np.ndarray:
+        """
+        (n_obs, n_assets) centered window / sqrt(n_obs): population cov = F.T @ F.
+        """
+        n = max(self.n_obs, 1)
+        return (self.buf[: self.n_obs] - self.mean) / np.sqrt(n)
+
+    def cov(self) -> np.ndarray:
+        f = self.factor()
+        return f.T @ f
+
+
+def risk_parity_weights(
+    factor: np.ndarray,
+    active: np.ndarray,
+    w0: np.ndarray | None = None,
+    shrinkage: float = 0.0,
+    max_iter: int = 50,
+    tol: float = 1e-10,
+) -> np.ndarray:
+    """
+    Equal-risk-contribution weights (w_i * (C w)_i equal for all active
+    assets), summing to 1, zero for inactive ones (and for active ones whose
+    variance is not positive, see _positive_var), for
+    C = (1 - shrinkage) * F'F + shrinkage * diag(F'F) with F = `factor`
+    (RollingCovariance.factor(), or a Cholesky factor of a dense covariance).
+
+    Solves Spinu's convex form, min 1/2 y'Cy - sum(log y_i) / k, by Newton
+    steps with backtracking. The Hessian is diagonal plus the rank-r factor, so each
+    step is solved exactly through the Woodbury identity in O(k r^2) instead
+    of O(k^3). `w0` (e.g. the previous rebalance's weights) warm-starts it.
+    """
+    w = np.zeros(factor.shape[1])
+    active = np.asarray(active, dtype=bool) & _positive_var((factor * factor).sum(axis=0))
+    k = int(active.sum())
+    if k == 0:
+        return w
+    f = factor[:, active]
+    var = (f * f).sum(axis=0)
+    b = 1.0 / k
+    u = np.sqrt(1.0 - shrinkage) * f  # C = u'u + diag(shrinkage * var)
+    r = u.shape[0]
+
+    def cov(v: np.ndarray) -> np.ndarray:
+        return u.T @ (u @ v) + shrinkage * var * v
+
+    def objective(v: np.ndarray, cv: np.ndarray) -> float:
+        return 0.5 * (v @ cv) - b * np.log(v).sum()
+
+    inv_vol = 1.0 / np.sqrt(var)
+    y = inv_vol if w0 is None else np.asarray(w0, dtype=float)[active]
+    # New entrants (no warm-start weight) start at inverse vol, on the same
+    # scale (y_i * vol_i) as the assets carried over.
+    warm = y > 0
+    scale = (y[warm] / inv_vol[warm]).mean() if warm.any() else 1.0
+    y = np.where(warm, y, scale * inv_vol)
+    # Optimal scale for the current direction: y'Cy = 1.
+    y /= np.sqrt(y @ cov(y))
+    cy = cov(y)
+    fy = objective(y, cy)
+    for _ in range(max_iter):
+        grad = cy - b / y
+        # H = diag(h) + u'u  =>  H^-1 g = g/h - (u'/h) (I + u diag(1/h) u')^-1 u g/h
+        h_inv = 1.0 / (shrinkage * var + b / (y * y))
+        uh = u * h_inv
+        small = uh @ u.T
+        small.flat[:: r + 1] += 1.0
+        gh = grad * h_inv
+        d = -(gh - uh.T @ np.linalg.solve(small, u @ gh))
+        decrement = -(grad @ d)
+        if decrement <= tol * b:
+            break
+        # Full Newton step when it stays positive and decreases the objective,
+        # else back off (fraction to the boundary, then halving).
+        neg = d < 0
+        step = min(1.0, 0.95 * np.min(-y[neg] / d[neg])) if neg.any() else 1.0
+        while True:
+            cand = y + step * d
+            c_cand = cov(cand)
+            f_cand = objective(cand, c_cand)
+            if f_cand <= fy - 0.25 * step * decrement or step < 1e-8:
+                break
+            step *= 0.5
+        y, cy, fy = cand, c_cand, f_cand
+    w[active] = y / y.sum()
+    return w
+
+
+def cap_weights(w: np.ndarray, max_weight: float) -> np.ndarray:
+    """
+    Limit every |w| to max_weight, handing the excess to the uncapped weights
+    of the same row pro rata (rows are assumed to sum to 1 in |w|). Rows with
+    too few non-zero weights end with all of them at the cap.
+    """
+    w = np.atleast_2d(np.asarray(w, dtype=float))
+    a = np.abs(w)
+    fixed = np.zeros(a.shape, dtype=bool)
+    out = a
+    for _ in range(a.shape[1]):
+        free = np.where(fixed, 0.0, a).sum(axis=1)
+        budget = 1.0 - max_weight * fixed.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scale = np.where(free > 0, np.clip(budget, 0.0, None) / free, 0.0)
+        out = np.where(fixed, max_weight, a * scale[:, None])
+        over = ~fixed & (out > max_weight * (1 + 1e-12))
+        if not over.any():
+            break
+        fixed |= over
+    return np.sign(w) * out
+
+
+@timed(rows=lambda returns, *args, **kwargs: len(returns))
+def weighted_portfolio(
+    returns: np.ndarray | pd.DataFrame | dict[str, pd.Series],
+    weighting: str = "equal",
+    lookback: int = 60,
+    min_periods: int | None = None,
+    max_weight: float | None = None,
+    gross_cap: float = 1.0,
+    rebalance: int = 1,
+    lag: int = 1,
+    shrinkage: float = 0.1,
+) -> Portfolio:
+    """
+    Combine a (n_obs, n_pairs) returns matrix into one portfolio return series.
+
+    weighting:
+      - "equal":       1/k over the k pairs with a return that bar
+                       (the same as equal_weight_portfolio when uncapped)
+      - "inverse_vol": 1 / rolling std of each pair's returns
+      - "risk_parity": equal risk contributions under the rolling covariance
+                       (RollingCovariance + risk_parity_weights), shrunk
+                       `shrinkage` toward its diagonal: a window of fewer
+                       bars than pairs gives a singular sample covariance
+    Estimates use `lookback` bars ending `lag` bars before the bar they weight
+    (lag=0 reproduces notebook 04, which includes the bar itself) and need
+    `min_periods` bars (default max(30, lookback // 2)). Missing returns count
+    as 0 in the estimates, like in the portfolio: pipeline pair returns are
+    NaN while a pair is flat, and a pair's risk includes its flat bars. Pairs
+    whose window variance is (numerically) zero get no weight.
+
+    Targets are set every `rebalance` bars and held in between; each bar they
+    are renormalized over the pairs with a return, capped at `max_weight`
+    per pair (cap_weights) and scaled to `gross_cap` gross exposure. Bars
+    where no pair with a return has an estimate yet fall back to equal
+    weights, so every bar with a return is invested.
+    """
+    if weighting not in WEIGHTINGS:
+        raise ValueError(f"Unknown weighting: {weighting!r} (choose from {', '.join(WEIGHTINGS)})")
+    index, pairs = None, None
+    if isinstance(returns, (dict, pd.DataFrame)):
+        returns, index, pairs = returns_matrix(returns)
+    r = np.asarray(returns, dtype=float)
+    n, m = r.shape
+    if min_periods is None:
+        min_periods = max(30, lookback // 2)
+    available = np.isfinite(r)
+    r0 = np.where(available, r, 0.0)
+
+    def lagged(a: np.ndarray, fill: float) -> np.ndarray:
+        if lag == 0:
+            return a
+        out = np.full(a.shape, fill, dtype=a.dtype)
+        out[lag:] = a[:-lag]
+        return out
+
+    if weighting == "equal":
+        score = np.ones((n, m))
+    elif weighting == "inverse_vol":
+        vol = lagged(_rolling_std(r0, lookback, min_periods), np.nan)
+        ok = _positive_var(vol * vol)
+        with np.errstate(divide="ignore"):
+            score = np.where(ok, 1.0 / np.where(ok, vol, 1.0), 0.0)
+    else:
+        score = np.zeros((n, m))
+        cov = RollingCovariance(m, lookback)
+        w = None
+        for t in range(n):
+            if t - lag >= 0:
+                cov.update(r0[t - lag])
+            if t % rebalance:
+                continue
+            # risk_parity_weights drops the zero-variance pairs (exact factor variance).
+            active = np.full(m, cov.n_obs >= min_periods)
+            w = risk_parity_weights(cov.factor(), active, w, shrinkage)
+            score[t] = w
+
+    if rebalance > 1:
+        # Hold the targets set on rebalance bars.
+        held = np.arange(n) // rebalance * rebalance
+        score = score[held]
+
+    score = np.where(available, np.nan_to_num(score), 0.0)
+    # No estimate for any pair with a return: equal weights rather than a
+    # zero-exposure bar.
+    unscored = (score.sum(axis=1) <= 0) & available.any(axis=1)
+    score[unscored] = available[unscored]
+    total = score.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weights = np.where(total[:, None] > 0, score / total[:, None], 0.0)
+    if max_weight is not None:
+        weights = cap_weights(weights, max_weight)
+    weights *= gross_cap
+
+    port = (weights * np.where(available, r, 0.0)).sum(axis=1)
+    port[~available.any(axis=1)] = np.nan
+    return Portfolio(port, weights, index, pairs)
+
+
+def portfolio_from_config(returns: np.ndarray | pd.DataFrame | dict[str, pd.Series], cfg: StrategyConfig) -> Portfolio:
+    """
+    weighted_portfolio with the StrategyConfig portfolio settings.
+    """
+    return weighted_portfolio(
+        returns, cfg.weighting, cfg.weight_lookback,
+        max_weight=cfg.max_weight, gross_cap=cfg.gross_cap, rebalance=cfg.rebalance_every,
+    )
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from .profiling import timed
+
+# Columns of pair_features(), in order.
+FEATURES = ("level_corr", "return_corr", "half_life", "same_group")
+
+
+def _centered(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (x minus its column means with NaN -> 0, validity mask as float).
+    Centering first keeps the one-pass moment sums below accurate.
+    """
+    valid = ~np.isnan(x)
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(np.where(valid.any(axis=0), x, 0.0), axis=0)
+    return np.where(valid, x - mean, 0.0), valid.astype(float)
+
+
+def _joint_cov(u: np.ndarray, mu: np.ndarray, v: np.ndarray, mv: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pairwise-complete second moments from one matmul per term.
+
+    u, v: (n, N) zero-filled, mu, mv their masks. Over the rows where both
+    mu[:, i] and mv[:, j] are set, returns (cov(u_i, v_j), var(u_i), var(v_j))
+    as (N, N) matrices (NaN where fewer than two rows overlap).
+    """
+    n = mu.T @ mv
+    su = u.T @ mv             # sum of u_i over the joint rows of (i, j)
+    sv = (v.T @ mu).T         # sum of v_j over the joint rows of (i, j)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.where(n >= 2, n, np.nan)
+        cov = (u.T @ v - su * sv / n) / n
+        var_u = ((u * u).T @ mv - su * su / n) / n
+        var_v = ((v * v).T @ mu).T
+        var_v = (var_v - sv * sv / n) / n
+    return cov, var_u, var_v
+
+
+def _corr(x: np.ndarray) -> np.ndarray:
+    """
+    Pairwise-complete correlation matrix of the columns of x (NaN = missing).
+    """
+    u, m = _centered(x)
+    cov, var_u, var_v = _joint_cov(u, m, u, m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return cov / np.sqrt(var_u * var_v)
+
+
+def _half_life(levels: np.ndarray) -> np.ndarray:
+    """
+    (N, N) half-life in bars of the OLS spread level_i - beta_ij * level_j,
+    from its AR(1) coefficient phi: -ln 2 / ln phi (inf when phi >= 1, 0 when phi <= 0).
+
+    Same step 1 regression as the Engle-Granger test, but every pair comes out
+    of a handful of (N, N) moment matrices instead of one regression each.
+    """
+    x, m = _centered(levels)
+    cov, var_y, var_x = _joint_cov(x, m, x, m)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov / var_x
+
+    # e_t = y_t - beta x_t on rows where both legs are valid at t and t-1.
+    m2 = m[1:] * m[:-1]
+    cur, prev = x[1:] * m2, x[:-1] * m2
+    c_cp, _, _ = _joint_cov(cur, m2, prev, m2)        # cov(y_t, x_{t-1})
+    c_pp, v_p, v_pT = _joint_cov(prev, m2, prev, m2)  # cov(y_{t-1}, x_{t-1}), var(y_{t-1}), var(x_{t-1})
+
+    # Own-lag covariances cov(y_t, y_{t-1}) over the joint rows of (y, x).
+    n = m2.T @ m2
+    s_c, s_p = cur.T @ m2, prev.T @ m2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        n = np.where(n >= 2, n, np.nan)
+        own = ((cur * prev).T @ m2 - s_c * s_p / n) / n
+
+        lag_cov = own - beta * (c_cp + c_cp.T) + beta**2 * own.T
+        lag_var = v_p - 2.0 * beta * c_pp + beta**2 * v_pT
+        phi = lag_cov / lag_var
+        hl = np.where(phi >= 1.0, np.inf, -np.log(2.0) / np.log(np.clip(phi, 1e-12, None)))
+    return np.where(np.isnan(phi), np.nan, np.where(phi <= 0.0, 0.0, hl))
+
+
+def cluster_tickers(prices: pd.DataFrame, n_clusters: int) -> pd.Series:
+    """
+    Group tickers into `n_clusters` by average-linkage hierarchical clustering
+    on 1 - (correlation of log returns). Returns ticker -> cluster label,
+    usable as `groups` when no sector map is at hand.
+    """
+    from scipy.cluster.hierarchy import fcluster, linkage
+    from scipy.spatial.distance import squareform
+
+    corr = _corr(np.diff(np.log(prices.values.astype(float)), axis=0))
+    dist = np.clip(1.0 - np.nan_to_num(corr, nan=0.0), 0.0, 2.0)
+    np.fill_diagonal(dist, 0.0)
+    labels = fcluster(linkage(squareform(dist, checks=False), method="average"), n_clusters, criterion="maxclust")
+    return pd.Series(labels, index=prices.columns, name="cluster")
+
+
+@timed(rows=lambda prices, pairs, *args, **kwargs: len(pairs))
+def pair_features(
+    prices: pd.DataFrame,
+    pairs: list[tuple[str, str]],
+    groups: pd.Series | dict[str, object] | None = None,
+) -> pd.DataFrame:
+    """
+    Cheap screening statistics for candidate pairs (y=A on x=B), computed once
+    for the whole universe:
+      - level_corr:  correlation of log prices
+      - return_corr: correlation of log returns
+      - half_life:   AR(1) half-life (bars) of the price spread A - beta * B
+      - same_group:  both tickers in the same sector / cluster (True without `groups`)
+    Moments are pairwise-complete, so tickers with different histories mix freely.
+    """
+    tickers = list(prices.columns)
+    col = {t: i for i, t in enumerate(tickers)}
+    ia = np.array([col[a] for a, _ in pairs], dtype=int)
+    ib = np.array([col[b] for _, b in pairs], dtype=int)
+
+    values = prices.values.astype(float)
+    logp = np.log(values)
+    out = pd.DataFrame({"A": [a for a, _ in pairs], "B": [b for _, b in pairs]})
+    out["level_corr"] = _corr(logp)[ia, ib]
+    out["return_corr"] = _corr(np.diff(logp, axis=0))[ia, ib]
+    out["half_life"] = _half_life(values)[ia, ib]
+    if groups is None:
+        out["same_group"] = True
+    else:
+        g = pd.Series(groups).reindex(tickers).values
+        out["same_group"] = pd.notna(g[ia]) & (g[ia] == g[ib])
+    return out
+
+
+def prefilter_pairs(
+    prices: pd.DataFrame,
+    pairs: list[tuple[str, str]],
+    min_level_corr: float = 0.5,
+    min_return_corr: float = 0.0,
+    max_half_life: float = 126.0,
+    groups: pd.Series | dict[str, object] | None = None,
+    n_clusters: int = 0,
+) -> tuple[list[tuple[str, str]], pd.DataFrame]:
+    """
+    Drop candidates that cannot plausibly pass the Engle-Granger screen before
+    running it: |level_corr| < min_level_corr, return_corr < min_return_corr,
+    half_life > max_half_life (or undefined), or tickers in different groups.
+    `n_clusters` > 0 builds the groups with cluster_tickers when none are given.
+
+    Returns (kept pairs in input order, pair_features frame with a `keep` column).
+    """
+    if groups is None and n_clusters > 0:
+        groups = cluster_tickers(prices, n_clusters)
+    feats = pair_features(prices, pairs, groups)
+    feats["keep"] = (
+        (feats["level_corr"].abs() >= min_level_corr)
+        & (feats["return_corr"] >= min_return_corr)
+        & (feats["half_life"] <= max_half_life)
+        & feats["same_group"]
+    )
+    kept = [p for p, k in zip(pairs, feats["keep"].values) if k]
+    return kept, feats
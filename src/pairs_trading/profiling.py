@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Returned by span() while profiling is off; its scratch dict is never read.
+_NOOP = nullcontext({})
+
+# ru_maxrss is KiB on Linux, bytes on macOS.
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_mb() -> float:
+    """
+    High-water resident set size of this process (and of reaped worker processes), in MB.
+    """
+    if resource is None:
+        return float("nan")
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, kids) * _RSS_UNIT / 2**20
+
+
+@dataclass
+class Stat:
+    calls: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    rows: int = 0
+    peak_rss_mb: float = 0.0
+
+
+@dataclass
+class Profiler:
+    """
+    Collects timed spans: one trace event per span plus per-name totals.
+
+    CPU time is this process's (time.process_time); work done inside pool
+    workers shows up as wall time of the enclosing span only.
+    """
+    events: list[dict[str, Any]] = field(default_factory=list)
+    stats: dict[str, Stat] = field(default_factory=dict)
+    t0: float = field(default_factory=time.perf_counter)
+    _depth: int = 0
+
+    @contextmanager
+    def span(self, name: str, rows: int | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Time a block. The yielded dict may be updated inside the block
+        (e.g. info["rows"] = len(result)) and ends up in the trace args.
+        """
+        info: dict[str, Any] = {} if rows is None else {"rows": int(rows)}
+        w0, c0 = time.perf_counter(), time.process_time()
+        self._depth += 1
+        try:
+            yield info
+        finally:
+            self._depth -= 1
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            rss = peak_rss_mb()
+            st = self.stats.setdefault(name, Stat())
+            st.calls += 1
+            st.wall_s += wall
+            st.cpu_s += cpu
+            st.rows += int(info.get("rows", 0))
+            st.peak_rss_mb = max(st.peak_rss_mb, rss)
+            self.events.append(
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": (w0 - self.t0) * 1e6,
+                    "dur": wall * 1e6,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": {**info, "cpu_ms": cpu * 1e3, "peak_rss_mb": rss, "depth": self._depth},
+                }
+            )
+
+    def summary(self) -> list[dict[str, Any]]:
+        rows = [{"name": k, **vars(v)} for k, v in self.stats.items()]
+        return sorted(rows, key=lambda r: -r["wall_s"])
+
+    def write(self, out_dir: str | Path) -> dict[str, Path]:
+        """
+        <out_dir>/profile.json (per-stage totals) and <out_dir>/trace.json
+        (Chrome trace events: open in chrome://tracing or Perfetto).
+        """
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        paths = {"profile": out / "profile.json", "trace": out / "trace.json"}
+        paths["profile"].write_text(
+            json.dumps({"peak_rss_mb": peak_rss_mb(), "stages": self.summary()}, indent=1)
+        )
+        paths["trace"].write_text(json.dumps({"traceEvents": self.events, "displayTimeUnit": "ms"}))
+        return paths
+
+    def report(self) -> str:
+        lines = [f"{'stage':<48} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'rows':>10} {'rss MB':>8}"]
+        for r in self.summary():
+            lines.append(
+                f"{r['name']:<48} {r['calls']:>6} {r['wall_s']:>9.3f} {r['cpu_s']:>9.3f} "
+                f"{r['rows']:>10} {r['peak_rss_mb']:>8.1f}"
+            )
+        return "\n".join(lines)
+
+
+_active: Profiler | None = None
+
+
+def enable() -> Profiler:
+    global _active
+    _active = Profiler()
+    return _active
+
+
+def disable() -> Profiler | None:
+    """
+    Stop profiling; returns the profiler that was active.
+    """
+    global _active
+    prof, _active = _active, None
+    return prof
+
+
+def active() -> Profiler | None:
+    return _active
+
+
+def span(name: str, rows: int | None = None):
+    """
+    Profiler.span on the active profiler; a shared no-op context when off.
+    """
+    if _active is None:
+        return _NOOP
+    return _active.span(name, rows)
+
+
+def _default_rows(*args, **kwargs) -> int | None:
+    first = args[0] if args else next(iter(kwargs.values()), None)
+    return len(first) if hasattr(first, "shape") else None
+
+
+def timed(func: Callable[..., Any] | None = None, *, name: str | None = None, rows: Callable[..., int] | None = None):
+    """
+    Decorator form of span(). `rows(*args, **kwargs)` gives the rows processed;
+    by default the length of the first array/Series/DataFrame argument.
+    While profiling is off the wrapper only checks one global.
+    """
+    if func is None:
+        return functools.partial(timed, name=name, rows=rows)
+
+    label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+    count = rows or _default_rows
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        prof = _active
+        if prof is None:
+            return func(*args, **kwargs)
+        with prof.span(label, count(*args, **kwargs)):
+            return func(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from .cache import memoize
+from .parallel import chunked, map_shared, shared_array
+from .profiling import timed
+from .stats import engle_granger_coint_pvalue
+
+if TYPE_CHECKING:
+    from tqdm import tqdm
+
+# statsmodels.coint treats |R^2| this close to 1 as perfectly collinear (stat = -inf).
+_SQRTEPS = np.sqrt(np.finfo(np.double).eps)
+
+
+def _valid_spans(prices: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-ticker (first valid row, last valid row, valid rows contiguous in between).
+    Tickers with no data get first > last.
+    """
+    valid = prices.notna().values
+    n = valid.shape[0]
+    any_valid = valid.any(axis=0)
+    first = np.where(any_valid, valid.argmax(axis=0), n)
+    last = np.where(any_valid, n - 1 - valid[::-1].argmax(axis=0), -1)
+    count = valid.sum(axis=0)
+    contiguous = count == (last - first + 1)
+    return first, last, contiguous
+
+
+def _adf_gram(level: np.ndarray, diff: np.ndarray, start: int, lags: int) -> np.ndarray:
+    """
+    Batched X'X of the ADF design [e_{t-1}, de_{t-1}, ..., de_{t-lags}, de_t]
+    for regression="n", using diff rows start..end (statsmodels' lagmat trim="both").
+
+    level: (n, C) residual levels, diff: (n-1, C) residual differences.
+    Returns (C, lags + 2, lags + 2).
+    """
+    nobs = diff.shape[0] - start
+    cols = [level[start:-1]]
+    cols += [diff[start - j : start - j + nobs] for j in range(1, lags + 1)]
+    cols.append(diff[start:])
+    design = np.stack(cols, axis=-1).transpose(1, 0, 2)  # (C, nobs, lags + 2)
+    return np.matmul(design.transpose(0, 2, 1), design)
+
+
+def _solve_ssr(gram: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    OLS of the last design column on the first k columns, from the Gram matrix.
+    Returns (params, ssr, inverse of X'X).
+    """
+    xx = gram[:, :k, :k]
+    xy = gram[:, :k, -1]
+    xx_inv = np.linalg.inv(xx)
+    params = np.einsum("cij,cj->ci", xx_inv, xy)
+    ssr = gram[:, -1, -1] - np.einsum("ci,ci->c", params, xy)
+    return params, np.clip(ssr, 1e-300, None), xx_inv
+
+
+def _adf_tstat_batch(resid: np.ndarray) -> np.ndarray:
+    """
+    adfuller(resid, autolag="AIC", regression="n") t-statistic for every column
+    of a (n, C) residual matrix, as stacked normal equations.
+    """
+    n = resid.shape[0]
+    maxlag = int(np.ceil(12.0 * np.power(n / 100.0, 1 / 4.0)))
+    maxlag = min(n // 2 - 1, maxlag)
+    diff = np.diff(resid, axis=0)
+
+    # Lag search on the common sample (same nobs for every candidate lag).
+    gram = _adf_gram(resid, diff, maxlag, maxlag)
+    nobs = diff.shape[0] - maxlag
+    aic = np.empty((maxlag + 1, resid.shape[1]))
+    for lag in range(maxlag + 1):
+        # Sub-block of the full Gram: columns [level, lags 1..lag] + endog.
+        keep = list(range(lag + 1)) + [maxlag + 1]
+        _, ssr, _ = _solve_ssr(gram[:, keep][:, :, keep], lag + 1)
+        llf = -nobs / 2.0 * (np.log(2 * np.pi) + np.log(ssr / nobs) + 1.0)
+        aic[lag] = -2.0 * llf + 2.0 * (lag + 1)
+    best = aic.argmin(axis=0)  # ties go to the shorter lag, as in statsmodels
+
+    # Refit each column with its selected lag on the longest sample for that lag.
+    tstat = np.empty(resid.shape[1])
+    for lag in np.unique(best):
+        sel = best == lag
+        g = _adf_gram(resid[:, sel], diff[:, sel], lag, lag)
+        params, ssr, xx_inv = _solve_ssr(g, lag + 1)
+        dof = diff.shape[0] - lag - (lag + 1)
+        tstat[sel] = params[:, 0] / np.sqrt(ssr / dof * xx_inv[:, 0, 0])
+    return tstat
+
+
+def _span_hedge_ratios(levels: np.ndarray, ia: np.ndarray, ib: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Step 1 OLS slope and R^2 of ia on ib for all pairs on a block of fully valid
+    rows, from one Gram matrix of centered levels shared by every pair.
+    """
+    used = np.unique(np.concatenate([ia, ib]))
+    pos = np.full(levels.shape[1], -1)
+    pos[used] = np.arange(len(used))
+    centered = levels[:, used] - levels[:, used].mean(axis=0)
+    gram = centered.T @ centered
+
+    sxx = gram[pos[ib], pos[ib]]
+    syy = gram[pos[ia], pos[ia]]
+    sxy = gram[pos[ia], pos[ib]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = sxy / sxx
+        rsquared = beta * sxy / syy
+    return beta, rsquared
+
+
+def _adf_task(task: tuple[int, int, np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+    """
+    ADF t-stats of step 1 residuals for one chunk of pairs (runs in map_shared).
+    """
+    s, e, ia, ib, beta = task
+    levels = shared_array()[s : e + 1]
+    ya = levels[:, ia]
+    yb = levels[:, ib]
+    resid = (ya - ya.mean(axis=0)) - beta * (yb - yb.mean(axis=0))
+    return _adf_tstat_batch(resid)
+
+
+def coint_pvalues_from_hedge(
+    values: np.ndarray,
+    blocks: list[tuple[int, int, np.ndarray, np.ndarray, np.ndarray, np.ndarray]],
+    chunk_size: int = 256,
+    workers: int = 1,
+    pbar: tqdm | None = None,
+) -> list[np.ndarray]:
+    """
+    Step 2 of Engle-Granger given step 1 hedge ratios.
+
+    Each block is (s, e, ia, ib, beta, rsquared): pairs (ia[k], ib[k]) tested on
+    rows s..e (inclusive, fully valid) of `values`. Returns one p-value array per
+    block. ADF chunks of `chunk_size` pairs run through map_shared; perfectly
+    collinear pairs get p = 0 like statsmodels.
+    """
+    stats = [np.full(len(b[2]), -np.inf) for b in blocks]
+    tasks, owners = [], []
+    for n, (s, e, ia, ib, beta, rsquared) in enumerate(blocks):
+        ok = np.flatnonzero(np.isfinite(rsquared) & (rsquared < 1 - 100 * _SQRTEPS))
+        for c in chunked(list(ok), chunk_size):
+            tasks.append((s, e, ia[c], ib[c], beta[c]))
+            owners.append((n, c))
+        if pbar is not None:
+            pbar.update(len(ia) - len(ok))
+
+    for (n, c), tstat in zip(owners, map_shared(_adf_task, tasks, values, workers=workers)):
+        stats[n][c] = tstat
+        if pbar is not None:
+            pbar.update(len(c))
+
+    from .stability import mackinnon_pvalues  # deferred: stability imports this module
+
+    return [mackinnon_pvalues(st, regression="c", N=2) for st in stats]
+
+
+@timed(rows=lambda prices, pairs, *args, **kwargs: len(pairs))
+@memoize(ignore=("chunk_size", "progress", "workers"))
+def batch_coint_pvalues(
+    prices: pd.DataFrame,
+    pairs: list[tuple[str, str]],
+    min_obs: int = 50,
+    chunk_size: int = 256,
+    progress: bool = True,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Engle-Granger cointegration p-values (y=A on x=B) for many pairs at once.
+
+    Equivalent to calling stats.engle_granger_coint_pvalue per pair, but:
+      - valid-data spans are computed once per ticker, and pairs sharing the
+        same overlapping span are screened together
+      - step 1 regressions come from one Gram matrix of centered levels
+      - ADF lag search / refit is solved as stacked normal equations per chunk
+      - p-values use the same MacKinnon (1994) tables as statsmodels
+
+    Chunks of `chunk_size` pairs are spread over `workers` processes (the price
+    matrix is shared, not pickled); results do not depend on `workers`.
+
+    Pairs whose overlap has interior gaps fall back to the per-pair test.
+    Returns columns A, B, coint_pvalue (NaN when fewer than min_obs rows overlap).
+    """
+    tickers = list(prices.columns)
+    col = {t: i for i, t in enumerate(tickers)}
+    values = prices.values.astype(float)
+    first, last, contiguous = _valid_spans(prices)
+
+    pvalues = np.full(len(pairs), np.nan)
+    spans: dict[tuple[int, int], list[int]] = defaultdict(list)
+    fallback = []
+    for k, (a, b) in enumerate(pairs):
+        i, j = col[a], col[b]
+        s, e = max(first[i], first[j]), min(last[i], last[j])
+        if contiguous[i] and contiguous[j]:
+            if e - s + 1 >= min_obs:
+                spans[(s, e)].append(k)
+        else:
+            fallback.append(k)
+
+    blocks, owners = [], []
+    for (s, e), ks in spans.items():
+        ks = np.asarray(ks)
+        ia = np.array([col[pairs[k][0]] for k in ks])
+        ib = np.array([col[pairs[k][1]] for k in ks])
+        beta, rsquared = _span_hedge_ratios(values[s : e + 1], ia, ib)
+        blocks.append((s, e, ia, ib, beta, rsquared))
+        owners.append(ks)
+
+    from tqdm import tqdm
+
+    with tqdm(total=sum(len(ks) for ks in owners) + len(fallback), desc="Cointegration tests", disable=not progress) as pbar:
+        for ks, pv in zip(owners, coint_pvalues_from_hedge(values, blocks, chunk_size, workers, pbar)):
+            pvalues[ks] = pv
+
+        for k in fallback:
+            a, b = pairs[k]
+            pvalues[k] = engle_granger_coint_pvalue(prices[a], prices[b])
+            pbar.update(1)
+
+    return pd.DataFrame(
+        {
+            "A": [a for a, _ in pairs],
+            "B": [b for _, b in pairs],
+            "coint_pvalue": pvalues,
+        }
+    )
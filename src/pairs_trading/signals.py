@@ -3,58 +3,178 @@ from __future__ import annotations
 import numpy as np
 import pandas as pd
 
+from .config import StrategyConfig
+from .profiling import timed
+from .kalman import kalman_beta
+from .stats import _column_means, _window_sum, align_pair, rolling_ols_beta
+
+def hedge_ratio(y: pd.Series, x: pd.Series, cfg: StrategyConfig) -> pd.Series:
+    """
+    Hedge ratio series for y ~ x using cfg.hedge_ratio ("rolling_ols" or "kalman").
+    Both backends are memoized (cache.memoize), so this stage is cached when a
+    cache_dir is configured.
+    """
+    if cfg.hedge_ratio == "kalman":
+        return kalman_beta(y, x, q=cfg.kalman_q, r=cfg.kalman_r, intercept=cfg.kalman_intercept)
+    if cfg.hedge_ratio == "rolling_ols":
+        return rolling_ols_beta(y, x, lookback=cfg.beta_lookback)
+    raise ValueError(f"Unknown hedge_ratio: {cfg.hedge_ratio!r}")
+
+@timed
 def compute_spread(y: pd.Series, x: pd.Series, beta: pd.Series) -> pd.Series:
-    y2, x2 = y.align(x, join="inner")
-    b2 = beta.reindex(y2.index)
+    y2, x2 = align_pair(y, x)
+    b2 = beta if beta.index is y2.index else beta.reindex(y2.index)
     spread = y2 - b2 * x2
     spread.name = "spread"
     return spread
 
-def rolling_zscore(series: pd.Series, lookback: int) -> pd.Series:
-    s = series.copy()
+@timed
+def rolling_zscore(series: pd.Series | pd.DataFrame, lookback: int) -> pd.Series | pd.DataFrame:
+    """
+    Rolling z-score (population std). A DataFrame is scored column by column.
+    Not memoized: hashing the input and reading a cached result back cost
+    more than the O(n) pandas rolling pass.
+    """
+    s = series
     m = s.rolling(lookback).mean()
     sd = s.rolling(lookback).std(ddof=0)
     z = (s - m) / sd
-    z.name = "z"
+    if isinstance(z, pd.Series):
+        z.name = "z"
     return z
 
+def rolling_zscore_matrix(spread: np.ndarray, lookback: int) -> np.ndarray:
+    """
+    rolling_zscore for a (n_obs, n_pairs) array from windowed sums in O(n),
+    without the pandas frame or the memo (for chunked runs). Windows
+    containing a NaN are NaN, as with pandas' default min_periods.
+    """
+    a = np.asarray(spread, dtype=float)
+    valid = np.isfinite(a)
+    center = _column_means(a, valid)
+    ac = np.where(valid, a - center, 0.0)
+    count = _window_sum(valid.astype(float), lookback)
+    mean = _window_sum(ac, lookback) / lookback
+    var = np.clip(_window_sum(ac * ac, lookback) / lookback - mean * mean, 0.0, None)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (ac - mean) / np.sqrt(var)
+    return np.where(count == lookback, z, np.nan)
+
+
+def final_state(pos: np.ndarray, state0: np.ndarray | None = None) -> np.ndarray:
+    """
+    Position state after the last bar of a positions_matrix_from_z result
+    (NaN bars leave it unchanged), to pass as the next block's `state0`.
+    """
+    pos = np.asarray(pos, dtype=float).reshape(len(pos), -1)
+    rows = np.where(np.isfinite(pos), np.arange(len(pos))[:, None], -1).max(axis=0, initial=-1)
+    last = pos[np.maximum(rows, 0), np.arange(pos.shape[1])] if len(pos) else np.zeros(pos.shape[1])
+    prev = np.zeros(pos.shape[1]) if state0 is None else np.broadcast_to(np.asarray(state0, dtype=float), (pos.shape[1],))
+    return np.where(rows >= 0, last, prev)
+
+
+def _hysteresis_loop(
+    z: np.ndarray,
+    entry_z: np.ndarray,
+    exit_z: np.ndarray,
+    allowed: np.ndarray,
+    state0: np.ndarray,
+) -> np.ndarray:
+    """
+    Reference state machine, one step per bar across all pairs at once.
+    Only used for columns with exit_z >= entry_z (entry and exit bands overlap).
+    """
+    pos = np.full(z.shape, np.nan)
+    state = state0.copy()
+    for i in range(z.shape[0]):
+        zi = z[i]
+        ok = ~np.isnan(zi)
+        entry = np.where(zi <= -entry_z, 1.0, np.where(zi >= entry_z, -1.0, 0.0))
+        flat = state == 0.0
+        state = np.where(ok & flat, entry, state)
+        state = np.where(ok & ~flat & (np.abs(zi) <= exit_z), 0.0, state)
+        state = np.where(allowed[i], state, 0.0)
+        pos[i] = np.where(ok | ~allowed[i], state, np.nan)
+    return pos
+
+
+def positions_matrix_from_z(
+    z: np.ndarray,
+    entry_z: float | np.ndarray = 2.0,
+    exit_z: float | np.ndarray = 0.5,
+    allowed: np.ndarray | None = None,
+    state0: float | np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    positions_from_z for a (n_obs, n_pairs) z matrix in one array pass.
+    entry_z / exit_z may be scalars or per-pair arrays of shape (n_pairs,).
+    allowed: optional boolean trade-allowed mask shaped like z (see filters).
+    state0: position state before the first bar (default flat), e.g.
+    final_state() of the previous block when z arrives in time blocks.
+
+    With exit_z < entry_z the state machine splits into segments that start at
+    each bar with |z| <= exit_z (always flat there). Within a segment the
+    position is 0 until the first entry signal, then that signal's side until
+    the segment ends, so it reduces to accumulate/take_along_axis operations.
+    NaN bars output NaN and leave the state untouched. Bars where `allowed`
+    is False are forced flat and reset the state, like an exit.
+    """
+    z = np.asarray(z, dtype=float)
+    squeeze = z.ndim == 1
+    if squeeze:
+        z = z[:, None]
+    n, m = z.shape
+    if allowed is None:
+        allowed = np.ones((n, m), dtype=bool)
+    else:
+        allowed = np.asarray(allowed, dtype=bool).reshape(n, m)
+    entry_z = np.broadcast_to(np.asarray(entry_z, dtype=float), (m,))
+    exit_z = np.broadcast_to(np.asarray(exit_z, dtype=float), (m,))
+    state0 = np.zeros(m) if state0 is None else np.broadcast_to(np.asarray(state0, dtype=float), (m,))
+
+    with np.errstate(invalid="ignore"):
+        signal = np.where(allowed & (z <= -entry_z), 1.0, np.where(allowed & (z >= entry_z), -1.0, 0.0))
+        reset = (np.abs(z) <= exit_z) | ~allowed
+
+    rows = np.arange(n)[:, None]
+    # Start of the segment containing each bar (-1 = before the first reset).
+    seg_start = np.maximum.accumulate(np.where(reset, rows, -1), axis=0)
+    # First entry signal at or after each bar (n = none).
+    nxt = np.where(signal != 0.0, rows, n)
+    nxt = np.minimum.accumulate(nxt[::-1], axis=0)[::-1]
+    first = np.take_along_axis(nxt, np.maximum(seg_start, 0), axis=0)
+
+    side = np.take_along_axis(np.vstack([signal, np.zeros((1, m))]), first, axis=0)
+    pos = np.where(first <= rows, side, 0.0)
+    # An open state0 position is held until the first reset.
+    pos = np.where((seg_start < 0) & (state0 != 0.0), state0, pos)
+    pos[np.isnan(z) & allowed] = np.nan
+
+    overlap = exit_z >= entry_z
+    if overlap.any():
+        pos[:, overlap] = _hysteresis_loop(
+            z[:, overlap], entry_z[overlap], exit_z[overlap], allowed[:, overlap], state0[overlap]
+        )
+
+    return pos[:, 0] if squeeze else pos
+
+
+@timed
 def positions_from_z(
     z: pd.Series,
     entry_z: float = 2.0,
     exit_z: float = 0.5,
+    allowed: pd.Series | None = None,
 ) -> pd.Series:
     """
     Vector-friendly state machine:
       - when z > entry => short spread (-1)
       - when z < -entry => long spread (+1)
       - exit when |z| < exit => flat (0)
+      - flat wherever `allowed` (trade-allowed mask, e.g. filters.trade_allowed) is False
     Returns spread position: +1=long spread, -1=short spread
     """
-    z = z.copy()
-
-    enter_long = z <= -entry_z
-    enter_short = z >= entry_z
-    exit_flat = z.abs() <= exit_z
-
-    pos = pd.Series(index=z.index, data=0.0)
-
-    # Build position by iterating once (fast enough for daily data).
-    state = 0.0
-    for i, dt in enumerate(z.index):
-        if np.isnan(z.iloc[i]):
-            pos.iloc[i] = np.nan
-            continue
-
-        if state == 0.0:
-            if enter_long.iloc[i]:
-                state = 1.0
-            elif enter_short.iloc[i]:
-                state = -1.0
-        else:
-            if exit_flat.iloc[i]:
-                state = 0.0
-
-        pos.iloc[i] = state
-
-    pos.name = "spread_pos"
-    return pos
+    if allowed is not None:
+        allowed = allowed.reindex(z.index).fillna(False).values.astype(bool)
+    pos = positions_matrix_from_z(z.values, entry_z=entry_z, exit_z=exit_z, allowed=allowed)
+    return pd.Series(pos, index=z.index, name="spread_pos")
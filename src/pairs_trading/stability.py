@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .config import StrategyConfig
+from .profiling import timed
+from .screening import _solve_ssr
+from .signals import hedge_ratio
+from .stats import _column_means, _window_sum, rolling_ols
+
+MONITOR_TESTS = ("eg", "adf")
+
+# Pair columns per block of windowed sums (bounds memory to a few (n_obs, block) arrays).
+PAIRS_PER_BLOCK = 256
+
+
+@dataclass
+class RollingADF:
+    """
+    ADF t-statistic and MacKinnon p-value of each trailing window, one column
+    per pair. Both arrays have shape (n_obs, n_pairs) and are NaN during warmup.
+    """
+    tstat: np.ndarray
+    pvalue: np.ndarray
+
+
+def mackinnon_pvalues(tstat: np.ndarray, regression: str = "c", N: int = 1) -> np.ndarray:
+    """
+    statsmodels.tsa.adfvalues.mackinnonp for an array of t-statistics (NaN stays NaN).
+    N=1 for ADF, N=2 for the two-variable Engle-Granger test.
+
+    Evaluated in one pass from statsmodels' coefficient tables. Those are
+    private: if a statsmodels release moves them, this falls back to the
+    public scalar mackinnonp, one call per value (slow, but still right).
+    """
+    # Deferred: scipy.stats / statsmodels are slow to import.
+    from scipy.stats import norm
+
+    t = np.asarray(tstat, dtype=float)
+    try:
+        from statsmodels.tsa.adfvalues import _tau_largeps, _tau_maxs, _tau_mins, _tau_smallps, _tau_stars
+    except ImportError:
+        from statsmodels.tsa.adfvalues import mackinnonp
+
+        out = np.full(t.shape, np.nan)
+        ok = ~np.isnan(t)
+        out[ok] = np.vectorize(lambda v: mackinnonp(v, regression, N), otypes=[float])(t[ok])
+        return out
+    small = np.asarray(_tau_smallps[regression][N - 1])[::-1]
+    large = np.asarray(_tau_largeps[regression][N - 1])[::-1]
+    with np.errstate(invalid="ignore"):
+        coef = np.where(t <= _tau_stars[regression][N - 1], np.polyval(small, t), np.polyval(large, t))
+        p = norm.cdf(coef)
+        p = np.where(t > _tau_maxs[regression][N - 1], 1.0, np.where(t < _tau_mins[regression][N - 1], 0.0, p))
+    return np.where(np.isnan(t), np.nan, p)
+
+
+def _design(a: np.ndarray, lags: int) -> list[np.ndarray]:
+    """
+    ADF design columns [a_{t-1}, da_{t-1}, ..., da_{t-lags}, da_t] of a
+    (n_obs, n_pairs) level matrix, aligned on row t (0 where a lag falls
+    before the first row or on a NaN; callers mask those windows).
+    """
+    n = len(a)
+    d = np.full(a.shape, np.nan)
+    d[1:] = a[1:] - a[:-1]
+
+    def shift(b: np.ndarray, k: int) -> np.ndarray:
+        out = np.full(b.shape, np.nan)
+        if k < n:
+            out[k:] = b[: n - k]
+        return out
+
+    cols = [shift(a, 1)] + [shift(d, j) for j in range(1, lags + 1)] + [d]
+    return [np.nan_to_num(c) for c in cols]
+
+
+def _windowed_gram(
+    cy: list[np.ndarray],
+    cx: list[np.ndarray] | None,
+    beta: np.ndarray | None,
+    nobs: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing `nobs`-row sums of the design columns u_i = cy_i - beta * cx_i
+    (u_i = cy_i when cx is None) and of their pairwise products, from
+    windowed sums of the raw column products (beta varies per window, so it
+    enters after summing). Returns (sums (n_obs, n_pairs, k),
+    gram (n_obs, n_pairs, k, k)).
+    """
+    k = len(cy)
+
+    def wsum(a: np.ndarray) -> np.ndarray:
+        return _window_sum(a, nobs)
+
+    sums = np.empty(cy[0].shape + (k,))
+    gram = np.empty(cy[0].shape + (k, k))
+    for i in range(k):
+        sums[..., i] = wsum(cy[i]) if cx is None else wsum(cy[i]) - beta * wsum(cx[i])
+        for j in range(i, k):
+            g = wsum(cy[i] * cy[j])
+            if cx is not None:
+                cross = wsum(cy[i] * cx[j]) + (wsum(cx[i] * cy[j]) if i != j else wsum(cy[i] * cx[j]))
+                g = g - beta * cross + beta * beta * wsum(cx[i] * cx[j])
+            gram[..., i, j] = gram[..., j, i] = g
+    return sums, gram
+
+
+def _tstat(gram: np.ndarray, ok: np.ndarray, dof: int) -> np.ndarray:
+    """
+    t-statistic of the first regressor in the OLS of the last design column
+    on the others, per window; NaN where `ok` is False or the regressors are
+    (numerically) collinear.
+    """
+    shape = gram.shape[:-2]
+    k = gram.shape[-1] - 1
+    g = gram.reshape((-1,) + gram.shape[-2:])
+    ok = ok.ravel() & np.isfinite(g).all(axis=(1, 2))
+    xx = g[:, :k, :k]
+    scale = np.sqrt(np.abs(np.diagonal(xx, axis1=1, axis2=2)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = xx / (scale[:, :, None] * scale[:, None, :])
+        ok &= (scale > 0).all(axis=1) & (np.linalg.det(np.where(ok[:, None, None], corr, np.eye(k))) > 1e-10)
+    g = np.where(ok[:, None, None], g, np.eye(k + 1))
+    params, ssr, xx_inv = _solve_ssr(g, k)
+    t = params[:, 0] / np.sqrt(ssr / dof * xx_inv[:, 0, 0])
+    return np.where(ok, t, np.nan).reshape(shape)
+
+
+def _centered(a: np.ndarray) -> np.ndarray:
+    return a - _column_means(a, np.isfinite(a))
+
+
+def _check_window(window: int, lags: int, k: int) -> int:
+    nobs = window - 1 - lags
+    if lags < 0 or nobs <= lags + k + 1:
+        raise ValueError(f"window={window} is too short for lags={lags}")
+    return nobs
+
+
+@timed(rows=lambda y, *args, **kwargs: np.asarray(y).shape[0])
+def rolling_coint(y: np.ndarray, x: np.ndarray, window: int = 252, lags: int = 1) -> RollingADF:
+    """
+    Engle-Granger test of y ~ x on every trailing `window` bars, for
+    (n_obs, n_pairs) price matrices (column j of y against column j of x):
+    statsmodels coint(y_w, x_w, maxlag=lags, autolag=None) for each window w,
+    p-values from the N=2 MacKinnon table.
+
+    The window's hedge ratio comes from rolling_ols, and the ADF regression on
+    its residuals e = y - alpha - beta * x is expanded in the window's beta:
+    every entry of its normal equations is a combination of trailing sums of
+    products of lagged levels / differences of y and x, kept with _window_sum
+    like rolling_ols. That is O(n_obs) per pair for all windows together, with
+    no per-window regression. The lag order is fixed (`lags`) instead of an
+    AIC search in every window, so the statistics of neighbouring windows are
+    comparable. Windows containing a NaN are NaN.
+    """
+    y = np.asarray(y, dtype=float)
+    x = np.asarray(x, dtype=float)
+    squeeze = y.ndim == 1
+    if squeeze:
+        y, x = y[:, None], x[:, None]
+    nobs = _check_window(window, lags, lags + 1)
+
+    tstat = np.full(y.shape, np.nan)
+    for j0 in range(0, y.shape[1], PAIRS_PER_BLOCK):
+        cols = slice(j0, j0 + PAIRS_PER_BLOCK)
+        valid = np.isfinite(y[:, cols]) & np.isfinite(x[:, cols])
+        yc = _centered(np.where(valid, y[:, cols], np.nan))
+        xc = _centered(np.where(valid, x[:, cols], np.nan))
+        ols = rolling_ols(yc, xc, window)
+        beta = np.nan_to_num(ols.beta)
+        alpha = np.nan_to_num(ols.intercept)
+
+        sums, gram = _windowed_gram(_design(yc, lags), _design(xc, lags), beta, nobs)
+        # The lagged level is e_{t-1} = (y - beta x)_{t-1} - alpha.
+        gram[..., 0, :] -= alpha[..., None] * sums
+        gram[..., :, 0] -= alpha[..., None] * sums
+        gram[..., 0, 0] += alpha * alpha * nobs
+        tstat[:, cols] = _tstat(gram, np.isfinite(ols.beta), nobs - (lags + 1))
+
+    pvalue = mackinnon_pvalues(tstat, "c", N=2)
+    if squeeze:
+        return RollingADF(tstat[:, 0], pvalue[:, 0])
+    return RollingADF(tstat, pvalue)
+
+
+@timed(rows=lambda s, *args, **kwargs: np.asarray(s).shape[0])
+def rolling_adf(s: np.ndarray, window: int = 252, lags: int = 1) -> RollingADF:
+    """
+    adfuller(s_w, maxlag=lags, autolag=None, regression="c") on every trailing
+    `window` bars of a (n_obs, n_pairs) series matrix (e.g. the traded spreads),
+    from windowed sums of the design products like rolling_coint; the constant
+    is partialled out of the normal equations (window means of the design).
+    """
+    a = np.asarray(s, dtype=float)
+    squeeze = a.ndim == 1
+    if squeeze:
+        a = a[:, None]
+    nobs = _check_window(window, lags, lags + 2)
+
+    tstat = np.full(a.shape, np.nan)
+    for j0 in range(0, a.shape[1], PAIRS_PER_BLOCK):
+        cols = slice(j0, j0 + PAIRS_PER_BLOCK)
+        ac = _centered(a[:, cols])
+        full = _window_sum(np.isfinite(ac).astype(float), window) == window
+        sums, gram = _windowed_gram(_design(ac, lags), None, None, nobs)
+        gram -= sums[..., :, None] * sums[..., None, :] / nobs
+        tstat[:, cols] = _tstat(gram, full, nobs - (lags + 2))
+
+    pvalue = mackinnon_pvalues(tstat, "c", N=1)
+    if squeeze:
+        return RollingADF(tstat[:, 0], pvalue[:, 0])
+    return RollingADF(tstat, pvalue)
+
+
+def coint_monitor(prices: pd.DataFrame, pairs: pd.DataFrame, cfg: StrategyConfig) -> pd.DataFrame:
+    """
+    Time x pairs ("A-B") p-values of the cfg.monitor_test stability test on
+    trailing cfg.monitor_window bars, for the selected `pairs` (columns A, B)
+    of an aligned price frame:
+      - "eg":  rolling_coint of A on B
+      - "adf": rolling_adf of the traded spread A - beta * B (cfg.hedge_ratio)
+    The last row only depends on the last monitor_window bars (plus the hedge
+    ratio's warmup for "adf"), so a daily check can pass just that tail.
+    """
+    labels = [f"{a}-{b}" for a, b in zip(pairs["A"], pairs["B"])]
+    y = prices[list(pairs["A"])].values.astype(float)
+    x = prices[list(pairs["B"])].values.astype(float)
+    if cfg.monitor_test == "eg":
+        res = rolling_coint(y, x, cfg.monitor_window, cfg.monitor_lags)
+    elif cfg.monitor_test == "adf":
+        beta = np.column_stack([
+            hedge_ratio(prices[a], prices[b], cfg).reindex(prices.index).values
+            for a, b in zip(pairs["A"], pairs["B"])
+        ]) if len(pairs) else np.empty(y.shape)
+        res = rolling_adf(y - beta * x, cfg.monitor_window, cfg.monitor_lags)
+    else:
+        raise ValueError(f"Unknown monitor_test: {cfg.monitor_test!r} (choose from {', '.join(MONITOR_TESTS)})")
+    return pd.DataFrame(res.pvalue, index=prices.index, columns=labels)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Protocol
+
+import pandas as pd
+
+from .data import download_adj_close
+
+
+class PriceSource(Protocol):
+    """
+    Anything that can return wide Adjusted Close prices (index=date, columns=tickers)
+    for [start, end). Tickers it has no data for may simply be missing.
+    """
+
+    def fetch(self, tickers: list[str], start: str, end: str | None) -> pd.DataFrame: ...
+
+
+class YFinanceSource:
+    def __init__(self, interval: str = "1d"):
+        self.interval = interval
+
+    def fetch(self, tickers: list[str], start: str, end: str | None) -> pd.DataFrame:
+        return download_adj_close(tickers, start=start, end=end, interval=self.interval)
+
+
+class FrameSource:
+    """
+    Serves prices from an in-memory frame (offline runs, fixtures in tests).
+    Records every request in `calls` so tests can assert on API traffic.
+    """
+
+    def __init__(self, prices: pd.DataFrame):
+        self.prices = prices.sort_index()
+        self.calls: list[tuple[tuple[str, ...], str, str | None]] = []
+
+    def fetch(self, tickers: list[str], start: str, end: str | None) -> pd.DataFrame:
+        self.calls.append((tuple(tickers), start, end))
+        p = self.prices.loc[pd.Timestamp(start) :, [t for t in tickers if t in self.prices.columns]]
+        if end is not None:
+            p = p.loc[p.index < pd.Timestamp(end)]
+        return p.dropna(how="all")
+
+
+def _day(ts: str | pd.Timestamp | None) -> pd.Timestamp:
+    """
+    Normalized date; None means "through today" (exclusive end = tomorrow).
+    """
+    if ts is None:
+        return pd.Timestamp.today().normalize() + pd.Timedelta(days=1)
+    return pd.Timestamp(ts).normalize()
+
+
+class PriceStore:
+    """
+    Local per-ticker Parquet store of Adjusted Close prices.
+
+    Layout:
+      <root>/<TICKER>.parquet   single "adj_close" column indexed by date
+      <root>/manifest.json      date range [start, end) already requested per ticker
+
+    refresh() only asks the source for the ranges not yet covered (before the
+    stored start, after the stored end) and for tickers never seen, batching
+    tickers that miss the same range into one call. load() reads the files
+    memory-mapped and never touches the source. With an ingest.AsyncIngestor
+    as the source, each batch is written (and the manifest saved) as soon as
+    it arrives, so an interrupted refresh keeps what it already downloaded.
+
+    Notes:
+      - The last stored bar is re-fetched on forward refresh (it may have been
+        a partial intraday bar).
+      - Adjusted closes are re-based by splits/dividends; use refresh(full=True)
+        to rebuild a ticker's history after a corporate action.
+    """
+
+    def __init__(self, root: str | Path, source: PriceSource | None = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.source = source if source is not None else YFinanceSource()
+        self._manifest_path = self.root / "manifest.json"
+        self.manifest: dict[str, dict[str, str]] = {}
+        if self._manifest_path.exists():
+            self.manifest = json.loads(self._manifest_path.read_text())
+
+    def path(self, ticker: str) -> Path:
+        return self.root / f"{ticker}.parquet"
+
+    def _read(self, ticker: str) -> pd.Series:
+        p = self.path(ticker)
+        if not p.exists():
+            return pd.Series(dtype=float, index=pd.DatetimeIndex([], name="date"), name=ticker)
+        s = pd.read_parquet(p, memory_map=True)["adj_close"]
+        s.name = ticker
+        return s
+
+    def _write(self, ticker: str, s: pd.Series) -> None:
+        tmp = self.path(ticker).with_suffix(".parquet.tmp")
+        s.rename("adj_close").rename_axis("date").to_frame().to_parquet(tmp)
+        os.replace(tmp, self.path(ticker))
+
+    def _save_manifest(self) -> None:
+        tmp = self._manifest_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=1, sort_keys=True))
+        os.replace(tmp, self._manifest_path)
+
+    def missing_ranges(self, ticker: str, start: str, end: str | None) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Sub-ranges of [start, end) not yet requested for `ticker`.
+        """
+        lo, hi = _day(start), _day(end)
+        cov = self.manifest.get(ticker)
+        if cov is None:
+            return [(lo, hi)] if lo < hi else []
+        c_lo, c_hi = pd.Timestamp(cov["start"]), pd.Timestamp(cov["end"])
+        # Ranges are extended up to the covered block so coverage stays contiguous.
+        out = []
+        if lo < c_lo:
+            out.append((lo, c_lo))
+        if hi > c_hi:
+            last = self._read(ticker).index.max()
+            resume = c_hi if pd.isna(last) else min(c_hi, last.normalize())
+            out.append((resume, hi))
+        return out
+
+    def refresh(self, tickers: list[str], start: str, end: str | None = None, full: bool = False) -> int:
+        """
+        Fetch whatever is missing for [start, end). Returns the number of source calls.
+        """
+        if full:
+            for t in tickers:
+                self.manifest.pop(t, None)
+                self.path(t).unlink(missing_ok=True)
+
+        # Group tickers that miss the exact same range -> one source call per group.
+        todo: dict[tuple[pd.Timestamp, pd.Timestamp], list[str]] = defaultdict(list)
+        for t in tickers:
+            for rng in self.missing_ranges(t, start, end):
+                todo[rng].append(t)
+
+        for (lo, hi), group in todo.items():
+            start_s, end_s = lo.strftime("%Y-%m-%d"), hi.strftime("%Y-%m-%d")
+            if hasattr(self.source, "ingest"):
+                def on_batch(batch: list[str], fetched: pd.DataFrame, lo=lo, hi=hi) -> None:
+                    self._merge(batch, fetched, lo, hi)
+                    self._save_manifest()
+
+                self.source.ingest(group, start=start_s, end=end_s, on_batch=on_batch)
+            else:
+                self._merge(group, self.source.fetch(group, start=start_s, end=end_s), lo, hi)
+
+        if todo:
+            self._save_manifest()
+        return len(todo)
+
+    def _merge(self, group: list[str], fetched: pd.DataFrame, lo: pd.Timestamp, hi: pd.Timestamp) -> None:
+        """
+        Merge one fetched [lo, hi) frame into the files and the manifest.
+        """
+        for t in group:
+            new = fetched[t].dropna() if t in fetched.columns else pd.Series(dtype=float)
+            old = self._read(t)
+            if new.empty and old.empty:
+                continue  # unknown to the source; retry next time
+            if not new.empty:
+                new.index = pd.to_datetime(new.index)
+                merged = new.combine_first(old).sort_index()
+                self._write(t, merged)
+            cov = self.manifest.get(t)
+            c_lo = lo if cov is None else min(lo, pd.Timestamp(cov["start"]))
+            c_hi = hi if cov is None else max(hi, pd.Timestamp(cov["end"]))
+            self.manifest[t] = {"start": c_lo.strftime("%Y-%m-%d"), "end": c_hi.strftime("%Y-%m-%d")}
+
+    def load(self, tickers: list[str], start: str, end: str | None = None) -> pd.DataFrame:
+        """
+        Wide Adjusted Close frame for [start, end) from local files only.
+        Tickers with no stored data come back as all-NaN columns.
+        """
+        lo, hi = _day(start), _day(end)
+        cols = {}
+        for t in tickers:
+            s = self._read(t)
+            cols[t] = s.loc[(s.index >= lo) & (s.index < hi)]
+        adj = pd.DataFrame(cols, columns=tickers)
+        adj = adj.sort_index()
+        adj = adj.dropna(how="all")
+        return adj
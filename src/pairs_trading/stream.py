@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from .backtest import BACKTEST_FIELDS, MatrixBacktest, backtest_matrix
+from .config import StrategyConfig
+from .profiling import timed
+from .signals import final_state, positions_matrix_from_z, rolling_zscore_matrix
+from .stats import rolling_ols
+
+
+def iter_chunks(prices: pd.DataFrame, chunk_bars: int) -> Iterator[pd.DataFrame]:
+    """
+    Consecutive blocks of `chunk_bars` rows of an in-memory frame (views, no copies).
+    """
+    for i in range(0, len(prices), chunk_bars):
+        yield prices.iloc[i : i + chunk_bars]
+
+
+def iter_parquet_chunks(
+    path: str | Path,
+    chunk_bars: int,
+    columns: list[str] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Blocks of about `chunk_bars` rows of a wide price file (index = time,
+    columns = tickers, as written by DataFrame.to_parquet), read one record
+    batch at a time so only one block is ever in memory.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pf = pq.ParquetFile(path)
+    schema = pf.schema_arrow
+    if columns is not None:
+        meta = schema.pandas_metadata or {}
+        index_cols = [c for c in meta.get("index_columns", []) if isinstance(c, str)]
+        columns = index_cols + [c for c in columns if c not in index_cols]
+        schema = pa.schema([schema.field(c) for c in columns], metadata=schema.metadata)
+    for batch in pf.iter_batches(batch_size=chunk_bars, columns=columns):
+        yield pa.Table.from_batches([batch], schema=schema).to_pandas()
+
+
+def _ffill(a: np.ndarray, last: np.ndarray) -> np.ndarray:
+    """
+    DataFrame.ffill of a block whose leading gaps take `last` (the previous block's last row).
+    """
+    rows = np.where(~np.isnan(a), np.arange(len(a))[:, None], -1)
+    rows = np.maximum.accumulate(rows, axis=0)
+    filled = np.take_along_axis(a, np.maximum(rows, 0), axis=0)
+    return np.where(rows >= 0, filled, last)
+
+
+class StreamingBacktest:
+    """
+    rolling_ols beta -> spread -> z-score -> positions -> backtest_matrix for
+    many pairs, fed one time block at a time.
+
+    Each block is run through the same vectorized kernels as the batch path,
+    with just enough carried over from the previous block for the results to
+    match a single pass over the whole history:
+      - forward fill: the last price row (align_prices' ffill)
+      - beta: the last beta_lookback - 1 price rows of the traded tickers
+      - z-score: the last z_lookback - 1 spreads
+      - positions: the position state (positions_matrix_from_z(state0=))
+      - backtest: the last price / beta / position row (returns use the
+        previous bar's weights)
+    so memory is O(chunk + lookback) rows whatever the length of the history,
+    e.g. years of one-minute bars. Only rolling_ols hedge ratios and no regime
+    filters (their expanding quantile needs the full history).
+    """
+
+    def __init__(
+        self,
+        pair_index: np.ndarray,
+        beta_lookback: int = 252,
+        z_lookback: int = 60,
+        entry_z: float | np.ndarray = 2.0,
+        exit_z: float | np.ndarray = 0.5,
+        fee_bps_per_leg: float = 1.0,
+        slippage_bps_per_leg: float = 0.0,
+        gross_leverage: float = 1.0,
+    ):
+        pair_index = np.asarray(pair_index, dtype=int).reshape(-1, 2)
+        # Only the tickers that are traded are carried between blocks.
+        self.tickers, local = np.unique(pair_index, return_inverse=True)
+        self.local_index = local.reshape(-1, 2)
+        self.beta_lookback = int(beta_lookback)
+        self.z_lookback = int(z_lookback)
+        self.entry_z = entry_z
+        self.exit_z = exit_z
+        self.costs = {
+            "fee_bps_per_leg": fee_bps_per_leg,
+            "slippage_bps_per_leg": slippage_bps_per_leg,
+            "gross_leverage": gross_leverage,
+        }
+
+        n_pairs, n_tickers = len(pair_index), len(self.tickers)
+        self.n_bars = 0
+        self.last_price = np.full(n_tickers, np.nan)
+        self.price_tail = np.empty((0, n_tickers))
+        self.spread_tail = np.empty((0, n_pairs))
+        self.state = np.zeros(n_pairs)
+        self.last_beta = np.full(n_pairs, np.nan)
+        self.last_pos = np.full(n_pairs, np.nan)
+
+    @classmethod
+    def from_config(cls, cfg: StrategyConfig, pair_index: np.ndarray) -> StreamingBacktest:
+        if cfg.hedge_ratio != "rolling_ols":
+            raise ValueError(f"StreamingBacktest supports hedge_ratio='rolling_ols' only, got {cfg.hedge_ratio!r}")
+        if cfg.vol_filter or cfg.trend_filter or cfg.coint_monitor:
+            raise ValueError("StreamingBacktest does not support the regime filters or the stability monitor")
+        return cls(
+            pair_index, cfg.beta_lookback, cfg.z_lookback, cfg.entry_z, cfg.exit_z,
+            cfg.fee_bps_per_leg, cfg.slippage_bps_per_leg, cfg.gross_leverage,
+        )
+
+    @timed(rows=lambda self, chunk, *args, **kwargs: len(chunk))
+    def process(self, chunk: pd.DataFrame | np.ndarray, index: pd.Index | None = None) -> MatrixBacktest:
+        """
+        Consume the next block of price rows (all columns of the panel the
+        pair_index refers to) and return its MatrixBacktest rows.
+        """
+        if isinstance(chunk, pd.DataFrame):
+            index = chunk.index if index is None else index
+            chunk = chunk.values
+        p = _ffill(np.asarray(chunk, dtype=float)[:, self.tickers], self.last_price)
+        n = len(p)
+        ya, xa = self.local_index[:, 0], self.local_index[:, 1]
+
+        window = np.vstack([self.price_tail, p])
+        k = len(self.price_tail)
+        beta = rolling_ols(window[:, ya], window[:, xa], self.beta_lookback).beta[k:]
+        spread = p[:, ya] - beta * p[:, xa]
+
+        spreads = np.vstack([self.spread_tail, spread])
+        z = rolling_zscore_matrix(spreads, self.z_lookback)[len(self.spread_tail) :]
+        pos = positions_matrix_from_z(z, self.entry_z, self.exit_z, state0=self.state)
+
+        # Prepend the previous bar so the first row's returns and turnover use its weights.
+        first = self.n_bars == 0
+        bt = backtest_matrix(
+            p if first else np.vstack([self.last_price, p]),
+            self.local_index,
+            beta if first else np.vstack([self.last_beta, beta]),
+            pos if first else np.vstack([self.last_pos, pos]),
+            **self.costs,
+        )
+        out = MatrixBacktest(
+            **{f: getattr(bt, f)[0 if first else 1 :] for f in BACKTEST_FIELDS},
+            index=index,
+        )
+
+        if n:
+            self.price_tail = window[-(self.beta_lookback - 1) :] if self.beta_lookback > 1 else window[:0]
+            self.spread_tail = spreads[-(self.z_lookback - 1) :] if self.z_lookback > 1 else spreads[:0]
+            self.state = final_state(pos, self.state)
+            self.last_price, self.last_beta, self.last_pos = p[-1], beta[-1], pos[-1]
+            self.n_bars += n
+        return out
+
+
+def stream_backtest(
+    chunks: Iterable[pd.DataFrame] | pd.DataFrame,
+    pair_index: np.ndarray,
+    cfg: StrategyConfig,
+) -> Iterator[MatrixBacktest]:
+    """
+    StreamingBacktest.process over `chunks` (e.g. iter_parquet_chunks); a
+    DataFrame is split into cfg.chunk_bars blocks.
+    """
+    if isinstance(chunks, pd.DataFrame):
+        chunks = iter_chunks(chunks, cfg.chunk_bars)
+    engine = StreamingBacktest.from_config(cfg, pair_index)
+    for chunk in chunks:
+        yield engine.process(chunk)
+
+
+def stream_portfolio(
+    chunks: Iterable[pd.DataFrame] | pd.DataFrame,
+    pair_index: np.ndarray,
+    cfg: StrategyConfig,
+) -> pd.Series:
+    """
+    Equal-weight portfolio net returns (equal_weight_portfolio) of a chunked
+    run; only this one series is kept, the per-pair blocks are dropped as
+    they are consumed. Score it with metrics.summarize(...,
+    periods_per_year=metrics.periods_per_year(cfg.bar_freq)).
+    """
+    parts = []
+    for bt in stream_backtest(chunks, pair_index, cfg):
+        valid = np.isfinite(bt.ret_net)
+        count = valid.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            port = np.where(count > 0, np.where(valid, bt.ret_net, 0.0).sum(axis=1) / count, np.nan)
+        parts.append(pd.Series(port, index=bt.index))
+    out = pd.concat(parts) if parts else pd.Series(dtype=float)
+    out.name = "portfolio_ret"
+    return out
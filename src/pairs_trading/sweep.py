@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import asdict, replace
+from itertools import product
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .backtest import backtest_matrix
+from .config import StrategyConfig
+from .filters import trade_allowed
+from .metrics import periods_per_year, summarize_matrix
+from .parallel import map_shared, shared_frame
+from .portfolio import portfolio_from_config
+from .signals import hedge_ratio, rolling_zscore, positions_matrix_from_z
+
+# Stage graph below the pair screen, in dependency order. A node of a stage is
+# identified by the values of its own fields plus those of every earlier stage,
+# so combinations that agree up to a stage share that node.
+STAGES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("beta", ("hedge_ratio", "beta_lookback", "kalman_q", "kalman_r", "kalman_intercept")),
+    ("z", ("z_lookback",)),
+    ("positions", ("entry_z", "exit_z")),
+    ("returns", ("fee_bps_per_leg", "slippage_bps_per_leg", "gross_leverage")),
+    ("portfolio", ("coint_pvalue_max", "max_pairs")),
+)
+SWEEPABLE = tuple(f for _, fields in STAGES for f in fields)
+
+
+def _key(combo: dict[str, Any], upto: str) -> tuple:
+    out = []
+    for name, fields in STAGES:
+        out.extend(combo[f] for f in fields)
+        if name == upto:
+            return tuple(out)
+    raise KeyError(upto)
+
+
+def expand_grid(base: StrategyConfig, grid: dict[str, list]) -> list[dict[str, Any]]:
+    """
+    Cartesian product of the grid over `base`, as full dicts of the sweepable fields.
+    """
+    bad = set(grid) - set(SWEEPABLE)
+    if bad:
+        raise ValueError(f"Not sweepable (prices/pair screen are shared): {sorted(bad)}")
+    fixed = {f: getattr(base, f) for f in SWEEPABLE}
+    keys = list(grid)
+    return [{**fixed, **dict(zip(keys, values))} for values in product(*(grid[k] for k in keys))]
+
+
+def _beta_task(task: tuple[list[tuple[int, int]], StrategyConfig]) -> tuple[np.ndarray, np.ndarray | None]:
+    """
+    One beta node: the hedge ratios of every pair and the trade-allowed mask
+    of their spreads (the filters depend on the spread only, so on beta).
+    """
+    pair_cols, cfg = task
+    prices = shared_frame()
+    values = prices.values
+    ia = np.array([a for a, _ in pair_cols], dtype=int)
+    ib = np.array([b for _, b in pair_cols], dtype=int)
+    beta = np.column_stack([
+        hedge_ratio(prices.iloc[:, a], prices.iloc[:, b], cfg).reindex(prices.index).values
+        for a, b in pair_cols
+    ]) if pair_cols else np.empty((len(values), 0))
+    spread = values[:, ia] - beta * values[:, ib]
+    return beta, trade_allowed(spread, cfg, values[:, ia], values[:, ib])
+
+
+def _sweep_task(
+    task: tuple[list[tuple[int, int]], np.ndarray, StrategyConfig, np.ndarray, np.ndarray | None, list[tuple[int, dict[str, Any]]]],
+):
+    """
+    All combinations sharing one z node, given its beta node's beta and
+    trade-allowed mask: z once, all (entry, exit) in one positions call, all
+    of them per cost setting in one backtest_matrix call.
+    """
+    pair_cols, pvals, base, beta, allowed, z_combos = task
+    values = shared_frame().values
+    ia = np.array([a for a, _ in pair_cols], dtype=int)
+    ib = np.array([b for _, b in pair_cols], dtype=int)
+    n_pairs = len(pair_cols)
+    counts: Counter = Counter()
+
+    spread = values[:, ia] - beta * values[:, ib]
+    z = rolling_zscore(pd.DataFrame(spread), z_combos[0][1]["z_lookback"]).values
+    counts["z"] += 1
+
+    # One column block per distinct (entry, exit); thresholds are per column.
+    bands = {}
+    for _, c in z_combos:
+        bands.setdefault(_key(c, "positions"), (c["entry_z"], c["exit_z"]))
+    pos_keys = list(bands)
+    pos_of = {k: j for j, k in enumerate(pos_keys)}
+    entry = np.repeat([bands[k][0] for k in pos_keys], n_pairs)
+    exit_ = np.repeat([bands[k][1] for k in pos_keys], n_pairs)
+    pos = positions_matrix_from_z(
+        np.tile(z, len(pos_keys)), entry, exit_,
+        allowed=None if allowed is None else np.tile(allowed, len(pos_keys)),
+    )
+    counts["positions"] += len(pos_keys)
+
+    by_cost: dict[tuple, list[tuple[int, dict[str, Any]]]] = {}
+    for i, c in z_combos:
+        by_cost.setdefault(tuple(c[f] for f in STAGES[3][1]), []).append((i, c))
+
+    rows = []
+    for (fee, slip, lev), cost_combos in by_cost.items():
+        bt = backtest_matrix(
+            values, np.column_stack([np.tile(ia, len(pos_keys)), np.tile(ib, len(pos_keys))]),
+            np.tile(beta, len(pos_keys)), pos,
+            fee_bps_per_leg=fee, slippage_bps_per_leg=slip, gross_leverage=lev,
+        )
+        counts["returns"] += len(pos_keys)
+
+        ids, ks, rets, turns = [], [], [], []
+        for i, c in cost_combos:
+            # Selected pairs are a prefix of the p-value-sorted screen.
+            k = min(int(c["max_pairs"]), int((pvals <= c["coint_pvalue_max"]).sum()))
+            j0 = pos_of[_key(c, "positions")] * n_pairs
+            port = portfolio_from_config(bt.ret_net[:, j0 : j0 + k], base)
+            counts["portfolio"] += 1
+            ids.append(i)
+            ks.append(k)
+            rets.append(port.returns)
+            turns.append(port.turnover(pos[:, j0 : j0 + k]))
+        # Score the whole cost group's portfolios in one pass.
+        scored = summarize_matrix(
+            np.column_stack(rets), np.column_stack(turns), periods_per_year=periods_per_year(base.bar_freq)
+        )
+        for i, k, row in zip(ids, ks, scored.to_dict("records")):
+            rows.append((i, {"n_pairs": k, **row}))
+    return rows, counts
+
+
+def run_sweep(
+    prices: pd.DataFrame,
+    pairs: pd.DataFrame,
+    base: StrategyConfig,
+    grid: dict[str, list],
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Evaluate every combination of `grid` (field -> values, see SWEEPABLE) on
+    top of `base`, sharing each distinct stage node of STAGES between the
+    combinations that depend on it.
+
+    prices: aligned price panel; pairs: select_pairs output under
+    screening_config(base, grid) (columns A, B, coint_pvalue).
+
+    Returns one row per combination (grid order): the swept fields, n_pairs and
+    the metrics.METRICS of its portfolio (weighted as in `base`). Work runs in
+    two process-pool passes: one task per beta node (beta and the
+    trade-allowed mask), then one task per z node, so a grid over signal
+    thresholds or costs alone still spreads over `workers`. Results do not
+    depend on `workers`.
+    df.attrs["nodes"] holds the number of nodes computed per stage.
+    """
+    combos = expand_grid(base, grid)
+    pairs = pairs.sort_values("coint_pvalue", kind="stable")
+    col = {t: i for i, t in enumerate(prices.columns)}
+    pair_cols = [(col[a], col[b]) for a, b in zip(pairs["A"], pairs["B"])]
+    pvals = pairs["coint_pvalue"].to_numpy(dtype=float)
+
+    groups: dict[tuple, dict[tuple, list[tuple[int, dict[str, Any]]]]] = {}
+    for i, c in enumerate(combos):
+        groups.setdefault(_key(c, "beta"), {}).setdefault(_key(c, "z"), []).append((i, c))
+    beta_cfgs = [
+        replace(base, **{f: next(iter(g.values()))[0][1][f] for f in STAGES[0][1]}) for g in groups.values()
+    ]
+    betas = list(map_shared(_beta_task, [(pair_cols, cfg) for cfg in beta_cfgs], prices, workers=workers))
+
+    # Each z task gets its beta node's (n_obs, n_pairs) beta and mask pickled in.
+
+    tasks = [
+        (pair_cols, pvals, base, beta, allowed, z_combos)
+        for (beta, allowed), g in zip(betas, groups.values())
+        for z_combos in g.values()
+    ]
+    stats: dict[int, dict[str, Any]] = {}
+    counts: Counter = Counter({"beta": len(groups)})
+    for rows, c in map_shared(_sweep_task, tasks, prices, workers=workers):
+        stats.update(rows)
+        counts.update(c)
+
+    out = pd.DataFrame([{**{k: c[k] for k in grid}, **stats[i]} for i, c in enumerate(combos)])
+    out.attrs["nodes"] = {name: counts[name] for name, _ in STAGES}
+    return out
+
+
+def screening_config(base: StrategyConfig, grid: dict[str, list]) -> StrategyConfig:
+    """
+    Config for the one select_pairs call a sweep needs: the loosest p-value
+    cut and largest max_pairs in the grid (tighter ones are prefixes of it).
+    """
+    return replace(
+        base,
+        coint_pvalue_max=max(grid.get("coint_pvalue_max", [base.coint_pvalue_max])),
+        max_pairs=max(grid.get("max_pairs", [base.max_pairs])),
+    )
+
+
+def parse_grid(specs: list[str], base: StrategyConfig) -> dict[str, list]:
+    """
+    ["entry_z=1.5,2,2.5", "z_lookback=20,60"] -> typed grid, using the base field types.
+    """
+    defaults = asdict(base)
+    grid: dict[str, list] = {}
+    for spec in specs:
+        name, _, raw = spec.partition("=")
+        name = name.strip()
+        if name not in SWEEPABLE:
+            raise ValueError(f"Unknown or non-sweepable field: {name!r} (choose from {', '.join(SWEEPABLE)})")
+        kind = type(defaults[name])
+        if kind is bool:
+            values = [v.strip().lower() in ("1", "true", "yes") for v in raw.split(",")]
+        else:
+            values = [kind(v.strip()) for v in raw.split(",") if v.strip()]
+        grid[name] = values
+    return grid
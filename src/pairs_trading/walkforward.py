@@ -0,0 +1,428 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .config import WalkForwardConfig
+from .ledger import TRADE_DTYPE, TradeLedger, extract_trades
+from .parallel import map_shared, shared_frame
+from .screening import coint_pvalues_from_hedge
+from .signals import positions_matrix_from_z
+
+# Notebook 03 conventions: tests need >= 60 obs, perf stats use ddof=0.
+MIN_TEST_OBS = 60
+FREQ = 252
+
+
+def iter_windows(n: int, train_days: int, trade_days: int, step_days: int) -> list[tuple[int, int, int]]:
+    """
+    (train_start, train_end, trade_end) integer row positions; train = [i0, i1), trade = [i1, i2).
+    """
+    out = []
+    start = 0
+    while start + train_days + trade_days <= n:
+        out.append((start, start + train_days, start + train_days + trade_days))
+        start += step_days
+    return out
+
+
+class _RunningMoments:
+    """
+    Sum and cross-product matrix of the price panel over a sliding row window.
+
+    Moving from one train window to the next only subtracts the rows that left
+    and adds the rows that entered, so with 75% overlap each slide touches
+    1/4 of the window instead of all of it.
+    """
+
+    def __init__(self, values: np.ndarray):
+        # Shift by the column means so the uncentered sums stay small.
+        self.values = values - values.mean(axis=0)
+        self.lo = self.hi = 0
+        k = values.shape[1]
+        self.s = np.zeros(k)
+        self.S = np.zeros((k, k))
+
+    def _add(self, lo: int, hi: int, sign: float) -> None:
+        if hi > lo:
+            rows = self.values[lo:hi]
+            self.s += sign * rows.sum(axis=0)
+            self.S += sign * (rows.T @ rows)
+
+    def slide(self, lo: int, hi: int) -> None:
+        if lo >= self.hi or hi <= self.lo:
+            self.s[:] = 0.0
+            self.S[:] = 0.0
+            self._add(lo, hi, 1.0)
+        else:
+            self._add(self.lo, lo, -1.0)
+            self._add(lo, self.lo, 1.0)
+            self._add(self.hi, hi, 1.0)
+            self._add(hi, self.hi, -1.0)
+        self.lo, self.hi = lo, hi
+
+    def hedge_ratios(self, ia: np.ndarray, ib: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        OLS slope and R^2 of column ia on ib (with intercept) over the current window.
+        """
+        n = self.hi - self.lo
+        cov = self.S - np.outer(self.s, self.s) / n
+        sxx = cov[ib, ib]
+        syy = cov[ia, ia]
+        sxy = cov[ia, ib]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            beta = sxy / sxx
+            rsquared = beta * sxy / syy
+        return beta, rsquared
+
+
+def _cache_path(cache_dir: Path, prices: pd.DataFrame, i0: int, i1: int) -> Path:
+    # Keyed on the window's prices too: re-adjusted or refreshed data must not
+    # reuse p-values computed from the old values.
+    h = hashlib.sha1(",".join(map(str, prices.columns)).encode())
+    h.update(np.ascontiguousarray(prices.values[i0:i1], dtype=float).data)
+    key = h.hexdigest()[:12]
+    d0 = prices.index[i0].strftime("%Y%m%d")
+    d1 = prices.index[i1 - 1].strftime("%Y%m%d")
+    return cache_dir / f"coint_{d0}_{d1}_{key}.csv"
+
+
+def screen_windows(
+    prices: pd.DataFrame,
+    windows: list[tuple[int, int, int]],
+    workers: int = 1,
+    cache_dir: str | Path | None = None,
+) -> list[pd.DataFrame]:
+    """
+    Train-window cointegration p-values (asset_A, asset_B, coint_pvalue) for all
+    pairs, for every window.
+
+    Step 1 hedge ratios come from running moments updated incrementally between
+    overlapping windows; the ADF step for all uncached windows is batched into
+    one pass (spread over `workers`). With `cache_dir`, each window's table is
+    stored and reused on later runs (it does not depend on entry/exit/cost).
+    """
+    tickers = list(prices.columns)
+    pairs = list(combinations(tickers, 2))
+    ia = np.array([tickers.index(a) for a, _ in pairs], dtype=int)
+    ib = np.array([tickers.index(b) for _, b in pairs], dtype=int)
+    cache = Path(cache_dir) if cache_dir is not None else None
+    if cache is not None:
+        cache.mkdir(parents=True, exist_ok=True)
+
+    values = prices.values.astype(float)
+    moments = _RunningMoments(values)
+    out: list[pd.DataFrame | None] = [None] * len(windows)
+    blocks, todo = [], []
+    for w, (i0, i1, _) in enumerate(windows):
+        if cache is not None and _cache_path(cache, prices, i0, i1).exists():
+            out[w] = pd.read_csv(_cache_path(cache, prices, i0, i1))
+            continue
+        if i1 - i0 < MIN_TEST_OBS:
+            out[w] = pd.DataFrame({"asset_A": [], "asset_B": [], "coint_pvalue": []})
+            continue
+        moments.slide(i0, i1)
+        beta, rsquared = moments.hedge_ratios(ia, ib)
+        blocks.append((i0, i1 - 1, ia, ib, beta, rsquared))
+        todo.append(w)
+
+    for w, pv in zip(todo, coint_pvalues_from_hedge(values, blocks, workers=workers)):
+        table = pd.DataFrame(
+            {
+                "asset_A": [a for a, _ in pairs],
+                "asset_B": [b for _, b in pairs],
+                "coint_pvalue": pv,
+            }
+        )
+        if cache is not None:
+            i0, i1, _ = windows[w]
+            table.to_csv(_cache_path(cache, prices, i0, i1), index=False)
+        out[w] = table
+    return out
+
+
+def select_pairs_train(screen: pd.DataFrame, max_p: float, top_k: int) -> pd.DataFrame:
+    sel = screen.dropna()
+    sel = sel.sort_values("coint_pvalue", ascending=True, kind="stable")
+    sel = sel[sel["coint_pvalue"] <= max_p].head(top_k)
+    return sel.reset_index(drop=True)
+
+
+def adf_pvalue(s: pd.Series) -> float:
+    from statsmodels.tsa.stattools import adfuller  # deferred: statsmodels is slow to import
+
+    s = s.dropna()
+    if len(s) < MIN_TEST_OBS:
+        return np.nan
+    return float(adfuller(s, autolag="AIC")[1])
+
+
+def backtest_pair_oos(
+    pA: pd.Series,
+    pB: pd.Series,
+    i0: int,
+    i1: int,
+    i2: int,
+    entry_z: float = 2.0,
+    exit_z: float = 0.5,
+    cost_bps: float = 0.0,
+    positions: np.ndarray | None = None,
+) -> tuple[pd.DataFrame, float]:
+    """
+    Dollar-neutral backtest trading rows [i1, i2), signals calibrated on train rows [i0, i1).
+
+    Positions:
+      - If z > entry: short spread (short A, long beta*B)
+      - If z < -entry: long spread (long A, short beta*B)
+      - Exit when |z| < exit_z; flat outside the trade window
+    Transaction cost: 'cost_bps' per *gross* notional turn (simple approximation).
+
+    `positions` (trade-window rows) replaces the z-score rule, e.g. to rebuild
+    the daily rows of a ledger.
+
+    Returns the trade-window rows only (the export keeps nothing else) and the
+    ADF p-value of the train-window spread.
+    """
+    ya = pA.values[i0:i1]
+    xb = pB.values[i0:i1]
+    xc = xb - xb.mean()
+    beta = float(xc @ (ya - ya.mean()) / (xc @ xc))
+
+    spr = (pA - beta * pB).rename("spread")
+    train = spr.iloc[i0:i1]
+    mu = train.mean()
+    sd = max(train.std(ddof=0), 1e-12)
+    z = ((spr - mu) / sd).rename("z")
+
+    pos = pd.Series(0.0, index=spr.index)
+    if positions is None:
+        positions = positions_matrix_from_z(z.values[i1:i2], entry_z=entry_z, exit_z=exit_z)
+    pos.iloc[i1:i2] = positions
+
+    # returns: approximate dollar-neutral PnL using price changes
+    ds = spr.diff().fillna(0.0)
+    pnl = (pos.shift(1).fillna(0.0) * ds).rename("pnl")  # enter at next bar
+
+    turnover = pos.diff().abs().fillna(0.0)
+    # Gross notional ~ 1 + |beta| (one unit A plus beta units of B); scale cost accordingly.
+    cost = (turnover * (cost_bps / 10_000.0) * (1.0 + abs(beta))).rename("cost")
+    net = (pnl - cost).rename("net_pnl")
+
+    out = pd.concat([spr, z, pos.rename("position"), pnl, cost, net], axis=1).iloc[i1:i2]
+    out["beta"] = beta
+    out["train_mean_spread"] = train.mean()
+    out["train_std_spread"] = train.std(ddof=0)
+    out["is_train"] = 0
+    out["is_trade"] = 1
+    return out, adf_pvalue(train)
+
+
+def perf_stats(equity: pd.Series, freq: int = FREQ) -> dict:
+    r = equity.pct_change().dropna()
+    ann_ret = (equity.iloc[-1] ** (freq / max(len(r), 1)) - 1.0) if len(r) else np.nan
+    ann_vol = r.std(ddof=0) * np.sqrt(freq) if len(r) else np.nan
+    sharpe = (r.mean() / (r.std(ddof=0) + 1e-12)) * np.sqrt(freq) if len(r) else np.nan
+
+    peak = equity.cummax()
+    dd = (equity / peak) - 1.0
+    max_dd = dd.min() if len(dd) else np.nan
+
+    win_rate = (r > 0).mean() if len(r) else np.nan
+
+    return {
+        "annualized_return": float(ann_ret) if np.isfinite(ann_ret) else np.nan,
+        "annualized_vol": float(ann_vol) if np.isfinite(ann_vol) else np.nan,
+        "sharpe": float(sharpe) if np.isfinite(sharpe) else np.nan,
+        "max_drawdown": float(max_dd) if np.isfinite(max_dd) else np.nan,
+        "win_rate_daily": float(win_rate) if np.isfinite(win_rate) else np.nan,
+        "equity_start": float(equity.iloc[0]) if len(equity) else np.nan,
+        "equity_end": float(equity.iloc[-1]) if len(equity) else np.nan,
+        "n_days": int(len(equity)),
+    }
+
+
+def window_equity_from_trades(trades: list[pd.DataFrame], trade_idx: pd.DatetimeIndex) -> pd.Series:
+    """
+    Equal-weight average of the per-pair equity curves of one trade window.
+    """
+    eqs = [(1.0 + t.loc[trade_idx, "net_pnl"]).cumprod() for t in trades]
+    if not eqs:
+        return pd.Series(1.0, index=trade_idx, name="equity_window")
+    mat = pd.concat(eqs, axis=1).ffill().fillna(1.0)
+    return mat.mean(axis=1).rename("equity_window")
+
+
+def _window_task(task: tuple[int, tuple[int, int, int], list[tuple[str, str, float]], WalkForwardConfig]):
+    """
+    Backtest one window's pairs; returns the window equity, the trades as
+    ledger rows (pair = position in `selected`, rows relative to the full
+    index) and per-pair metadata. The daily frames are dropped here.
+    """
+    w, (i0, i1, i2), selected, cfg = task
+    prices = shared_frame()
+    trade_idx = prices.index[i1:i2]
+    frames, ledgers, meta = [], [], []
+    for k, (a, b, p) in enumerate(selected):
+        bt, adf_p = backtest_pair_oos(
+            prices[a], prices[b], i0, i1, i2,
+            entry_z=cfg.entry_z, exit_z=cfg.exit_z, cost_bps=cfg.cost_bps,
+        )
+        frames.append(bt)
+        v = bt[["position", "pnl", "cost", "beta"]].values
+        rows = extract_trades(v[:, [0]], v[:, [1]], v[:, [2]], v[:, [3]], 1.0 + np.abs(v[:, [3]]), trade_idx, k)
+        rows["entry"] += i1
+        rows["exit"] += i1
+        ledgers.append(rows)
+        meta.append(
+            {
+                "asset_A": a,
+                "asset_B": b,
+                "coint_pvalue_train": float(p),
+                "adf_pvalue_spread_train": adf_p,
+                "beta_train": float(bt["beta"].iloc[0]),
+            }
+        )
+    combined = window_equity_from_trades(frames, trade_idx)
+    trades = np.concatenate(ledgers) if ledgers else np.empty(0, dtype=TRADE_DTYPE)
+    return combined, trades, meta
+
+
+@dataclass
+class WalkForwardResult:
+    """
+    summary / equity as in notebook 03. Trades are kept as a ledger with one
+    "pair" per (window, pair) row of `pair_windows`. The notebook's daily
+    trade-window frame is rebuilt from it on first access of `trades`.
+    """
+    summary: pd.DataFrame
+    equity: pd.Series
+    ledger: TradeLedger
+    pair_windows: pd.DataFrame = field(default_factory=pd.DataFrame)
+    prices: pd.DataFrame | None = field(default=None, repr=False)
+    cfg: WalkForwardConfig | None = None
+    _trades: pd.DataFrame | None = field(default=None, init=False, repr=False)
+
+    @property
+    def trades(self) -> pd.DataFrame:
+        """
+        Daily trade-window rows of every selected pair (walkforward_oos_trades.csv).
+        """
+        if self._trades is None:
+            self._trades = self._rebuild_trades()
+        return self._trades
+
+    def _rebuild_trades(self) -> pd.DataFrame:
+        if self.pair_windows.empty:
+            return pd.DataFrame()
+        frames = []
+        for k, pw in enumerate(self.pair_windows.itertuples(index=False)):
+            pos = self.ledger.positions(np.array([k]))[pw.i1 : pw.i2, 0]
+            bt, _ = backtest_pair_oos(
+                self.prices[pw.asset_A], self.prices[pw.asset_B], pw.i0, pw.i1, pw.i2,
+                cost_bps=self.cfg.cost_bps, positions=pos,
+            )
+            bt["window"] = pw.window
+            bt["asset_A"] = pw.asset_A
+            bt["asset_B"] = pw.asset_B
+            frames.append(bt)
+        return pd.concat(frames, axis=0)
+
+    def save(self, out_dir: str | Path) -> dict[str, Path]:
+        """
+        Writes the same three CSVs as notebook 03, plus the per-trade ledger.
+        """
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        paths = {
+            "summary": out / "walkforward_window_summary.csv",
+            "equity": out / "walkforward_oos_equity.csv",
+            "trades": out / "walkforward_oos_trades.csv",
+            "ledger": out / "walkforward_oos_ledger.csv",
+        }
+        self.summary.to_csv(paths["summary"], index=False)
+        self.equity.to_frame().to_csv(paths["equity"], index=True)
+        if not self.trades.empty:
+            self.trades.to_csv(paths["trades"], index=True)
+        self.ledger.to_frame().to_csv(paths["ledger"], index=False)
+        return paths
+
+
+def run_walkforward(
+    prices: pd.DataFrame,
+    cfg: WalkForwardConfig,
+    workers: int = 1,
+    cache_dir: str | Path | None = None,
+) -> WalkForwardResult:
+    """
+    Rolling train -> trade evaluation (notebook 03), out-of-sample only.
+
+    Rows with any missing price are dropped first, as in the notebook.
+    Windows are screened incrementally (screen_windows) and then backtested
+    independently, one map_shared task per window.
+    """
+    prices = prices.dropna()
+    idx = prices.index
+    windows = iter_windows(len(idx), cfg.train_days, cfg.trade_days, cfg.step_days)
+    screens = screen_windows(prices, windows, workers=workers, cache_dir=cache_dir)
+
+    tasks = []
+    for w, ((i0, i1, i2), screen) in enumerate(zip(windows, screens), start=1):
+        sel = select_pairs_train(screen, cfg.max_coint_p, cfg.top_k)
+        selected = list(zip(sel["asset_A"], sel["asset_B"], sel["coint_pvalue"]))
+        tasks.append((w, (i0, i1, i2), selected, cfg))
+
+    window_summaries = []
+    ledgers, pair_windows = [], []
+    # Notebook 03 starts from 1.0 everywhere, so bars after the last trade
+    # window stay at 1.0; otherwise they carry the last equity (ffill below).
+    overall = pd.Series(1.0 if cfg.notebook_equity_chain else np.nan, index=idx, name="equity_oos")
+    results = map_shared(_window_task, tasks, prices, workers=workers)
+    for (w, (i0, i1, i2), _, _), (combined, trades, meta) in zip(tasks, results):
+        train_idx, trade_idx = idx[i0:i1], idx[i1:i2]
+        row = {
+            "window": w,
+            "train_start": train_idx[0],
+            "train_end": train_idx[-1],
+            "trade_start": trade_idx[0],
+            "trade_end": trade_idx[-1],
+            "selected_pairs": len(meta),
+        }
+        if meta:
+            window_summaries.append({**row, "pairs": meta, **perf_stats(combined)})
+            trades["pair"] += len(pair_windows)
+            ledgers.append(trades)
+            pair_windows.extend(
+                {"window": w, "asset_A": m["asset_A"], "asset_B": m["asset_B"], "i0": i0, "i1": i1, "i2": i2}
+                for m in meta
+            )
+        else:
+            window_summaries.append({**row, "note": "No pairs passed cointegration threshold"})
+
+        # Chain this window's equity (normalized to start at 1.0) onto the OOS curve,
+        # from the last value written before the trade start.
+        if cfg.notebook_equity_chain:
+            # Notebook 03's lookup: the *calendar* day before the trade start, else
+            # the trade-start value, so the chain restarts after a weekend/holiday.
+            day_before = trade_idx[0] - pd.Timedelta(days=1)
+            prev = overall.loc[day_before] if day_before in overall.index else overall.iloc[i1]
+        else:
+            done = overall.values[:i1]
+            done = done[~np.isnan(done)]
+            prev = done[-1] if len(done) else 1.0
+        prev = 1.0 if np.isnan(prev) else prev
+        overall.iloc[i1:i2] = prev * (combined / combined.iloc[0]).values
+
+    if not cfg.notebook_equity_chain:
+        overall = overall.ffill().fillna(1.0)
+    pair_windows = pd.DataFrame(pair_windows)
+    ledger = TradeLedger(
+        np.concatenate(ledgers) if ledgers else np.empty(0, dtype=TRADE_DTYPE),
+        idx,
+        [f"w{r.window}:{r.asset_A}__{r.asset_B}" for r in pair_windows.itertuples()],
+    )
+    return WalkForwardResult(pd.DataFrame(window_summaries), overall, ledger, pair_windows, prices, cfg)
@@ -5,7 +5,6 @@ from typing import Optional, Iterable
 
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 
 
 @dataclass
@@ -79,6 +78,8 @@ def plot_equity_and_drawdown(
 
     Returns EquityDrawdown for further reporting/testing.
     """
+    import matplotlib.pyplot as plt  # deferred: only loaded when plotting
+
     ed = compute_equity_and_drawdown(returns, start_equity=start_equity)
 
     # Benchmark
@@ -0,0 +1,14 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+PROCESSED = Path(__file__).resolve().parents[1] / "data" / "processed"
+
+
+@pytest.fixture(scope="session")
+def daily_prices() -> pd.DataFrame:
+    """
+    The repo's 18-ticker daily adjusted-close panel (data/processed).
+    """
+    return pd.read_parquet(PROCESSED / "adj_close_2018-01-01_to_today.parquet")
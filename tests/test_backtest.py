@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from pairs_trading.backtest import BACKTEST_FIELDS, backtest_matrix, pair_returns_from_spread_position
+
+
+def _baseline_pair_returns(price_y, price_x, beta, spread_pos, fee_bps_per_leg=1.0, slippage_bps_per_leg=0.0,
+                           gross_leverage=1.0):
+    # pair_returns_from_spread_position before it moved onto backtest_matrix.
+    y, x = price_y.align(price_x, join="inner")
+    b = beta.reindex(y.index)
+    p = spread_pos.reindex(y.index)
+    rety = y.pct_change()
+    retx = x.pct_change()
+    wy = p
+    wx = -p * b
+    gross = (wy.abs() + wx.abs()).replace(0.0, np.nan)
+    scale = gross_leverage / gross
+    wy_s = wy * scale
+    wx_s = wx * scale
+    wy_lag = wy_s.shift(1)
+    wx_lag = wx_s.shift(1)
+    gross_ret = (wy_lag * rety) + (wx_lag * retx)
+    dwy = (wy_s - wy_s.shift(1)).abs()
+    dwx = (wx_s - wx_s.shift(1)).abs()
+    cost = (dwy + dwx) * ((fee_bps_per_leg + slippage_bps_per_leg) / 10_000.0)
+    return pd.DataFrame({
+        "ret_gross": gross_ret, "ret_net": gross_ret - cost, "wy": wy_s, "wx": wx_s,
+        "turnover": dwy + dwx, "cost": cost,
+    })
+
+
+def _ragged_universe(n=400, k=6, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2021-01-01", periods=n)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n, k)), axis=0)),
+                          index=idx, columns=[f"T{i}" for i in range(k)])
+    prices.iloc[:120, 1] = np.nan  # late listing
+    prices.iloc[300:, 4] = np.nan  # delisted
+    prices.iloc[[50, 51, 200], 2] = np.nan  # gaps
+    prices.iloc[rng.random((n, k)) < 0.01] = np.nan
+    pair_index = np.array([[0, 1], [2, 3], [1, 2], [4, 0], [3, 5], [5, 2]])
+    m = len(pair_index)
+    beta = rng.normal(1.0, 0.3, (n, m))
+    beta[:30] = np.nan
+    pos = rng.choice([-1.0, 0.0, 1.0], (n, m), p=[0.3, 0.4, 0.3])
+    pos[:30] = np.nan
+    pos[rng.random((n, m)) < 0.02] = np.nan
+    return prices, pair_index, beta, pos
+
+
+def test_backtest_matrix_equals_per_pair_baseline():
+    prices, pair_index, beta, pos = _ragged_universe()
+    costs = dict(fee_bps_per_leg=2.0, slippage_bps_per_leg=1.5, gross_leverage=2.0)
+    bt = backtest_matrix(prices, pair_index, beta, pos, **costs)
+    for j, (iy, ix) in enumerate(pair_index):
+        ref = _baseline_pair_returns(prices.iloc[:, iy], prices.iloc[:, ix], pd.Series(beta[:, j], index=prices.index),
+                                     pd.Series(pos[:, j], index=prices.index), **costs)
+        pd.testing.assert_frame_equal(bt.pair_frame(j), ref[list(BACKTEST_FIELDS)], check_exact=True, check_freq=False)
+
+
+def test_pair_returns_on_unaligned_series():
+    prices, _, beta, pos = _ragged_universe(seed=1)
+    y = prices["T1"].dropna()
+    x = prices["T2"].iloc[10:]
+    b = pd.Series(beta[:, 0], index=prices.index)
+    p = pd.Series(pos[:, 0], index=prices.index)
+    got = pair_returns_from_spread_position(y, x, b, p, fee_bps_per_leg=3.0)
+    ref = _baseline_pair_returns(y, x, b, p, fee_bps_per_leg=3.0)
+    pd.testing.assert_frame_equal(got, ref[list(BACKTEST_FIELDS)], check_exact=True, check_freq=False)
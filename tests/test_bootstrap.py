@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.bootstrap import BOOTSTRAP_METRICS, block_indices, bootstrap_metrics, stationary_indices
+from pairs_trading.metrics import summarize
+
+RETURNS = pd.Series(
+    np.random.default_rng(11).normal(4e-4, 0.01, 750),
+    index=pd.bdate_range("2019-01-01", periods=750),
+)
+
+
+@pytest.mark.parametrize("method", ["stationary", "block"])
+def test_samples_do_not_depend_on_workers(method):
+    kw = dict(n_reps=400, method=method, batch_size=64, seed=3)
+    one = bootstrap_metrics(RETURNS, workers=1, **kw)
+    four = bootstrap_metrics(RETURNS, workers=4, **kw)
+    assert one.samples.shape == (400, len(BOOTSTRAP_METRICS))
+    pd.testing.assert_frame_equal(one.samples, four.samples)
+    pd.testing.assert_series_equal(one.point, four.point)
+    assert not one.samples.equals(bootstrap_metrics(RETURNS, workers=1, **{**kw, "seed": 4}).samples)
+
+
+def _breaks(idx: np.ndarray, n_obs: int) -> np.ndarray:
+    # True where row t does not continue row t-1's block (wrapping around).
+    return (idx[1:] - idx[:-1]) % n_obs != 1
+
+
+def test_block_indices_are_contiguous_blocks():
+    n_obs, n_reps, block = 103, 50, 10
+    idx = block_indices(np.random.default_rng(0), n_obs, n_reps, block)
+    assert idx.shape == (n_obs, n_reps)
+    assert idx.min() >= 0 and idx.max() < n_obs
+    brk = _breaks(idx, n_obs)
+    # Within a block every step is +1; a new block may start every `block` rows.
+    inside = np.ones(n_obs - 1, dtype=bool)
+    inside[block - 1 :: block] = False
+    assert not brk[inside].any()
+    assert brk[~inside].mean() > 0.9
+
+
+def test_stationary_indices_have_geometric_blocks():
+    n_obs, n_reps, mean_block = 500, 200, 8.0
+    idx = stationary_indices(np.random.default_rng(0), n_obs, n_reps, mean_block)
+    assert idx.shape == (n_obs, n_reps)
+    assert idx.min() >= 0 and idx.max() < n_obs
+    # Blocks continue by +1 (wrapping); a new one starts w.p. 1/mean_block per bar.
+    rate = _breaks(idx, n_obs).mean()
+    assert rate == pytest.approx(1.0 / mean_block * (1 - 1.0 / n_obs), rel=0.05)
+
+
+def test_intervals_cover_the_point_on_iid_returns():
+    res = bootstrap_metrics(RETURNS, n_reps=2000, seed=0)
+    ci = res.intervals(0.95)
+    assert list(ci.index) == list(BOOTSTRAP_METRICS)
+    assert ((ci["lower"] <= ci["point"]) & (ci["point"] <= ci["upper"])).all()
+    ref = summarize(RETURNS)
+    for k in BOOTSTRAP_METRICS:
+        assert ci.loc[k, "point"] == pytest.approx(ref[k], rel=1e-15)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading import cache
+from pairs_trading.cache import memoize, package_fingerprint
+
+
+@pytest.fixture
+def memo(tmp_path):
+    store = cache.configure(tmp_path / "memo")
+    yield store
+    cache.configure(None)
+
+
+def test_hit_on_same_inputs(memo):
+    calls = []
+
+    @memoize
+    def f(s: pd.Series, k: int) -> pd.Series:
+        calls.append(k)
+        return s * k
+
+    s = pd.Series(np.arange(5.0), index=pd.date_range("2020-01-01", periods=5), name="x")
+    pd.testing.assert_series_equal(f(s, 2), f(s, 2), check_freq=False)
+    assert calls == [2]
+    f(s, 3)
+    assert calls == [2, 3]
+
+
+def test_version_salt_changes_key(memo):
+    def make(version):
+        @memoize(version=version)
+        def g(x: float) -> float:
+            return x + version
+        return g
+
+    assert make(0)(1.0) == 1.0
+    assert make(1)(1.0) == 2.0
+
+
+def test_fingerprint_covers_package_sources():
+    fp = package_fingerprint()
+    assert isinstance(fp, str) and len(fp) == 40
+    package_fingerprint.cache_clear()
+    assert package_fingerprint() == fp
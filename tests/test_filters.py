@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.filters import rolling_slope, rolling_vol, trend_filter, vol_filter
+
+
+def _notebook_slopes(s: pd.Series, lookback: int) -> pd.Series:
+    # Notebook 04's per-bar regression inside trend_filter.
+    idx = np.arange(len(s), dtype=float)
+    slopes = pd.Series(np.nan, index=s.index, name="slope")
+    for i in range(len(s)):
+        j0 = max(0, i - lookback + 1)
+        ys = s.iloc[j0 : i + 1].values
+        xs = idx[j0 : i + 1]
+        if len(ys) < max(30, lookback // 2):
+            continue
+        x_center = xs - xs.mean()
+        slopes.iloc[i] = (x_center @ (ys - ys.mean())) / (x_center @ x_center + 1e-12)
+    return slopes
+
+
+def _notebook_trend_filter(s: pd.Series, lookback: int = 60, max_abs_slope_z: float = 1.5) -> pd.Series:
+    s_std = s.rolling(lookback, min_periods=max(30, lookback // 2)).std(ddof=0)
+    slope_z = (_notebook_slopes(s, lookback) * lookback) / (s_std + 1e-12)
+    return slope_z.abs() <= max_abs_slope_z
+
+
+@pytest.fixture
+def spread(daily_prices):
+    logp = np.log(daily_prices)
+    s = (logp.iloc[:, 0] - 0.8 * logp.iloc[:, 1]).rename("spread")
+    s.iloc[:90] = np.nan  # rolling-beta warmup
+    s.iloc[700] = np.nan
+    return s
+
+
+@pytest.mark.parametrize("lookback", [40, 60, 61, 252])
+def test_rolling_slope_matches_notebook_loop(spread, lookback):
+    got = rolling_slope(spread, lookback)
+    ref = _notebook_slopes(spread, lookback)
+    np.testing.assert_array_equal(np.isnan(got.values), np.isnan(ref.values))
+    scale = np.nanmax(np.abs(ref.values))
+    np.testing.assert_allclose(got.values, ref.values, rtol=3e-14, atol=3e-14 * scale)
+
+
+def test_rolling_vol_matches_pandas(spread):
+    got = rolling_vol(spread, 20)
+    ref = spread.diff().rolling(20, min_periods=10).std(ddof=0)
+    np.testing.assert_allclose(got.values, ref.values, rtol=3e-14, atol=3e-14 * ref.max())
+
+
+def test_trend_filter_matches_notebook(spread):
+    got = trend_filter(spread, 60, 1.5)
+    ref = _notebook_trend_filter(spread, 60, 1.5)
+    np.testing.assert_array_equal(got.values, ref.values)
+
+
+def test_vol_filter_has_no_look_ahead(spread):
+    base = vol_filter(spread, 20, 0.8)
+    assert not base.iloc[:110].any()  # warmup + min_periods
+    for t in (400, 1000, len(spread) - 2):
+        shocked = spread.copy()
+        shocked.iloc[t + 1 :] += np.random.default_rng(t).normal(0, 0.5, len(spread) - t - 1)
+        got = vol_filter(shocked, 20, 0.8)
+        pd.testing.assert_series_equal(got.iloc[: t + 1], base.iloc[: t + 1])
+        assert not got.iloc[t + 1 :].equals(base.iloc[t + 1 :])
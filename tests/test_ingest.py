@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.ingest import AsyncIngestor, HTTPSource
+from pairs_trading.store import FrameSource, PriceStore
+
+TICKERS = [f"T{i:03d}" for i in range(40)]
+PRICES = pd.DataFrame(
+    np.random.default_rng(0).lognormal(size=(200, len(TICKERS))).cumsum(axis=0),
+    index=pd.bdate_range("2020-01-01", periods=200),
+    columns=TICKERS,
+)
+
+
+class FlakySource(FrameSource):
+    """
+    Raises on every 4th call and on any batch containing `bad`; answers
+    `nan_ticker` with an all-NaN column (like yfinance for an unknown ticker).
+    """
+
+    def __init__(self, prices, bad="T013", nan_ticker="T027"):
+        super().__init__(prices)
+        self.bad, self.nan_ticker = bad, nan_ticker
+        self.n = self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def fetch(self, tickers, start, end):
+        with self.lock:
+            self.n += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            n = self.n
+        try:
+            time.sleep(0.01)
+            if self.bad in tickers:
+                raise RuntimeError("bad ticker")
+            if n % 4 == 0:
+                raise ConnectionError("transient")
+            out = super().fetch(tickers, start, end)
+            if self.nan_ticker in tickers:
+                out[self.nan_ticker] = np.nan
+            return out
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def _ingestor(source, **kw):
+    kw = {"batch_size": 8, "max_concurrency": 3, "rate": 1000.0, "burst": 5, "retries": 2, "backoff": 0.0, **kw}
+    return AsyncIngestor(source, **kw)
+
+
+def test_retries_isolate_failing_tickers():
+    src = FlakySource(PRICES)
+    with pytest.warns(RuntimeWarning, match="T013, T027"):
+        res = _ingestor(src).ingest(TICKERS, "2020-01-01")
+    assert res.failed == ["T013", "T027"]
+    assert src.peak <= 3
+    pd.testing.assert_frame_equal(res.prices, PRICES.drop(columns=["T013", "T027"]), check_freq=False)
+
+
+def test_fetch_warns_on_cli_path():
+    with pytest.warns(RuntimeWarning, match="T027"):
+        out = _ingestor(FlakySource(PRICES, bad="none")).fetch(TICKERS, "2020-01-01", None)
+    assert "T027" not in out.columns and out.shape[1] == len(TICKERS) - 1
+
+
+def test_ingest_inside_a_running_loop():
+    # As from a notebook cell: asyncio.run would raise here.
+    async def cell():
+        return _ingestor(FrameSource(PRICES), batch_size=8).ingest(TICKERS, "2020-01-01")
+
+    res = asyncio.run(cell())
+    assert res.failed == []
+    pd.testing.assert_frame_equal(res.prices, PRICES, check_freq=False)
+
+
+def test_rate_limit():
+    ing = _ingestor(FrameSource(PRICES), batch_size=4, max_concurrency=10, rate=50.0, burst=1)
+    t0 = time.perf_counter()
+    ing.ingest(TICKERS, "2020-01-01")
+    assert time.perf_counter() - t0 >= 9 / 50.0 * 0.9  # 10 requests, one token up front
+
+
+def test_store_writes_each_batch(tmp_path):
+    store = PriceStore(tmp_path, _ingestor(FlakySource(PRICES), batch_size=10))
+    saved = []
+    save = store._save_manifest
+    store._save_manifest = lambda: (saved.append(len(store.manifest)), save())
+    with pytest.warns(RuntimeWarning):
+        store.refresh(TICKERS, "2020-01-01")
+    assert len(saved) > 4 and saved == sorted(saved)
+    assert set(store.manifest) == set(TICKERS) - {"T013", "T027"}
+    out = store.load(TICKERS, "2020-01-01")
+    pd.testing.assert_frame_equal(
+        out.drop(columns=["T013", "T027"]), PRICES.drop(columns=["T013", "T027"]), check_freq=False, check_names=False
+    )
+
+
+@pytest.fixture
+def stub_server():
+    class Handler(BaseHTTPRequestHandler):
+        hits = 0
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            Handler.hits += 1
+            if Handler.hits % 3 == 0:
+                self.send_response(429)
+                self.end_headers()
+                return
+            q = parse_qs(urlparse(self.path).query)
+            cols = q["tickers"][0].split(",")
+            body = PRICES.loc[pd.Timestamp(q["start"][0]) :, cols].rename_axis("date").to_csv().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv")
+            self.end_headers()
+            self.wfile.write(body)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_port}/prices"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_http_source_retries_429(stub_server):
+    res = _ingestor(HTTPSource(stub_server), batch_size=7).ingest(TICKERS, "2020-01-01")
+    assert res.failed == [] and res.errors
+    pd.testing.assert_frame_equal(res.prices, PRICES, check_freq=False, check_names=False, rtol=1e-12)
@@ -0,0 +1,65 @@
+import numpy as np
+import statsmodels.api as sm
+
+from pairs_trading.kalman import INIT_OBS, kalman_beta
+
+
+def _notebook_kalman_beta(y, x, q, r, init_P=1.0):
+    # Notebook 04's loop, on a dropna()'d pair.
+    fit = sm.OLS(y[:INIT_OBS], sm.add_constant(x[:INIT_OBS])).fit()
+    beta, P, out = float(fit.params[1]), init_P, []
+    for xt, yt in zip(x, y):
+        P_pred = P + q
+        K = (P_pred * xt) / ((xt * xt) * P_pred + r + 1e-12)
+        beta = beta + K * (yt - xt * beta)
+        P = (1.0 - K * xt) * P_pred
+        out.append(beta)
+    return np.array(out)
+
+
+def test_kalman_beta_matches_notebook(daily_prices):
+    y, x = daily_prices.iloc[:, 0], daily_prices.iloc[:, 1]
+    got = kalman_beta(y, x, q=1e-5, r=1e-2)
+    np.testing.assert_allclose(got.values, _notebook_kalman_beta(y.values, x.values, 1e-5, 1e-2), rtol=1e-9)
+
+
+def test_seed_uses_first_valid_rows(daily_prices):
+    y, x = daily_prices.iloc[:, 0].copy(), daily_prices.iloc[:, 1]
+    y.iloc[:150] = np.nan  # a late-listed leg
+    got = kalman_beta(y, x, q=1e-5, r=1e-2)
+    assert got.iloc[:150].isna().all()
+    ok = y.notna()
+    np.testing.assert_allclose(
+        got[ok].values, _notebook_kalman_beta(y[ok].values, x[ok].values, 1e-5, 1e-2), rtol=1e-9
+    )
+
+
+def _reference_kalman_2state(y, x, q, r, init_P=1.0):
+    # Textbook 2x2 filter on [alpha, beta] for one pair; NaN bars only predict.
+    ok = np.isfinite(y) & np.isfinite(x)
+    seed = np.flatnonzero(ok)[:INIT_OBS]
+    theta = np.linalg.lstsq(np.column_stack([np.ones(len(seed)), x[seed]]), y[seed], rcond=None)[0]
+    P = init_P * np.eye(2)
+    out = np.full(len(y), np.nan)
+    for t in range(len(y)):
+        P = P + q * np.eye(2)
+        if not ok[t]:
+            continue
+        H = np.array([1.0, x[t]])
+        S = H @ P @ H + r
+        K = P @ H / S
+        theta = theta + K * (y[t] - H @ theta)
+        P = (np.eye(2) - np.outer(K, H)) @ P
+        out[t] = theta[1]
+    return out
+
+
+def test_kalman_beta_intercept_matches_2x2_reference(daily_prices):
+    y, x = daily_prices.iloc[:, 0].copy(), daily_prices.iloc[:, 1].copy()
+    y.iloc[40] = np.nan  # inside the OLS seed window
+    x.iloc[[300, 301]] = np.nan  # after it: two predict-only bars
+    q, r = 1e-4, 1e-1
+    got = kalman_beta(y, x, q=q, r=r, intercept=True)
+    ref = _reference_kalman_2state(y.values, x.values, q, r)
+    assert got.iloc[[40, 300, 301]].isna().all()
+    np.testing.assert_allclose(got.values, ref, rtol=1e-9)
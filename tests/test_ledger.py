@@ -0,0 +1,38 @@
+import numpy as np
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.backtest import BACKTEST_FIELDS, backtest_matrix
+from pairs_trading.ledger import trade_ledger
+from pairs_trading.signals import positions_matrix_from_z, rolling_zscore_matrix
+from pairs_trading.stats import rolling_ols
+
+
+def _book(n_pairs=40, n_bars=1500):
+    prices, _ = synthetic_universe(2 * n_pairs, n_bars, coint_frac=0.5, seed=3)
+    pair_index = np.arange(2 * n_pairs).reshape(-1, 2)
+    v = prices.values
+    beta = rolling_ols(v[:, pair_index[:, 0]], v[:, pair_index[:, 1]], 120).beta
+    z = rolling_zscore_matrix(v[:, pair_index[:, 0]] - beta * v[:, pair_index[:, 1]], 40)
+    return prices, pair_index, beta, positions_matrix_from_z(z, 1.5, 0.5)
+
+
+def test_ledger_rebuilds_backtest_matrix_exactly():
+    prices, pair_index, beta, pos = _book()
+    kw = dict(fee_bps_per_leg=2.0, slippage_bps_per_leg=1.0, gross_leverage=1.5)
+    ref = backtest_matrix(prices, pair_index, beta, pos, **kw)
+    ledger = trade_ledger(prices, pair_index, beta, pos, chunk_size=16, **kw)
+    got = ledger.backtest()
+    for f in BACKTEST_FIELDS:
+        np.testing.assert_array_equal(getattr(got, f), getattr(ref, f), err_msg=f)
+    sub = ledger.backtest(np.array([3, 17]))
+    np.testing.assert_array_equal(sub.ret_net, ref.ret_net[:, [3, 17]])
+
+
+def test_ledger_keeps_no_dense_inputs():
+    prices, pair_index, beta, pos = _book()
+    ledger = trade_ledger(prices, pair_index, beta, pos)
+    in_trade = ledger.positions() != 0
+    # Three floats per bar held in a trade (plus each trade's exit bar), not the full panels.
+    assert len(ledger.legs) <= in_trade.sum() + len(ledger)
+    assert ledger.nbytes < 0.5 * sum(getattr(backtest_matrix(prices, pair_index, beta, pos), f).nbytes
+                                     for f in BACKTEST_FIELDS)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.metrics import (
+    METRICS,
+    annualized_return,
+    max_drawdown,
+    sharpe_ratio,
+    summarize,
+    summarize_matrix,
+    win_rate,
+)
+
+
+def _baseline(r: pd.Series) -> dict[str, float]:
+    # summarize() before the matrix path: one per-series function per metric.
+    return {
+        "annualized_return": annualized_return(r),
+        "sharpe": sharpe_ratio(r),
+        "max_drawdown": max_drawdown(r),
+        "win_rate": win_rate(r),
+    }
+
+
+def _series():
+    rng = np.random.default_rng(7)
+    idx = pd.bdate_range("2020-01-01", periods=300)
+    ragged = pd.Series(rng.normal(3e-4, 0.01, len(idx)), index=idx)
+    ragged.iloc[:40] = np.nan
+    ragged.iloc[[100, 101, 250]] = np.nan
+    return {
+        "ragged": ragged,
+        "dense": pd.Series(rng.normal(-1e-4, 0.02, len(idx)), index=idx),
+        "one_bar": pd.Series([np.nan] * 5 + [0.01] + [np.nan] * 4, index=idx[:10]),
+        "all_nan": pd.Series(np.nan, index=idx[:20]),
+        "empty": pd.Series([], index=pd.DatetimeIndex([]), dtype=float),
+    }
+
+
+@pytest.mark.parametrize("name", list(_series()))
+def test_summarize_matches_per_series_functions(name):
+    r = _series()[name]
+    got, ref = summarize(r), _baseline(r)
+    assert set(ref) <= set(got)
+    for k, v in ref.items():
+        np.testing.assert_allclose(got[k], v, rtol=1e-15, atol=0, err_msg=k)
+
+
+def test_summarize_matrix_columns_match_per_series_functions():
+    series = {k: v for k, v in _series().items() if k in ("ragged", "dense")}
+    frame = pd.DataFrame(series)
+    got = summarize_matrix(frame)
+    assert list(got.columns) == list(METRICS)
+    assert list(got.index) == list(series)
+    for name, r in series.items():
+        for k, v in _baseline(r).items():
+            np.testing.assert_allclose(got.loc[name, k], v, rtol=1e-15, atol=0, err_msg=f"{name} {k}")
+
+
+def test_sortino_calmar_turnover_by_hand():
+    r = np.array([[0.10, 0.02], [-0.05, np.nan], [0.02, -0.01], [-0.10, 0.03]])
+    turnover = np.array([[1.0, 0.5], [0.0, np.nan], [0.5, 0.5], [2.0, 0.0]])
+    got = summarize_matrix(r, turnover, names=["a", "b"], periods_per_year=4)
+
+    # a: mean -0.0075 / downside rms sqrt((0.05^2 + 0.10^2) / 4), x sqrt(4)
+    assert got.loc["a", "sortino"] == pytest.approx(-0.0075 / np.sqrt(0.0125 / 4) * 2, rel=1e-14)
+    # equity 1.10, 1.045, 1.0659, 0.95931 -> max drawdown 0.95931 / 1.10 - 1; 4 bars = 1 year
+    dd = 0.95931 / 1.10 - 1
+    assert got.loc["a", "max_drawdown"] == pytest.approx(dd, rel=1e-14)
+    assert got.loc["a", "calmar"] == pytest.approx((0.95931 - 1) / abs(dd), rel=1e-12)
+    assert got.loc["a", "turnover"] == pytest.approx(3.5 / 4 * 4)
+
+    # b: 3 valid bars, downside only -0.01, drawdown 0.99 - 1; turnover ignores the NaN bar
+    assert got.loc["b", "sortino"] == pytest.approx((0.04 / 3) / np.sqrt(1e-4 / 3) * 2, rel=1e-14)
+    assert got.loc["b", "calmar"] == pytest.approx(((1.02 * 0.99 * 1.03) ** (4 / 3) - 1) / 0.01, rel=1e-12)
+    assert got.loc["b", "turnover"] == pytest.approx(1.0 / 3 * 4)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from pairs_trading.online import OnlinePairEngine
+from pairs_trading.signals import compute_spread, positions_from_z, rolling_zscore
+from pairs_trading.stats import rolling_ols_beta
+
+PAIRS = np.array([[0, 1], [2, 3], [4, 5], [6, 7]])
+
+
+def _prices(daily_prices):
+    prices = daily_prices.copy()
+    prices.iloc[[100, 700, 701, 1500], 0] = np.nan
+    prices.iloc[1000:1004, 3] = np.nan
+    return prices
+
+
+def _run(engine, values):
+    out = [engine.update(row) for row in values]
+    return {f: np.array([getattr(o, f) for o in out]) for f in ("beta", "z", "position")}
+
+
+def test_online_matches_batch(daily_prices):
+    prices = _prices(daily_prices)
+    got = _run(OnlinePairEngine(PAIRS, 252, 60), prices.values)
+    for j, (a, b) in enumerate(PAIRS):
+        y, x = prices.iloc[:, a], prices.iloc[:, b]
+        beta = rolling_ols_beta(y, x, 252)
+        z = rolling_zscore(compute_spread(y, x, beta), 60)
+        np.testing.assert_allclose(got["beta"][:, j], beta.values, rtol=1e-9)
+        np.testing.assert_allclose(got["z"][:, j], z.values, rtol=1e-8, atol=1e-9)
+        np.testing.assert_array_equal(got["position"][:, j], positions_from_z(z).values)
+
+
+def test_save_load_resumes(daily_prices, tmp_path):
+    values = _prices(daily_prices).values
+    whole = _run(OnlinePairEngine(PAIRS, 252, 60), values)
+    engine = OnlinePairEngine(PAIRS, 252, 60)
+    _run(engine, values[:800])
+    engine.save(tmp_path / "engine.npz")
+    rest = _run(OnlinePairEngine.load(tmp_path / "engine.npz"), values[800:])
+    for f in whole:
+        np.testing.assert_array_equal(rest[f], whole[f][800:])
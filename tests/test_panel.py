@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.data import align_panel, align_prices
+
+
+def _raw() -> pd.DataFrame:
+    prices, _ = synthetic_universe(8, 600, seed=1)
+    prices.iloc[:50, 2] = np.nan   # late listing
+    prices.iloc[300:310, 5] = np.nan  # gap, forward filled
+    return prices
+
+
+def test_align_panel_matches_align_prices():
+    raw = _raw()
+    pd.testing.assert_frame_equal(align_panel(raw, 252).frame(), align_prices(raw, 252))
+
+
+def test_views_share_memory():
+    panel = align_panel(_raw(), 252)
+    y, x = panel.pair("T0000", "T0001")
+    assert np.shares_memory(y.values, panel.values)
+    assert y.index is x.index
+    assert np.shares_memory(panel.frame().values, panel.values)
+
+
+def test_float32_storage():
+    raw = _raw()
+    p32 = align_panel(raw, 252, dtype=np.float32)
+    assert p32.dtype == np.float32 and p32.nbytes == align_panel(raw, 252).nbytes // 2
+    np.testing.assert_allclose(p32.frame().values, align_prices(raw, 252).values, rtol=1e-6)
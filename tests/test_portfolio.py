@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from pairs_trading.portfolio import weighted_portfolio
+
+
+def _flat_as_nan(seed: int, n: int = 700, m: int = 7) -> np.ndarray:
+    """
+    Pipeline-shaped pair returns: a pair is in a trade ~30% of the bars
+    (runs of ~10 bars) and NaN while flat.
+    """
+    rng = np.random.default_rng(seed)
+    r = rng.normal(0.001, 0.01, size=(n, m))
+    in_trade = np.zeros((n, m), dtype=bool)
+    state = np.zeros(m, dtype=bool)
+    for t in range(n):
+        flip = rng.random(m) < np.where(state, 0.1, 0.045)
+        state ^= flip
+        in_trade[t] = state
+    return np.where(in_trade, r, np.nan)
+
+
+@pytest.mark.parametrize("weighting", ["inverse_vol", "risk_parity"])
+def test_invested_whenever_a_pair_has_a_return(weighting):
+    r = _flat_as_nan(0)
+    eq = weighted_portfolio(r, "equal")
+    port = weighted_portfolio(r, weighting)
+    has_return = np.isfinite(r).any(axis=1)
+
+    np.testing.assert_allclose(port.gross_exposure[has_return], 1.0)
+    assert np.isnan(port.returns[~has_return]).all()
+    # Same-vol pairs: the weightings stay close to equal weights.
+    assert np.corrcoef(port.returns[has_return], eq.returns[has_return])[0, 1] > 0.9
+    win = lambda p: (p[has_return] > 0).mean()
+    assert abs(win(port.returns) - win(eq.returns)) < 0.05
+
+
+def test_dead_pair_gets_no_weight():
+    rng = np.random.default_rng(37)
+    r = rng.normal(0.0, 0.01, size=(500, 6))
+    r[200:, 2] = 0.0  # goes flat at 0
+
+    iv = weighted_portfolio(r, "inverse_vol")
+    rp = weighted_portfolio(r, "risk_parity")
+    late = slice(300, None)
+    assert (iv.weights[late, 2] == 0).all()
+    assert (rp.weights[late, 2] == 0).all()
+    np.testing.assert_allclose(rp.weights[late].sum(axis=1), 1.0)
+    assert iv.weights[late].max() < 0.5
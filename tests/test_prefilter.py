@@ -0,0 +1,38 @@
+from itertools import combinations
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.prefilter import prefilter_pairs
+
+
+def test_prefilter_keeps_planted_pairs_and_counts():
+    prices, true_pairs = synthetic_universe(20, 1000, coint_frac=0.4, seed=3)
+    pairs = list(combinations(prices.columns, 2))
+    kept, feats = prefilter_pairs(prices, pairs)
+
+    assert all(p in kept or p[::-1] in kept for p in true_pairs)
+    assert kept == [p for p in pairs if p in set(kept)]  # input order
+    assert len(feats) == len(pairs)
+    assert int(feats["keep"].sum()) == len(kept)
+    assert len(pairs) - len(kept) == int((~feats["keep"]).sum()) > len(pairs) // 2
+
+    # Every pruned pair fails at least one threshold.
+    logp = np.log(prices)
+    pruned = [p for p, k in zip(pairs, feats["keep"]) if not k]
+    f = feats.loc[~feats["keep"]]
+    assert ((f["level_corr"].abs() < 0.5) | (f["return_corr"] < 0.0) | ~(f["half_life"] <= 126.0)).all()
+    a, b = pruned[0]
+    np.testing.assert_allclose(f["level_corr"].iloc[0], np.corrcoef(logp[a], logp[b])[0, 1], rtol=1e-10)
+
+
+def test_prefilter_groups_prune_across_groups():
+    prices, _ = synthetic_universe(8, 600, coint_frac=0.5, seed=1)
+    pairs = list(combinations(prices.columns, 2))
+    groups = {t: i % 2 for i, t in enumerate(prices.columns)}
+    _, ungrouped = prefilter_pairs(prices, pairs)
+    kept, feats = prefilter_pairs(prices, pairs, groups=groups)
+    same = np.array([groups[a] == groups[b] for a, b in pairs])
+    np.testing.assert_array_equal(feats["same_group"].values, same)
+    np.testing.assert_array_equal(feats["keep"].values, ungrouped["keep"].values & same)
+    assert all(groups[a] == groups[b] for a, b in kept)
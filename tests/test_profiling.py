@@ -0,0 +1,81 @@
+import json
+import time
+
+import numpy as np
+import pytest
+
+from pairs_trading import profiling
+from pairs_trading.profiling import timed
+
+
+@timed
+def _work(a, scale=1.0):
+    return a * scale
+
+
+@timed(name="custom", rows=lambda n: n)
+def _spin(n):
+    t0 = time.process_time()
+    while time.process_time() - t0 < 0.02:
+        pass
+    return n
+
+
+@pytest.fixture
+def profiler():
+    prof = profiling.enable()
+    yield prof
+    profiling.disable()
+
+
+def test_timed_is_a_pass_through_while_disabled():
+    assert profiling.active() is None
+    a = np.arange(5.0)
+    np.testing.assert_array_equal(_work(a, scale=2.0), a * 2.0)
+    assert _work.__name__ == "_work"
+    obj = object()
+    assert timed(lambda x: x)(obj) is obj
+    assert profiling.span("x") is profiling.span("y")  # shared no-op
+    with profiling.span("x") as info:
+        info["rows"] = 3
+    prof = profiling.enable()
+    profiling.disable()
+    assert prof.events == [] and prof.stats == {}
+
+
+def test_write_profile_and_chrome_trace(profiler, tmp_path):
+    a = np.ones((7, 3))
+    for _ in range(3):
+        _work(a)
+    with profiling.span("outer", rows=2):
+        _spin(11)
+
+    paths = profiling.disable().write(tmp_path / "prof")
+    assert set(paths) == {"profile", "trace"}
+
+    profile = json.loads(paths["profile"].read_text())
+    assert profile["peak_rss_mb"] > 0
+    stages = {s["name"]: s for s in profile["stages"]}
+    assert set(stages) == {"test_profiling._work", "custom", "outer"}
+    work, spin, outer = stages["test_profiling._work"], stages["custom"], stages["outer"]
+    assert (work["calls"], work["rows"]) == (3, 21)  # len() of a 7-row array, three times
+    assert (spin["calls"], spin["rows"]) == (1, 11)
+    assert (outer["calls"], outer["rows"]) == (1, 2)
+    assert spin["cpu_s"] >= 0.02 and spin["wall_s"] >= spin["cpu_s"] * 0.5
+    assert outer["wall_s"] >= spin["wall_s"]
+    for s in profile["stages"]:
+        assert set(s) == {"name", "calls", "wall_s", "cpu_s", "rows", "peak_rss_mb"}
+
+    trace = json.loads(paths["trace"].read_text())
+    events = trace["traceEvents"]
+    assert len(events) == 5
+    for e in events:
+        assert e["ph"] == "X"
+        assert {"name", "ts", "dur", "pid", "tid", "args"} <= set(e)
+        assert e["ts"] >= 0 and e["dur"] >= 0
+        assert "cpu_ms" in e["args"] and "peak_rss_mb" in e["args"]
+    inner = next(e for e in events if e["name"] == "custom")
+    outer_ev = next(e for e in events if e["name"] == "outer")
+    # The nested span lies inside its parent on the timeline.
+    assert outer_ev["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer_ev["ts"] + outer_ev["dur"] + 1e-3
+    assert (inner["args"]["depth"], outer_ev["args"]["depth"]) == (1, 0)
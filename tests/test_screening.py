@@ -0,0 +1,24 @@
+import numpy as np
+from statsmodels.tsa.stattools import coint
+
+from pairs_trading.screening import batch_coint_pvalues
+
+
+def test_batch_coint_matches_statsmodels(daily_prices):
+    prices = daily_prices.copy()
+    # An interior gap sends the pairs of that ticker down the per-pair fallback.
+    prices.iloc[500:510, 5] = np.nan
+    cols = list(prices.columns)
+    pairs = [(a, b) for i, a in enumerate(cols[:8]) for b in cols[i + 1 : 8]]
+    got = batch_coint_pvalues(prices, pairs, progress=False)
+    assert list(zip(got.A, got.B)) == pairs
+    ref = [coint(*prices[[a, b]].dropna().values.T)[1] for a, b in pairs]
+    np.testing.assert_allclose(got.coint_pvalue.values, ref, rtol=1e-12, atol=1e-15)
+
+
+def test_short_overlap_is_nan(daily_prices):
+    prices = daily_prices.iloc[:60].copy()
+    prices.iloc[:20, 0] = np.nan
+    a, b, c = prices.columns[:3]
+    got = batch_coint_pvalues(prices, [(a, b), (b, c)], min_obs=50, progress=False)
+    assert np.isnan(got.coint_pvalue[0]) and np.isfinite(got.coint_pvalue[1])
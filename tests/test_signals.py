@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.signals import _hysteresis_loop, final_state, positions_from_z, positions_matrix_from_z
+
+
+def _baseline_positions(z, entry_z, exit_z, allowed=None, state0=0.0):
+    # positions_from_z's original per-bar loop, plus the allowed mask and a starting state.
+    pos = np.full(len(z), np.nan)
+    state = state0
+    for i, zi in enumerate(z):
+        if allowed is not None and not allowed[i]:
+            state = pos[i] = 0.0
+            continue
+        if np.isnan(zi):
+            continue
+        if state == 0.0:
+            if zi <= -entry_z:
+                state = 1.0
+            elif zi >= entry_z:
+                state = -1.0
+        elif abs(zi) <= exit_z:
+            state = 0.0
+        pos[i] = state
+    return pos
+
+
+def _inputs(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    z = np.cumsum(rng.normal(0, 0.4, (n, 6)), axis=0) % 6 - 3  # crosses every band often
+    z[:25] = np.nan  # warmup
+    z[rng.random((n, 6)) < 0.05] = np.nan
+    z[300:310, 1] = np.nan
+    allowed = rng.random((n, 6)) > 0.03
+    allowed[100:140, 2] = False
+    # Columns 4 and 5 have overlapping bands (exit_z >= entry_z): the loop path.
+    entry = np.array([2.0, 1.5, 1.0, 2.5, 1.0, 0.8])
+    exit_ = np.array([0.5, 0.0, 0.3, 0.5, 1.0, 1.2])
+    return z, allowed, entry, exit_
+
+
+@pytest.mark.parametrize("with_allowed", [False, True])
+def test_positions_matrix_matches_the_baseline_loop(with_allowed):
+    z, allowed, entry, exit_ = _inputs()
+    allowed = allowed if with_allowed else None
+    state0 = np.array([1.0, -1.0, 0.0, 1.0, -1.0, 1.0])
+    got = positions_matrix_from_z(z, entry, exit_, allowed=allowed, state0=state0)
+    for j in range(z.shape[1]):
+        ref = _baseline_positions(z[:, j], entry[j], exit_[j], None if allowed is None else allowed[:, j], state0[j])
+        np.testing.assert_array_equal(got[:, j], ref, err_msg=f"column {j}")
+
+
+def test_hysteresis_loop_matches_the_vectorized_path():
+    # For exit_z < entry_z both paths apply; they must agree.
+    z, allowed, entry, exit_ = _inputs(seed=1)
+    keep = exit_ < entry
+    z, allowed, entry, exit_ = z[:, keep], allowed[:, keep], entry[keep], exit_[keep]
+    state0 = np.resize([1.0, -1.0, 0.0], z.shape[1])
+    np.testing.assert_array_equal(
+        _hysteresis_loop(z, entry, exit_, allowed, state0),
+        positions_matrix_from_z(z, entry, exit_, allowed=allowed, state0=state0),
+    )
+
+
+def test_state_carries_over_between_blocks():
+    z, allowed, entry, exit_ = _inputs(seed=2)
+    full = positions_matrix_from_z(z, entry, exit_, allowed=allowed)
+    state, blocks = None, []
+    for lo, hi in [(0, 97), (97, 305), (305, 306), (306, len(z))]:
+        blocks.append(positions_matrix_from_z(z[lo:hi], entry, exit_, allowed=allowed[lo:hi], state0=state))
+        state = final_state(blocks[-1], state)
+    np.testing.assert_array_equal(np.vstack(blocks), full)
+
+
+def test_positions_from_z_series():
+    z, allowed, _, _ = _inputs()
+    idx = pd.bdate_range("2020-01-01", periods=len(z))
+    got = positions_from_z(pd.Series(z[:, 0], index=idx), 2.0, 0.5, allowed=pd.Series(allowed[:, 0], index=idx))
+    assert got.name == "spread_pos"
+    np.testing.assert_array_equal(got.values, _baseline_positions(z[:, 0], 2.0, 0.5, allowed[:, 0]))
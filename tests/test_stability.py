@@ -0,0 +1,86 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+import statsmodels.tsa
+import statsmodels.tsa.adfvalues as adfvalues
+from statsmodels.tsa.stattools import adfuller, coint
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.stability import mackinnon_pvalues, rolling_adf, rolling_coint
+
+T_GRID = np.array([np.nan, -30.0, -6.0, -4.2, -3.34, -2.9, -1.5, 0.0, 1.7, 3.0])
+
+
+@pytest.mark.parametrize("N", [1, 2])
+def test_mackinnon_matches_statsmodels(N):
+    p = mackinnon_pvalues(T_GRID, "c", N)
+    ref = [np.nan if np.isnan(t) else adfvalues.mackinnonp(t, "c", N) for t in T_GRID]
+    np.testing.assert_allclose(p, ref, rtol=1e-13, atol=1e-15)
+
+
+def test_mackinnon_falls_back_to_public_function(monkeypatch):
+    expected = mackinnon_pvalues(T_GRID, "c", 2)
+    # A statsmodels without the private tables: only the public function.
+    public = types.ModuleType("statsmodels.tsa.adfvalues")
+    public.mackinnonp = adfvalues.mackinnonp
+    monkeypatch.setitem(sys.modules, "statsmodels.tsa.adfvalues", public)
+    monkeypatch.setattr(statsmodels.tsa, "adfvalues", public)
+    np.testing.assert_allclose(mackinnon_pvalues(T_GRID, "c", 2), expected, rtol=1e-13)
+
+
+def _legs():
+    prices, pairs = synthetic_universe(4, 400, coint_frac=0.5, seed=5)
+    y = np.log(prices[[pairs[0][0], "T0002"]].values)
+    x = np.log(prices[[pairs[0][1], "T0003"]].values)
+    return y, x
+
+
+def test_rolling_coint_matches_statsmodels_windows():
+    y, x = _legs()
+    window, lags = 120, 1
+    res = rolling_coint(y, x, window, lags)
+    assert np.isnan(res.tstat[: window - 1]).all()
+    for j in range(y.shape[1]):
+        for end in (window, 250, len(y)):
+            ref_t, ref_p, _ = coint(y[end - window : end, j], x[end - window : end, j], maxlag=lags, autolag=None)
+            # Window sums vs per-window QR: agreement to ~1e-8 relative on the statistic.
+            np.testing.assert_allclose(res.tstat[end - 1, j], ref_t, rtol=1e-7)
+            np.testing.assert_allclose(res.pvalue[end - 1, j], ref_p, rtol=1e-6, atol=1e-9)
+
+
+def test_rolling_adf_matches_statsmodels_windows():
+    y, x = _legs()
+    s = y - 0.9 * x
+    window, lags = 100, 2
+    res = rolling_adf(s, window, lags)
+    for j in range(s.shape[1]):
+        for end in (window, 333, len(s)):
+            ref = adfuller(s[end - window : end, j], maxlag=lags, autolag=None, regression="c")
+            np.testing.assert_allclose(res.tstat[end - 1, j], ref[0], rtol=1e-7)
+            np.testing.assert_allclose(res.pvalue[end - 1, j], ref[1], rtol=1e-6, atol=1e-9)
+
+
+@pytest.mark.parametrize("test", ["eg", "adf"])
+def test_backtest_pair_runs_the_monitor_once(monkeypatch, test):
+    import pairs_trading.filters as filters
+    from pairs_trading.cli import backtest_pair, select_pairs
+    from pairs_trading.config import StrategyConfig
+    from pairs_trading.stability import coint_monitor
+
+    prices, _ = synthetic_universe(8, 700, coint_frac=0.5, seed=21)
+    cfg = StrategyConfig(min_overlap_days=100, coint_pvalue_max=0.5, coint_monitor=True,
+                         monitor_test=test, monitor_window=120)
+    pairs = select_pairs(prices, cfg)
+    ref = coint_monitor(prices, pairs, cfg)
+
+    calls = []
+    name = "rolling_coint" if test == "eg" else "rolling_adf"
+    orig = getattr(filters, name)
+    monkeypatch.setattr(filters, name, lambda *a, **k: calls.append(1) or orig(*a, **k))
+    for i, (a, b) in enumerate(zip(pairs["A"], pairs["B"])):
+        _, _, monitor = backtest_pair(prices, a, b, cfg)
+        # Single pair vs the batched panel: same windows, ~1e-15 rounding apart.
+        np.testing.assert_allclose(monitor.values, ref.iloc[:, i].values, rtol=1e-12, atol=1e-14)
+    assert len(calls) == len(pairs)
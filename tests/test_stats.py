@@ -0,0 +1,32 @@
+import numpy as np
+import statsmodels.api as sm
+
+from pairs_trading.stats import rolling_ols, rolling_ols_beta
+
+LOOKBACK = 252
+
+
+def test_rolling_ols_matches_statsmodels(daily_prices):
+    y = daily_prices.iloc[:, 0].values
+    x = daily_prices.iloc[:, 1].values
+    res = rolling_ols(y, x, LOOKBACK)
+    assert np.isnan(res.beta[: LOOKBACK - 1]).all()
+    for t in range(LOOKBACK - 1, len(y), 5):
+        w = slice(t - LOOKBACK + 1, t + 1)
+        fit = sm.OLS(y[w], sm.add_constant(x[w])).fit()
+        # ~1e-12 on beta / scale; the intercept (an extrapolation to x = 0) to ~1e-10.
+        np.testing.assert_allclose(res.beta[t], fit.params[1], rtol=1e-10)
+        np.testing.assert_allclose(res.resid_var[t], fit.scale, rtol=1e-10)
+        np.testing.assert_allclose(res.intercept[t], fit.params[0], rtol=1e-9)
+
+
+def test_rolling_ols_beta_skips_rows_with_a_missing_leg(daily_prices):
+    y = daily_prices.iloc[:, 2].copy()
+    x = daily_prices.iloc[:, 3].copy()
+    y.iloc[[300, 301, 900]] = np.nan
+    x.iloc[1200] = np.nan
+    beta = rolling_ols_beta(y, x, LOOKBACK)
+    ok = y.notna() & x.notna()
+    assert beta[~ok].isna().all()
+    ref = rolling_ols(y[ok].values, x[ok].values, LOOKBACK).beta
+    np.testing.assert_array_equal(beta[ok].values, ref)
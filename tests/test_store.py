@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pairs_trading.store import FrameSource, PriceStore
+
+TICKERS = ["AAA", "BBB", "CCC"]
+PRICES = pd.DataFrame(
+    np.random.default_rng(5).lognormal(size=(262, len(TICKERS))).cumsum(axis=0),
+    index=pd.bdate_range("2020-01-01", "2020-12-31"),
+    columns=TICKERS,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = PriceStore(tmp_path, source=FrameSource(PRICES))
+    assert s.refresh(TICKERS, "2020-03-02", "2020-06-01") == 1
+    return s
+
+
+def test_repeat_refresh_makes_no_calls(store):
+    assert store.refresh(TICKERS, "2020-03-02", "2020-06-01") == 0
+    assert store.refresh(TICKERS, "2020-04-01", "2020-05-01") == 0
+    assert len(store.source.calls) == 1
+
+
+def test_extending_end_fetches_from_the_last_stored_bar(store):
+    assert store.refresh(TICKERS, "2020-03-02", "2020-09-01") == 1
+    # 2020-05-29 is the last bar before 2020-06-01; it is re-fetched in case it was partial.
+    assert store.source.calls[-1] == (tuple(TICKERS), "2020-05-29", "2020-09-01")
+    got = store.load(TICKERS, "2020-03-02", "2020-09-01")
+    pd.testing.assert_frame_equal(got, PRICES.loc["2020-03-02":"2020-08-31"], check_freq=False, check_names=False)
+
+
+def test_extending_start_fetches_only_the_earlier_range(store):
+    assert store.refresh(TICKERS, "2020-01-15", "2020-06-01") == 1
+    assert store.source.calls[-1] == (tuple(TICKERS), "2020-01-15", "2020-03-02")
+    assert store.manifest["AAA"] == {"start": "2020-01-15", "end": "2020-06-01"}
+
+
+def test_new_ticker_is_fetched_alone(tmp_path):
+    store = PriceStore(tmp_path, source=FrameSource(PRICES))
+    store.refresh(TICKERS[:2], "2020-03-02", "2020-06-01")
+    assert store.refresh(TICKERS, "2020-03-02", "2020-06-01") == 1
+    assert store.source.calls[-1] == (("CCC",), "2020-03-02", "2020-06-01")
+
+
+def test_full_refresh_rebuilds_the_ticker(store):
+    assert store.refresh(["AAA"], "2020-05-01", "2020-07-01", full=True) == 1
+    assert store.source.calls[-1] == (("AAA",), "2020-05-01", "2020-07-01")
+    assert store.manifest["AAA"] == {"start": "2020-05-01", "end": "2020-07-01"}
+    kept = store.load(["AAA"], "2020-01-01", "2021-01-01")["AAA"]
+    assert kept.index.min() == pd.Timestamp("2020-05-01")
+    assert kept.index.max() == pd.Timestamp("2020-06-30")
+    # Untouched tickers keep their coverage.
+    assert store.manifest["BBB"] == {"start": "2020-03-02", "end": "2020-06-01"}
+
+
+def test_load_never_calls_the_source(store, tmp_path):
+    reopened = PriceStore(tmp_path, source=FrameSource(PRICES))
+    got = reopened.load(TICKERS + ["ZZZ"], "2020-01-01", "2020-12-31")
+    assert reopened.source.calls == []
+    assert got["ZZZ"].isna().all()
+    pd.testing.assert_frame_equal(
+        got[TICKERS], PRICES.loc["2020-03-02":"2020-05-29"], check_freq=False, check_names=False
+    )
@@ -0,0 +1,56 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.cli import backtest_pair, select_pairs
+from pairs_trading.config import StrategyConfig
+from pairs_trading.metrics import summarize
+from pairs_trading.portfolio import portfolio_from_config
+from pairs_trading.sweep import run_sweep, screening_config
+
+BASE = StrategyConfig(min_overlap_days=100, coint_pvalue_max=0.5, vol_filter=True, weighting="inverse_vol")
+GRID = {
+    "beta_lookback": [60, 120],
+    "z_lookback": [20, 40],
+    "entry_z": [1.5, 2.0],
+    "fee_bps_per_leg": [1.0, 5.0],
+    "max_pairs": [2, 4],
+}
+
+
+@pytest.fixture(scope="module")
+def sweep():
+    prices, _ = synthetic_universe(8, 700, coint_frac=0.5, seed=21)
+    pairs = select_pairs(prices, screening_config(BASE, GRID))
+    assert len(pairs) >= 4
+    return prices, pairs, run_sweep(prices, pairs, BASE, GRID)
+
+
+def test_rows_match_the_per_pair_pipeline(sweep):
+    prices, pairs, out = sweep
+    pairs = pairs.sort_values("coint_pvalue", kind="stable")
+    for row in out.to_dict("records"):
+        cfg = replace(BASE, **{k: row[k] for k in GRID})
+        sel = pairs[pairs["coint_pvalue"] <= cfg.coint_pvalue_max].head(cfg.max_pairs)
+        assert row["n_pairs"] == len(sel)
+        rets = {f"{a}__{b}": backtest_pair(prices, a, b, cfg)[0] for a, b in zip(sel["A"], sel["B"])}
+        ref = summarize(portfolio_from_config(rets, cfg).series())
+        for k, v in ref.items():
+            np.testing.assert_allclose(row[k], v, rtol=1e-12, atol=1e-14, err_msg=k)
+
+
+def test_nodes_are_shared(sweep):
+    *_, out = sweep
+    assert len(out) == 32
+    assert out.attrs["nodes"] == {"beta": 2, "z": 4, "positions": 8, "returns": 16, "portfolio": 32}
+
+
+def test_independent_of_workers(sweep):
+    prices, pairs, out = sweep
+    grid = {"entry_z": [1.5, 2.0, 2.5], "exit_z": [0.0, 0.5], "z_lookback": [20, 40]}
+    one = run_sweep(prices, pairs, BASE, grid, workers=1)
+    four = run_sweep(prices, pairs, BASE, grid, workers=4)
+    assert one.attrs["nodes"] == four.attrs["nodes"] == {"beta": 1, "z": 2, "positions": 12, "returns": 12, "portfolio": 12}
+    assert one.equals(four)
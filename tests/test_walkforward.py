@@ -0,0 +1,66 @@
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_universe
+from pairs_trading.config import WalkForwardConfig
+from pairs_trading.walkforward import _cache_path, run_walkforward
+
+CFG = WalkForwardConfig(train_days=252, trade_days=63, step_days=63, max_coint_p=0.2, top_k=2)
+
+
+def _prices() -> pd.DataFrame:
+    prices, _ = synthetic_universe(6, 1_000, coint_frac=0.67, seed=3)
+    return prices
+
+
+def test_equity_chains_across_windows():
+    prices = _prices()
+    res = run_walkforward(prices, CFG)
+    eq = res.equity.values
+    starts = [res.equity.index.get_loc(t) for t in res.summary["trade_start"]]
+    assert len(starts) > 5
+    # Each window starts from the previous window's last value (no restart at 1.0).
+    for i1 in starts:
+        assert eq[i1] == eq[i1 - 1]
+    assert np.isfinite(eq).all()
+    assert (res.summary["selected_pairs"] > 0).any()
+    assert (eq != 1.0).any()
+
+
+def test_notebook_chain_restarts_after_weekends():
+    prices = _prices()
+    res = run_walkforward(prices, replace(CFG, notebook_equity_chain=True))
+    idx = res.equity.index
+    mondays = [t for t in res.summary["trade_start"] if t.dayofweek == 0]
+    assert mondays
+    for t in mondays:
+        assert res.equity.iloc[idx.get_loc(t)] == 1.0
+
+
+def test_cache_key_depends_on_prices(tmp_path):
+    prices = _prices()
+    bumped = prices.copy()
+    bumped.iloc[10, 0] *= 1.01
+    assert _cache_path(tmp_path, prices, 0, 252) != _cache_path(tmp_path, bumped, 0, 252)
+    assert _cache_path(tmp_path, prices, 300, 552) == _cache_path(tmp_path, bumped, 300, 552)
+
+
+def test_notebook_chain_reproduces_notebook_03():
+    nb = Path(__file__).resolve().parents[1] / "notebooks"
+    # The notebook's saved run used the cache's column order (alphabetical).
+    prices = pd.read_csv(nb / "data" / "cache" / "adj_close_2016-01-01_to_today_NVDA-JPM-AMZN-META.csv",
+                         index_col=0, parse_dates=True)
+    ref = pd.read_csv(nb / "outputs" / "walkforward_oos_equity.csv", index_col=0, parse_dates=True)["equity_oos"]
+    ref_summary = pd.read_csv(nb / "outputs" / "walkforward_window_summary.csv")
+
+    res = run_walkforward(prices, WalkForwardConfig(notebook_equity_chain=True))
+    assert res.equity.index.equals(ref.index)
+    # The notebook's PnL is in price units, so equity spans many orders of magnitude.
+    np.testing.assert_allclose(res.equity.values, ref.values, rtol=1e-9)
+    last_trade = res.equity.index.get_loc(res.summary["trade_end"].iloc[-1])
+    assert (res.equity.iloc[last_trade + 1 :] == 1.0).all()
+    np.testing.assert_array_equal(res.summary["selected_pairs"], ref_summary["selected_pairs"])
+    np.testing.assert_allclose(res.summary["equity_end"], ref_summary["equity_end"], rtol=1e-9)